@@ -0,0 +1,76 @@
+"""Benchmark: decoding a whole rates snapshot, Redis hashes (per pair / per base) vs binary snapshot blob.
+
+Only decoding of the values returned by Redis is measured (no network).
+
+Run from `packages/finnikacc-api`:
+
+    APP_ENV=dev_container uv run python benchmarks/decode_snapshot_bench.py
+"""
+
+import timeit
+from typing import cast
+
+from finnikacc_api.redis.model import (
+    CurrencyRateCacheValue,
+    _convert_dict_bytes_to_str,
+    _convert_to_typed_cr,
+    _unpack_cr,
+)
+from finnikacc_api.redis.snapshot_blob import decode_snapshot_blob, encode_snapshot_blob
+
+
+def _rates(n: int) -> dict[str, float]:
+    return {f"C{i:03d}": 1 + i / 7 for i in range(n)}
+
+
+def _hash_per_pair_rows(rates: dict[str, float]) -> list[dict[bytes, bytes]]:
+    return [
+        {
+            b"currency": c.encode(),
+            b"rate": f"{r}".encode(),
+            b"request_at": b"1700000100",
+            b"last_modified": b"1700000000",
+        }
+        for c, r in rates.items()
+    ]
+
+
+def _hash_per_base_fields(rates: dict[str, float]) -> dict[bytes, bytes]:
+    return {c.encode(): f"{r}|1700000100|1700000000".encode() for c, r in rates.items()}
+
+
+def main() -> None:
+    print(f"{'currencies':>10} {'per pair':>12} {'per base':>12} {'blob':>12} {'blob (view)':>12} {'speedup':>8}")
+    for n in (8, 170, 1000):
+        rates = _rates(n)
+        rows = _hash_per_pair_rows(rates)
+        fields = _hash_per_base_fields(rates)
+        blob = encode_snapshot_blob("USD", rates, version=1, request_at=1700000100, last_modified=1700000000)
+
+        per_pair = [_convert_to_typed_cr(cast("CurrencyRateCacheValue", _convert_dict_bytes_to_str(r))) for r in rows]
+        per_base = [_convert_to_typed_cr(_unpack_cr(k, v)) for k, v in fields.items()]
+        assert per_pair == per_base == list(decode_snapshot_blob(blob).to_typed().values())
+
+        results = []
+        for fn in (
+            lambda rows=rows: [
+                _convert_to_typed_cr(cast("CurrencyRateCacheValue", _convert_dict_bytes_to_str(r))) for r in rows
+            ],
+            lambda fields=fields: [_convert_to_typed_cr(_unpack_cr(k, v)) for k, v in fields.items()],
+            lambda blob=blob: decode_snapshot_blob(blob).to_typed(),
+            lambda blob=blob: decode_snapshot_blob(blob),
+        ):
+            number, _ = timeit.Timer(fn).autorange()
+            results.append(min(timeit.repeat(fn, number=number, repeat=5)) / number)
+
+        print(
+            f"{n:>10} {results[0] * 1e6:>10.1f}us {results[1] * 1e6:>10.1f}us {results[2] * 1e6:>10.1f}us "
+            f"{results[3] * 1e6:>10.1f}us {results[0] / results[2]:>7.1f}x",
+        )
+        size_per_pair = sum(len(k) + len(v) for r in rows for k, v in r.items())
+        size_per_base = sum(len(k) + len(v) for k, v in fields.items())
+        print(f"{'':>10} payload: per pair ~{size_per_pair}B, per base ~{size_per_base}B, blob {len(blob)}B")
+
+
+if __name__ == "__main__":
+    main()
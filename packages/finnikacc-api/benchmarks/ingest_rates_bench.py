@@ -0,0 +1,114 @@
+"""Benchmark: end-to-end rates ingestion (`fetch_conv_rates`), per Redis rates layout.
+
+OEX is replaced by local `OexReplayServer`, so a fetch is: HTTP request -> JSON parse -> merge ->
+Redis writes (latest and last seen rates, change stream, history). Every round fetches new rates
+(200) and then the same rates again (304). All currencies of the payload are stored: production
+allow-list would cut Redis writes to a few pairs. Keys are written under `fccbench` namespace
+and deleted afterwards.
+
+Requires local Redis. Run from `packages/finnikacc-api`:
+
+    APP_ENV=dev_container BENCH_REDIS_URL=redis://localhost:6379 uv run python benchmarks/ingest_rates_bench.py
+"""
+
+import asyncio
+import os
+import statistics
+import time
+from datetime import timedelta
+from typing import get_args
+from unittest import mock
+
+import aiohttp
+import redis.asyncio as redis
+from finnikacc_api.arqjobs import fetchrates
+from finnikacc_api.lifecycle.dependencies import INTERNAL_DEPENDENCIES_CONTEXT_KEY, InternalDependencies
+from finnikacc_api.providers.oex import OexRatesProvider
+from finnikacc_api.providers.oex_replay import OexReplayServer, synthetic_oex_latest
+from finnikacc_api.redis.fetch_lease import FetchLeaseRedisCache
+from finnikacc_api.redis.fetch_schedule_cache import FetchScheduleRedisCache
+from finnikacc_api.redis.history_cache import CurrencyRateHistoryRedisCache
+from finnikacc_api.redis.model import CurrencyRateCacheLayout
+from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache, LastRequestETagRedisCache
+from finnikacc_api.redis.snapshot_cache import CurrencyRateSnapshotCache
+
+_NAMESPACE = "fccbench"
+_ROUNDS = 30
+_T0 = 1700000000
+
+
+def _ideps(r: redis.Redis, client: aiohttp.ClientSession, layout: CurrencyRateCacheLayout) -> InternalDependencies:
+    ex = int(timedelta(hours=2).total_seconds())
+    rates_cache = CurrencyRateRedisCache(
+        r,
+        expiration_seconds=ex,
+        namespace=_NAMESPACE,
+        cache_type="latest",
+        layout=layout,
+    )
+    return InternalDependencies(
+        currency_rate_cache=rates_cache,
+        currency_rate_lastseen_cache=CurrencyRateRedisCache(
+            r,
+            expiration_seconds=ex,
+            namespace=_NAMESPACE,
+            cache_type="lastseen",
+            layout=layout,
+        ),
+        currency_rate_snapshot_cache=CurrencyRateSnapshotCache(rates_cache, ttl_seconds=ex),
+        currency_rate_history_cache=CurrencyRateHistoryRedisCache(
+            r,
+            retention_seconds=int(timedelta(days=8).total_seconds()),
+            namespace=_NAMESPACE,
+        ),
+        rates_providers=(
+            OexRatesProvider(client, LastRequestETagRedisCache(r, expiration_seconds=ex, namespace=_NAMESPACE)),
+        ),
+        fetch_schedule_cache=FetchScheduleRedisCache(r, namespace=_NAMESPACE),
+        fetch_lease=FetchLeaseRedisCache(r, ttl_seconds=90, namespace=_NAMESPACE),
+    )
+
+
+async def _bench(r: redis.Redis, currencies: int, layout: CurrencyRateCacheLayout) -> tuple[float, float]:
+    """Median seconds per fetch of new (200) and unchanged (304) rates."""
+    recordings = [synthetic_oex_latest(currencies, timestamp=_T0 + i * 3600, seed=i) for i in range(_ROUNDS + 1)]
+    modified, not_modified = [], []
+    async with OexReplayServer(recordings) as server, aiohttp.ClientSession(server.base_url) as client:
+        ctx = {INTERNAL_DEPENDENCIES_CONTEXT_KEY: _ideps(r, client, layout)}
+        # * warm up: connections, scripts, first unconditional request
+        await fetchrates.fetch_conv_rates(ctx)
+        for _ in range(_ROUNDS):
+            server.advance()
+            start = time.perf_counter()
+            await fetchrates.fetch_conv_rates(ctx)
+            modified.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            await fetchrates.fetch_conv_rates(ctx)
+            not_modified.append(time.perf_counter() - start)
+        assert server.status_counts == {200: _ROUNDS + 1, 304: _ROUNDS}
+    return statistics.median(modified), statistics.median(not_modified)
+
+
+async def _cleanup(r: redis.Redis) -> None:
+    if names := [name async for name in r.scan_iter(match=f"{_NAMESPACE}:*")]:
+        await r.delete(*names)
+
+
+async def main() -> None:
+    async with redis.Redis.from_url(os.environ.get("BENCH_REDIS_URL", "redis://localhost:6379")) as r:
+        print(f"{'currencies':>10} {'layout':>14} {'new (200)':>12} {'rates/s':>10} {'same (304)':>12}")
+        for n in (8, 170, 1000):
+            codes = {"USD", *(f"X{i:03d}" for i in range(n))}
+            for layout in get_args(CurrencyRateCacheLayout):
+                await _cleanup(r)
+                with mock.patch.object(fetchrates, "_ALLOWED_CURRENCIES", codes):
+                    modified, not_modified = await _bench(r, n, layout)
+                print(
+                    f"{n:>10} {layout:>14} {modified * 1e3:>10.2f}ms {n / modified:>10.0f} "
+                    f"{not_modified * 1e3:>10.2f}ms",
+                )
+        await _cleanup(r)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
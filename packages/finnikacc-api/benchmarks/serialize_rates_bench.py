@@ -0,0 +1,81 @@
+"""Benchmark: `/convert-rates` body encoding, pydantic models vs `dump_convert_rates_json`.
+
+Run from `packages/finnikacc-api`:
+
+    APP_ENV=dev_container uv run python benchmarks/serialize_rates_bench.py
+"""
+
+import timeit
+from datetime import UTC, datetime
+from typing import cast
+
+from finnikacc_api.app_webapi.fast_json import dump_convert_rates_json
+from finnikacc_api.app_webapi.model import CurrencyConvertRateModel
+from finnikacc_api.rates.convert import round_rate
+from finnikacc_api.redis.model import (
+    CurrencyRateCacheValue,
+    _convert_dict_bytes_to_str,
+    _convert_to_typed_cr,
+)
+from pydantic import TypeAdapter
+
+_ADAPTER = TypeAdapter(list[CurrencyConvertRateModel])
+
+
+def _raw_rows(n: int) -> list[dict[bytes, bytes]]:
+    return [
+        {
+            b"currency": f"C{i:03d}".encode(),
+            b"rate": f"{1 + i / 7}".encode(),
+            b"request_at": b"1700000100",
+            b"last_modified": b"1700000000",
+        }
+        for i in range(n)
+    ]
+
+
+def _pydantic_path(rows: list[dict[bytes, bytes]]) -> bytes:
+    typed = [_convert_to_typed_cr(cast("CurrencyRateCacheValue", _convert_dict_bytes_to_str(r))) for r in rows]
+    models = [
+        CurrencyConvertRateModel(
+            base_currency="USD",
+            quote_currency=r["currency"],
+            convert_rate=round_rate(r["rate"]),
+            rate_type="recent",
+            rate_age="1h",
+            rate_at=datetime.fromtimestamp(r["last_modified"], UTC),
+        )
+        for r in typed
+    ]
+    return _ADAPTER.dump_json(_ADAPTER.validate_python(models), by_alias=True)
+
+
+def _fast_raw_path(rows: list[dict[bytes, bytes]]) -> bytes:
+    untyped = [cast("CurrencyRateCacheValue", _convert_dict_bytes_to_str(r)) for r in rows]
+    return dump_convert_rates_json("USD", untyped)
+
+
+def main() -> None:
+    print(f"{'currencies':>10} {'pydantic':>12} {'fast (raw)':>12} {'fast (typed)':>12} {'speedup':>8}")
+    for n in (8, 170, 1000):
+        rows = _raw_rows(n)
+        typed = [_convert_to_typed_cr(cast("CurrencyRateCacheValue", _convert_dict_bytes_to_str(r))) for r in rows]
+        assert _pydantic_path(rows) == _fast_raw_path(rows) == dump_convert_rates_json("USD", typed)
+
+        results = []
+        for fn in (
+            lambda rows=rows: _pydantic_path(rows),
+            lambda rows=rows: _fast_raw_path(rows),
+            lambda typed=typed: dump_convert_rates_json("USD", typed),
+        ):
+            number, _ = timeit.Timer(fn).autorange()
+            results.append(min(timeit.repeat(fn, number=number, repeat=5)) / number)
+
+        print(
+            f"{n:>10} {results[0] * 1e6:>10.1f}us {results[1] * 1e6:>10.1f}us {results[2] * 1e6:>10.1f}us "
+            f"{results[0] / results[1]:>7.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Benchmark: per-request overhead of web API middleware, `BaseHTTPMiddleware` origin check vs pure ASGI one.
+
+Requests are sent straight to the ASGI app (no server, no HTTP client). Bare app (same endpoint, no
+middleware) is the baseline; `saved` is time per request saved by pure ASGI stack. Both stacks include
+`CORSMiddleware`; rejected and preflight requests do not reach the endpoint. Preflight is answered by
+`CORSMiddleware` in both, its cost is saved by browsers caching the answer (`max_age`).
+
+Run from `packages/finnikacc-api`:
+
+    APP_ENV=dev_container uv run python benchmarks/webapi_middleware_bench.py
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from fastapi import FastAPI, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from finnikacc_api.app_webapi import middleware
+from starlette.types import ASGIApp, Message
+
+_ORIGIN = b"https://cc.finnika.app"
+_ALLOWED_ORIGINS = ["http://localhost:5173", "https://finnika.app", _ORIGIN.decode()]
+_REQUESTS = 20000
+
+_BROWSER_HEADERS = [
+    (b"host", b"api.finnika.app"),
+    (b"user-agent", b"Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"),
+    (b"accept", b"application/json"),
+    (b"accept-language", b"en-US,en;q=0.5"),
+    (b"accept-encoding", b"gzip, deflate, br, zstd"),
+    (b"connection", b"keep-alive"),
+    (b"sec-fetch-dest", b"empty"),
+    (b"sec-fetch-mode", b"cors"),
+    (b"sec-fetch-site", b"same-site"),
+]
+_CASES: dict[str, tuple[str, list[tuple[bytes, bytes]]]] = {
+    "GET allowed": (
+        "GET",
+        [*_BROWSER_HEADERS, (b"origin", _ORIGIN), (b"referer", _ORIGIN + b"/convert")],
+    ),
+    "GET no origin": ("GET", _BROWSER_HEADERS),
+    "GET rejected": ("GET", [*_BROWSER_HEADERS, (b"origin", b"https://evil.example")]),
+    "preflight": (
+        "OPTIONS",
+        [*_BROWSER_HEADERS, (b"origin", _ORIGIN), (b"access-control-request-method", b"POST")],
+    ),
+}
+
+
+def _bare_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping() -> Response:
+        return Response(b"pong", media_type="text/plain")
+
+    return app
+
+
+def _legacy_app() -> FastAPI:
+    """Middleware as it was before pure ASGI one."""
+    app = _bare_app()
+
+    @app.middleware("http")
+    async def _check_origin_referer(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+        origin = request.headers.get("origin")
+        referer = request.headers.get("referer")
+        if origin and origin not in _ALLOWED_ORIGINS:
+            return Response(status_code=500)
+        if referer and not any(referer.startswith(allowed) for allowed in _ALLOWED_ORIGINS):
+            return Response(status_code=500)
+        return await call_next(request)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=_ALLOWED_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["GET", "POST"],
+        allow_headers=["*"],
+    )
+    return app
+
+
+def _current_app() -> FastAPI:
+    app = _bare_app()
+    middleware.apply_middleware(app, _ALLOWED_ORIGINS)
+    return app
+
+
+async def _per_request(app: ASGIApp, method: str, headers: list[tuple[bytes, bytes]]) -> tuple[float, int]:
+    """Seconds per request and status of the last one."""
+    status = 0
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "https",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+    for _ in range(_REQUESTS // 10):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(_REQUESTS):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / _REQUESTS, status
+
+
+async def main() -> None:
+    # * rejected requests are logged on debug level
+    middleware.LOG.setLevel(logging.INFO)
+    apps = {"bare": _bare_app(), "legacy": _legacy_app(), "asgi": _current_app()}
+    print(f"{'case':>14} {'status':>6} {'bare':>10} {'legacy':>10} {'asgi':>10} {'saved':>10}")
+    for case, (method, headers) in _CASES.items():
+        bare, _ = await _per_request(apps["bare"], method, headers)
+        legacy, legacy_status = await _per_request(apps["legacy"], method, headers)
+        asgi, status = await _per_request(apps["asgi"], method, headers)
+        assert legacy_status == status, (case, legacy_status, status)
+        print(
+            f"{case:>14} {status:>6} {bare * 1e6:>8.1f}us {legacy * 1e6:>8.1f}us {asgi * 1e6:>8.1f}us "
+            f"{(legacy - asgi) * 1e6:>8.1f}us",
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
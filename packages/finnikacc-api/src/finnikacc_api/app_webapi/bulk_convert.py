@@ -0,0 +1,287 @@
+"""Streaming bulk conversion of CSV / NDJSON rows.
+
+Request body is read, converted and written back in chunks of `_CHUNK_ROWS` rows,
+so memory use does not depend on input size (a single line, or CSV record spanning lines,
+is capped at `_MAX_LINE_CHARS`). All rows are converted against the single snapshot
+passed in (its version is reported in response headers).
+"""
+
+import codecs
+import csv
+import io
+import json
+import math
+from collections.abc import AsyncGenerator, AsyncIterable, AsyncIterator
+from dataclasses import dataclass
+from typing import Final, Literal
+
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from finnikacc_api.rates.convert import MAX_AMOUNT, convert_batch, round_amount, round_rate
+from finnikacc_api.redis.snapshot_cache import CurrencyRateSnapshot
+
+BulkConvertFormat = Literal["csv", "ndjson"]
+
+BULK_CONVERT_MEDIA_TYPES: Final[dict[str, BulkConvertFormat]] = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+_CHUNK_ROWS: Final = 1000
+_MAX_LINE_CHARS: Final = 64 * 1024
+_LINE_TOO_LONG: Final = "line too long"
+_CSV_REQUIRED_COLUMNS: Final = ("amount", "from", "to")
+_CSV_EXTRA_COLUMNS: Final = ("convertedAmount", "convertRate", "error")
+
+
+class BulkConvertFormatError(ValueError):
+    pass
+
+
+class BulkConvertLineTooLongError(BulkConvertFormatError):
+    """Line (or CSV record) of request body is longer than `_MAX_LINE_CHARS`."""
+
+
+class _InvalidAmountError(ValueError):
+    pass
+
+
+class _RequestBodyStreamingResponse(StreamingResponse):
+    """`StreamingResponse` which does not listen for client disconnect.
+
+    Content is produced while request body is still being received, and concurrent `receive()`
+    would steal body messages. Disconnect is still detected: reading request body raises `ClientDisconnect`.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:  # noqa: ARG002
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@dataclass(slots=True)
+class _Row:
+    fields: list[str] | dict
+    amount: float = 0.0
+    from_currency: str = ""
+    to_currency: str = ""
+    error: str | None = None
+
+
+async def bulk_convert_response(
+    snapshot: CurrencyRateSnapshot,
+    body: AsyncIterable[bytes],
+    fmt: BulkConvertFormat,
+) -> StreamingResponse:
+    """Streaming response with converted rows.
+
+    Raises `BulkConvertFormatError` if CSV header is invalid, `BulkConvertLineTooLongError` if it is too long.
+    A too long line after the header ends the stream with an error row (response status is sent already).
+    """
+    lines = _iter_records(_iter_lines(body), fmt)
+    if fmt == "csv":
+        header = await anext(lines, "")
+        columns = next(csv.reader([header]), [])
+        if missing := [c for c in _CSV_REQUIRED_COLUMNS if c not in columns]:
+            msg = f"CSV header misses required columns: {', '.join(missing)}"
+            raise BulkConvertFormatError(msg)
+        content = _convert_csv(snapshot, lines, columns)
+        media_type = "text/csv"
+    else:
+        content = _convert_ndjson(snapshot, lines)
+        media_type = "application/x-ndjson"
+
+    return _RequestBodyStreamingResponse(
+        content,
+        media_type=media_type,
+        headers={
+            "X-Rates-Snapshot-Version": str(snapshot.version),
+            "X-Rates-Base-Currency": snapshot.base_currency,
+            "X-Rates-Last-Modified": str(snapshot.last_modified),
+        },
+    )
+
+
+def _check_length(length: int) -> None:
+    if length > _MAX_LINE_CHARS:
+        msg = f"Line longer than {_MAX_LINE_CHARS} characters"
+        raise BulkConvertLineTooLongError(msg)
+
+
+async def _iter_lines(chunks: AsyncIterable[bytes]) -> AsyncGenerator[str]:
+    """Yield lines of request body (empty ones too), raise `BulkConvertLineTooLongError` for a too long one."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        # * a body without line breaks must not grow the unfinished line without bound
+        _check_length(len(tail))
+        for line in lines:
+            _check_length(len(line))
+            yield line.rstrip("\r")
+    if tail := tail + decoder.decode(b"", final=True):
+        _check_length(len(tail))
+        yield tail.rstrip("\r")
+
+
+def _ends_in_quoted_field(line: str, *, in_quotes: bool) -> bool:
+    """Check if `line` ends inside a quoted CSV field as `csv.reader` parses it (`in_quotes`: starts inside one)."""
+    if not in_quotes and '"' not in line:
+        return False
+    field_start, closed = not in_quotes, False
+    for ch in line:
+        if in_quotes:
+            in_quotes, closed = ch != '"', ch == '"'
+            continue
+        # * quote opens a field only at its start, right after closing quote it is an escaped one
+        in_quotes = ch == '"' and (field_start or closed)
+        field_start, closed = ch == ",", False
+    return in_quotes
+
+
+async def _iter_records(lines: AsyncIterator[str], fmt: BulkConvertFormat) -> AsyncGenerator[str]:
+    """Yield non-empty records: lines, CSV ones joined while a quoted field spans them."""
+    parts: list[str] = []
+    size = 0
+    in_quotes = False
+    async for line in lines:
+        if fmt == "csv":
+            in_quotes = _ends_in_quoted_field(line, in_quotes=in_quotes)
+        if in_quotes or parts:
+            parts.append(line)
+            size += len(line) + 1
+            _check_length(size - 1)
+        if in_quotes:
+            continue
+        if parts:
+            yield "\n".join(parts)
+            parts, size = [], 0
+        elif line:
+            yield line
+    if parts:
+        # * quoted field is never closed, `csv.reader` takes the rest of the body as its value
+        yield "\n".join(parts)
+
+
+async def _iter_chunks(lines: AsyncIterator[str]) -> AsyncGenerator[list[str]]:
+    chunk: list[str] = []
+    try:
+        async for line in lines:
+            chunk.append(line)
+            if len(chunk) >= _CHUNK_ROWS:
+                yield chunk
+                chunk = []
+    except BulkConvertLineTooLongError:
+        # * rows before the too long line are still converted
+        if chunk:
+            yield chunk
+        raise
+    if chunk:
+        yield chunk
+
+
+def _parse_amount(value: str | float) -> float:
+    """Parse amount, raise `_InvalidAmountError` unless it is finite and within `MAX_AMOUNT`."""
+    amount = float(value)
+    if not math.isfinite(amount) or abs(amount) > MAX_AMOUNT:
+        msg = f"Amount out of range: {value}"
+        raise _InvalidAmountError(msg)
+    return amount
+
+
+def _convert_rows(snapshot: CurrencyRateSnapshot, rows: list[_Row]) -> list[tuple[str, str] | None]:
+    """Convert rows to `(amount, rate)`, `None` (and `row.error` set) for rows which can not be converted."""
+    index = snapshot.cross_rates.index
+    for r in rows:
+        if r.error is None and (r.from_currency not in index or r.to_currency not in index):
+            r.error = "unknown currency"
+    valid = [r for r in rows if r.error is None]
+    result = convert_batch(
+        snapshot.cross_rates,
+        [r.amount for r in valid],
+        [r.from_currency for r in valid],
+        [r.to_currency for r in valid],
+    )
+    converted = iter(zip(result.converted, result.rates, strict=True))
+    out: list[tuple[str, str] | None] = []
+    for r in rows:
+        if r.error is not None:
+            out.append(None)
+            continue
+        amount, rate = next(converted)
+        try:
+            out.append((str(round_amount(amount)), str(round_rate(rate))))
+        except ArithmeticError:
+            # * e.g. converted amount overflowed, the row fails but the stream goes on
+            r.error = "conversion failed"
+            out.append(None)
+    return out
+
+
+async def _convert_csv(
+    snapshot: CurrencyRateSnapshot,
+    lines: AsyncIterator[str],
+    columns: list[str],
+) -> AsyncGenerator[bytes]:
+    i_amount, i_from, i_to = (columns.index(c) for c in _CSV_REQUIRED_COLUMNS)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow([*columns, *_CSV_EXTRA_COLUMNS])
+
+    try:
+        async for chunk in _iter_chunks(lines):
+            rows = []
+            for fields in csv.reader(chunk):
+                row = _Row(fields=fields)
+                try:
+                    row.amount = _parse_amount(fields[i_amount])
+                    row.from_currency, row.to_currency = fields[i_from].strip(), fields[i_to].strip()
+                except _InvalidAmountError:
+                    row.error = "invalid amount"
+                except (IndexError, ValueError):
+                    row.error = "invalid row"
+                rows.append(row)
+
+            for row, conv in zip(rows, _convert_rows(snapshot, rows), strict=True):
+                writer.writerow([*row.fields, *(conv or ("", "")), row.error or ""])
+            yield out.getvalue().encode()
+            out.seek(0)
+            out.truncate()
+    except BulkConvertLineTooLongError:
+        # * response status is sent already, the rest of the body is not read
+        writer.writerow([*([""] * len(columns)), "", "", _LINE_TOO_LONG])
+        yield out.getvalue().encode()
+
+
+async def _convert_ndjson(snapshot: CurrencyRateSnapshot, lines: AsyncIterator[str]) -> AsyncGenerator[bytes]:
+    try:
+        async for chunk in _iter_chunks(lines):
+            rows = []
+            for line in chunk:
+                row = _Row(fields={})
+                try:
+                    row.fields = json.loads(line)
+                    row.amount = _parse_amount(row.fields["amount"])
+                    row.from_currency, row.to_currency = str(row.fields["from"]), str(row.fields["to"])
+                except _InvalidAmountError:
+                    row.error = "invalid amount"
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                    row.error = "invalid row"
+                rows.append(row)
+
+            out = []
+            for row, conv in zip(rows, _convert_rows(snapshot, rows), strict=True):
+                fields = row.fields if isinstance(row.fields, dict) else {}
+                if conv:
+                    fields = {**fields, "convertedAmount": conv[0], "convertRate": conv[1]}
+                else:
+                    fields = {**fields, "error": row.error}
+                out.append(json.dumps(fields, separators=(",", ":")))
+            out.append("")
+            yield "\n".join(out).encode()
+    except BulkConvertLineTooLongError:
+        # * response status is sent already, the rest of the body is not read
+        yield (json.dumps({"error": _LINE_TOO_LONG}, separators=(",", ":")) + "\n").encode()
@@ -0,0 +1,117 @@
+"""Cache of final (JSON encoded and compressed) response bodies.
+
+Rate endpoints return the same payload until a new rates snapshot lands, so bodies
+are encoded once per snapshot version and query, then written to the socket as is.
+"""
+
+import gzip
+import logging
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from typing import Final, Literal
+
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli comes with aiohttp[speedups]
+    brotli = None
+
+LOG = logging.getLogger(__name__)
+
+ContentEncoding = Literal["br", "gzip", "identity"]
+
+# * compressing tiny bodies costs more than it saves
+_MIN_COMPRESS_SIZE: Final = 512
+_GZIP_LEVEL: Final = 6
+_BROTLI_QUALITY: Final = 5
+
+
+@dataclass(slots=True)
+class EncodedBody:
+    identity: bytes
+    _encoded: dict[ContentEncoding, bytes] = field(default_factory=dict)
+
+    def get(self, encoding: ContentEncoding) -> bytes:
+        if encoding == "identity":
+            return self.identity
+        if (body := self._encoded.get(encoding)) is None:
+            body = self._encoded[encoding] = _compress(self.identity, encoding)
+        return body
+
+
+def _compress(body: bytes, encoding: ContentEncoding) -> bytes:
+    if encoding == "br" and brotli:
+        return brotli.compress(body, quality=_BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=_GZIP_LEVEL, mtime=0)
+    msg = f"Unsupported content encoding: {encoding}"
+    raise ValueError(msg)
+
+
+class EncodedResponseCache:
+    """LRU of `EncodedBody` by key; keys must include snapshot version, so stale bodies just age out."""
+
+    def __init__(self, *, max_entries: int = 256) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Hashable, EncodedBody] = OrderedDict()
+
+    def get_or_build(self, key: Hashable | None, build: Callable[[], bytes]) -> EncodedBody:
+        """Get cached body by `key`, built with `build` on miss. `None` key builds without caching."""
+        if key is None:
+            return EncodedBody(build())
+        if (entry := self._entries.get(key)) is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        entry = self._entries[key] = EncodedBody(build())
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def negotiate_encoding(accept_encoding: str | None) -> ContentEncoding:
+    """Pick best supported encoding from `Accept-Encoding` header value (brotli preferred over gzip)."""
+    if not accept_encoding:
+        return "identity"
+
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+
+    def _q(encoding: str) -> float:
+        return accepted.get(encoding, accepted.get("*", 0.0))
+
+    if brotli and _q("br") > 0 and _q("br") >= _q("gzip"):
+        return "br"
+    if _q("gzip") > 0:
+        return "gzip"
+    return "identity"
+
+
+def response_encoding(body: EncodedBody, accept_encoding: str | None) -> ContentEncoding:
+    return negotiate_encoding(accept_encoding) if len(body.identity) >= _MIN_COMPRESS_SIZE else "identity"
+
+
+def encoded_response(
+    body: EncodedBody,
+    encoding: ContentEncoding,
+    *,
+    media_type: str = "application/json",
+    headers: dict[str, str] | None = None,
+) -> Response:
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body.get(encoding), media_type=media_type, headers=headers)
@@ -0,0 +1,67 @@
+"""JSON encoding of rate responses without pydantic model construction.
+
+Produces exactly the same bytes as `TypeAdapter(list[CurrencyConvertRateModel]).dump_json(..., by_alias=True)`
+(field names are taken from model aliases), but formats records with a prepared template.
+"""
+
+import json
+import time
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import Final
+
+from finnikacc_api.app_webapi.model import CurrencyConvertRateAge, CurrencyConvertRateModel, CurrencyConvertRateType
+from finnikacc_api.rates.convert import round_rate
+from finnikacc_api.redis.model import CurrencyRateCacheValue, CurrencyRateCacheValueTyped
+
+
+def _alias(field_name: str) -> str:
+    return json.dumps(CurrencyConvertRateModel.model_fields[field_name].alias or field_name)
+
+
+_RECORD_TEMPLATE: Final = (
+    f'{{{_alias("base_currency")}:%s,{_alias("quote_currency")}:%s,{_alias("convert_rate")}:"%s",'
+    f'{_alias("rate_type")}:%s,{_alias("rate_age")}:%s,{_alias("rate_at")}:"%s"}}'
+)
+
+
+@lru_cache(maxsize=1024)
+def _json_str(value: str) -> str:
+    return json.dumps(value)
+
+
+@lru_cache(maxsize=256)
+def _json_utc_timestamp(timestamp: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def _format_rate(rate: str | float) -> str:
+    # * stored rates are `f"{float}"` strings, rounded the same as floats
+    return str(round_rate(rate))
+
+
+def dump_convert_rates_json(
+    base_currency: str,
+    records: Iterable[CurrencyRateCacheValueTyped | CurrencyRateCacheValue],
+    *,
+    rate_type: CurrencyConvertRateType = "recent",
+    rate_age: CurrencyConvertRateAge = "1h",
+) -> bytes:
+    """Encode rate records (typed, or untyped as stored in Redis) as JSON list of `CurrencyConvertRateModel`."""
+    base, r_type, r_age = _json_str(base_currency), _json_str(rate_type), _json_str(rate_age)
+    template = _RECORD_TEMPLATE
+    body = ",".join(
+        [
+            template
+            % (
+                base,
+                _json_str(r["currency"]),
+                _format_rate(r["rate"]),
+                r_type,
+                r_age,
+                _json_utc_timestamp(int(r["last_modified"])),
+            )
+            for r in records
+        ],
+    )
+    return f"[{body}]".encode()
@@ -0,0 +1,110 @@
+"""Conditional requests (`ETag`, `Last-Modified`) and `Cache-Control` for rate endpoints.
+
+Rates only change when the scheduled fetch job lands a new snapshot, so responses
+can be cached by browsers and CDNs until the next planned fetch completes.
+"""
+
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from http import HTTPStatus
+from typing import Final
+
+from fastapi import Response
+
+from finnikacc_api.app_webapi.encoded_response import (
+    ContentEncoding,
+    EncodedBody,
+    encoded_response,
+    response_encoding,
+)
+from finnikacc_api.arqjobs.fetchschedule import next_fetch_conv_rates_at
+from finnikacc_api.redis.snapshot_cache import CurrencyRateSnapshot
+
+_MIN_MAX_AGE_SEC: Final = 10
+# * stale rates are being refreshed in background, let clients come back soon
+_STALE_MAX_AGE_SEC: Final = 60
+
+
+def snapshot_etag(snapshot: CurrencyRateSnapshot, encoding: ContentEncoding, variant: str | None = None) -> str:
+    """Strong ETag of a representation of `snapshot` (distinct per content encoding and body `variant`)."""
+    tag = f"{snapshot.base_currency}-{snapshot.last_modified:x}-{snapshot.request_at:x}"
+    if variant:
+        tag = f"{tag}-{variant}"
+    return f'"{tag}"' if encoding == "identity" else f'"{tag}-{encoding}"'
+
+
+def is_not_modified(
+    etag: str,
+    last_modified: int,
+    *,
+    if_none_match: str | None,
+    if_modified_since: str | None,
+) -> bool:
+    # * RFC 9110 13.2.2: If-Modified-Since is ignored when If-None-Match is present
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified <= int(since.timestamp())
+    return False
+
+
+def cache_control_max_age(now: datetime | None = None, next_fetch_at: int | None = None) -> int:
+    """Seconds until next fetch (planned at `next_fetch_at`, estimated if unknown) is expected to complete."""
+    now = now or datetime.now(UTC)
+    return max(int((next_fetch_conv_rates_at(now, next_fetch_at) - now).total_seconds()), _MIN_MAX_AGE_SEC)
+
+
+def cache_headers(
+    etag: str,
+    last_modified: int,
+    *,
+    now: datetime | None = None,
+    stale: bool = False,
+    next_fetch_at: int | None = None,
+) -> dict[str, str]:
+    max_age = cache_control_max_age(now, next_fetch_at)
+    if stale:
+        max_age = min(max_age, _STALE_MAX_AGE_SEC)
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(datetime.fromtimestamp(last_modified, UTC), usegmt=True),
+        "Cache-Control": f"public, max-age={max_age}",
+    }
+
+
+def conditional_snapshot_response(  # noqa: PLR0913
+    snapshot: CurrencyRateSnapshot,
+    body: EncodedBody,
+    *,
+    accept_encoding: str | None,
+    if_none_match: str | None,
+    if_modified_since: str | None,
+    variant: str | None = None,
+    next_fetch_at: int | None = None,
+) -> Response:
+    """Response with `body` encoded from `snapshot`, or `304 Not Modified` if client already has it.
+
+    `variant` distinguishes bodies which differ for the same snapshot (e.g. rate age growing while stale),
+    such bodies are only validated by `ETag`.
+    """
+    encoding = response_encoding(body, accept_encoding)
+    if not snapshot.rates:
+        # * placeholder data, let clients pick up real rates as soon as they appear
+        return encoded_response(body, encoding, headers={"Cache-Control": "no-cache"})
+
+    etag = snapshot_etag(snapshot, encoding, variant)
+    headers = cache_headers(etag, snapshot.last_modified, stale=snapshot.stale, next_fetch_at=next_fetch_at)
+    if is_not_modified(
+        etag,
+        snapshot.last_modified,
+        if_none_match=if_none_match,
+        # * `Last-Modified` does not change with the variant, the body cached by client may be outdated
+        if_modified_since=None if variant else if_modified_since,
+    ):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers={**headers, "Vary": "Accept-Encoding"})
+    return encoded_response(body, encoding, headers=headers)
@@ -1,19 +1,46 @@
+import asyncio
 import logging
 from datetime import UTC, datetime
-from decimal import Decimal
+from http import HTTPStatus
 from sys import exc_info
-from typing import TYPE_CHECKING, Annotated, Any, Literal
+from typing import Annotated
 
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 
 from finnikacc_api import settings
 from finnikacc_api.app_webapi._data_placeholder import _CURRENCIES, _DATA, _DEFAULT_MAIN_BASE_CURRENCY
+from finnikacc_api.app_webapi.bulk_convert import (
+    BULK_CONVERT_MEDIA_TYPES,
+    BulkConvertFormatError,
+    BulkConvertLineTooLongError,
+    bulk_convert_response,
+)
+from finnikacc_api.app_webapi.encoded_response import EncodedResponseCache, encoded_response, response_encoding
+from finnikacc_api.app_webapi.fast_json import dump_convert_rates_json
+from finnikacc_api.app_webapi.http_caching import cache_control_max_age, conditional_snapshot_response
 from finnikacc_api.app_webapi.middleware import apply_middleware
-from finnikacc_api.app_webapi.model import CurrencyConvertRateModel
-from finnikacc_api.lifecycle.dependencies import CurrRateCacheDep
-
-if TYPE_CHECKING:
-    from finnikacc_api.redis.model import CurrencyRateCacheValueTyped
+from finnikacc_api.app_webapi.model import (
+    ConvertBatchRequestModel,
+    ConvertBatchResponseModel,
+    ConvertedItemModel,
+    CurrencyConvertRateModel,
+    CurrencyConvertRateType,
+    CurrencyRateHistoryModel,
+    CurrencyRatePointModel,
+)
+from finnikacc_api.app_webapi.rate_age import rate_age_of
+from finnikacc_api.lifecycle.dependencies import (
+    CurrRateHistoryCacheDep,
+    CurrRateSnapshotCacheDep,
+    FetchScheduleCacheDep,
+    RatesArchiveDep,
+)
+from finnikacc_api.rates.convert import convert_batch, round_amount, round_rate
+from finnikacc_api.rates.cross_rates import UnknownCurrencyError
+from finnikacc_api.redis.history_cache import CurrencyRateHistoryRedisCache
+from finnikacc_api.redis.model import CurrencyRateAverageWindow
 
 LOG = logging.getLogger(__name__)
 
@@ -21,48 +48,252 @@ LOG = logging.getLogger(__name__)
 app_webapi = FastAPI()
 apply_middleware(app_webapi)
 
+_encoded_responses = EncodedResponseCache()
+_convert_rates_adapter = TypeAdapter(list[CurrencyConvertRateModel])
+_quote_currencies_adapter = TypeAdapter(list[str])
+
 
 @app_webapi.get("/status")
 async def get_status() -> dict[str, str]:
     return {"status": "OK", "version": settings.APP_VERSION}
 
 
-@app_webapi.get("/convert-rates", response_model_by_alias=True)
-async def get_convert_rates(
-    curr_cache: CurrRateCacheDep,
-    base_currency: Literal["USD"] = _DEFAULT_MAIN_BASE_CURRENCY,
+@app_webapi.get("/convert-rates", response_model=list[CurrencyConvertRateModel], response_model_by_alias=True)
+async def get_convert_rates(  # noqa: PLR0913
+    curr_snapshot_cache: CurrRateSnapshotCacheDep,
+    curr_history_cache: CurrRateHistoryCacheDep,
+    fetch_schedule_cache: FetchScheduleCacheDep,
+    *,
+    base_currency: str = _DEFAULT_MAIN_BASE_CURRENCY,
     quote_currencies: Annotated[list[str] | None, Query()] = None,
-) -> list[CurrencyConvertRateModel]:
+    rate_type: CurrencyConvertRateType = "recent",
+    average_window: CurrencyRateAverageWindow = "1d",
+    accept_encoding: Annotated[str | None, Header()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+    if_modified_since: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Recent rates, or (`rate_type=average`) rates averaged over `average_window`."""
+    if rate_type == "average":
+        return await _get_average_convert_rates(
+            curr_history_cache,
+            base_currency,
+            quote_currencies,
+            average_window,
+            accept_encoding=accept_encoding,
+            next_fetch_at=await fetch_schedule_cache.get_next_fetch_at(),
+        )
     try:
-        result: list[CurrencyRateCacheValueTyped]
-        if quote_currencies:
-            result = await curr_cache.hgetall_currencies(base_currency, quote_currencies)
-        else:
-            result = await curr_cache.scan_hgetall_currencies_all(base_currency)
-
-        return [
-            CurrencyConvertRateModel(
-                base_currency=base_currency,
-                quote_currency=r["currency"],
-                convert_rate=round(Decimal(f"{r["rate"]}"), 3), # TODO (ihorh): meh
+        snapshot = await curr_snapshot_cache.get(base_currency)
+        quote_currencies_norm = tuple(sorted(set(quote_currencies))) if quote_currencies else ()
+        rate_age = rate_age_of(snapshot.last_modified)
+        body = _encoded_responses.get_or_build(
+            (
+                ("convert-rates", base_currency, snapshot.version, snapshot.stale, rate_age, quote_currencies_norm)
+                if snapshot.rates
+                else None
+            ),
+            lambda: dump_convert_rates_json(
+                snapshot.base_currency,
+                snapshot.select(quote_currencies_norm),
                 rate_type="recent",
-                rate_age="1h", # TODO (ihorh): of course it is not always correct
-                rate_at=datetime.fromtimestamp(r["last_modified"], UTC),
-            )
-            for r in result
-        ]
+                rate_age=rate_age,
+            ),
+        )
+        return conditional_snapshot_response(
+            snapshot,
+            body,
+            accept_encoding=accept_encoding,
+            if_none_match=if_none_match,
+            if_modified_since=if_modified_since,
+            variant=rate_age,
+            next_fetch_at=await fetch_schedule_cache.get_next_fetch_at(),
+        )
+    except UnknownCurrencyError as e:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=str(e)) from e
     except:  # noqa: E722 # TODO (ihorh): of course this is temporary until all edgecases are handled
         LOG.warning("Error fetching or converting currency data. Returning default placeholder", exc_info=exc_info())
-    return _DATA
-
-
-@app_webapi.get("/quote-currencies")
-async def get_quote_currencies(
-    curr_cache: CurrRateCacheDep,
-    base_currency: Literal["USD"] = _DEFAULT_MAIN_BASE_CURRENCY,
-) -> list[Any]:
-    result = [
-        r["currency"]
-        for r in await curr_cache.scan_hgetall_currencies_all(base_currency)
-    ]
-    return result or [base_currency, *_CURRENCIES]
+    return Response(_convert_rates_adapter.dump_json(_DATA, by_alias=True), media_type="application/json")
+
+
+async def _get_average_convert_rates(  # noqa: PLR0913
+    curr_history_cache: CurrencyRateHistoryRedisCache,
+    base_currency: str,
+    quote_currencies: list[str] | None,
+    average_window: CurrencyRateAverageWindow,
+    *,
+    accept_encoding: str | None,
+    next_fetch_at: int | None,
+) -> Response:
+    try:
+        averages = await curr_history_cache.get_averages(base_currency, average_window)
+    except UnknownCurrencyError as e:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=str(e)) from e
+    if not averages:
+        raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail="Average rates are not available")
+
+    quotes = set(quote_currencies or ())
+    last_at = max(a["last_modified"] for a in averages)
+    body = _encoded_responses.get_or_build(
+        ("convert-rates-average", base_currency, average_window, last_at, tuple(sorted(quotes))),
+        lambda: dump_convert_rates_json(
+            base_currency,
+            [a for a in averages if not quotes or a["currency"] in quotes],
+            rate_type="average",
+            rate_age=average_window,
+        ),
+    )
+    return encoded_response(
+        body,
+        response_encoding(body, accept_encoding),
+        headers={"Cache-Control": f"public, max-age={cache_control_max_age(next_fetch_at=next_fetch_at)}"},
+    )
+
+
+def _utc_timestamp(dt: datetime) -> int:
+    # * naive datetimes are taken as UTC
+    return int(dt.replace(tzinfo=dt.tzinfo or UTC).timestamp())
+
+
+@app_webapi.get("/convert-rates/history", response_model_by_alias=True)
+async def get_convert_rates_history(  # noqa: PLR0913
+    curr_history_cache: CurrRateHistoryCacheDep,
+    rates_archive: RatesArchiveDep,
+    *,
+    quote_currency: str,
+    base_currency: str = _DEFAULT_MAIN_BASE_CURRENCY,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> CurrencyRateHistoryModel:
+    """Rates of one currency pair between `start` and `end` (by default, whole retained history).
+
+    Recent history is served from Redis, older ranges from the on-disk archive (if enabled).
+    """
+    now = int(datetime.now(UTC).timestamp())
+    start_ts = _utc_timestamp(start) if start else 0
+    end_ts = _utc_timestamp(end) if end else now
+    if rates_archive and start_ts < now - curr_history_cache.retention_seconds:
+        points = await asyncio.to_thread(rates_archive.series, base_currency, quote_currency, start_ts, end_ts)
+    else:
+        points = await curr_history_cache.get_range(base_currency, quote_currency, start=start_ts, end=end_ts)
+    return CurrencyRateHistoryModel(
+        base_currency=base_currency,
+        quote_currency=quote_currency,
+        items=[
+            CurrencyRatePointModel(convert_rate=round_rate(rate), rate_at=datetime.fromtimestamp(at, UTC))
+            for at, rate in points
+        ],
+    )
+
+
+@app_webapi.get("/convert-rates/history/at", response_model_by_alias=True)
+async def get_convert_rate_at(
+    curr_history_cache: CurrRateHistoryCacheDep,
+    rates_archive: RatesArchiveDep,
+    quote_currency: str,
+    at: datetime,
+    base_currency: str = _DEFAULT_MAIN_BASE_CURRENCY,
+) -> CurrencyRatePointModel:
+    """Rate of one currency pair in effect at `at` (the latest one stored at or before it)."""
+    at_ts = _utc_timestamp(at)
+    point: tuple[int, float] | None
+    if rates_archive:
+        point = await asyncio.to_thread(rates_archive.rate_at, base_currency, quote_currency, at_ts)
+    else:
+        points = await curr_history_cache.get_range(
+            base_currency,
+            quote_currency,
+            start=at_ts - curr_history_cache.retention_seconds,
+            end=at_ts,
+        )
+        point = points[-1] if points else None
+    if not point:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="No rate stored for this time")
+    return CurrencyRatePointModel(convert_rate=round_rate(point[1]), rate_at=datetime.fromtimestamp(point[0], UTC))
+
+
+@app_webapi.get("/quote-currencies", response_model=list[str])
+async def get_quote_currencies(  # noqa: PLR0913
+    curr_snapshot_cache: CurrRateSnapshotCacheDep,
+    fetch_schedule_cache: FetchScheduleCacheDep,
+    *,
+    base_currency: str = _DEFAULT_MAIN_BASE_CURRENCY,
+    accept_encoding: Annotated[str | None, Header()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+    if_modified_since: Annotated[str | None, Header()] = None,
+) -> Response:
+    try:
+        snapshot = await curr_snapshot_cache.get(base_currency)
+    except UnknownCurrencyError as e:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=str(e)) from e
+    body = _encoded_responses.get_or_build(
+        ("quote-currencies", base_currency, snapshot.version, snapshot.stale) if snapshot.rates else None,
+        lambda: _quote_currencies_adapter.dump_json(list(snapshot.rates) or [base_currency, *_CURRENCIES]),
+    )
+    return conditional_snapshot_response(
+        snapshot,
+        body,
+        accept_encoding=accept_encoding,
+        if_none_match=if_none_match,
+        if_modified_since=if_modified_since,
+        next_fetch_at=await fetch_schedule_cache.get_next_fetch_at(),
+    )
+
+
+@app_webapi.post("/convert", response_model_by_alias=True)
+async def post_convert(
+    curr_snapshot_cache: CurrRateSnapshotCacheDep,
+    batch: ConvertBatchRequestModel,
+) -> ConvertBatchResponseModel:
+    snapshot = await curr_snapshot_cache.get()
+    if not snapshot.rates:
+        raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail="Currency rates are not available")
+
+    items = batch.items
+    try:
+        result = convert_batch(
+            snapshot.cross_rates,
+            [float(i.amount) for i in items],
+            [i.from_currency for i in items],
+            [i.to_currency for i in items],
+        )
+    except UnknownCurrencyError as e:
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=str(e)) from e
+
+    return ConvertBatchResponseModel(
+        snapshot_version=snapshot.version,
+        rate_at=datetime.fromtimestamp(snapshot.last_modified, UTC),
+        items=[
+            ConvertedItemModel(
+                amount=i.amount,
+                from_currency=i.from_currency,
+                to_currency=i.to_currency,
+                converted_amount=round_amount(converted),
+                convert_rate=round_rate(rate),
+            )
+            for i, rate, converted in zip(items, result.rates, result.converted, strict=True)
+        ],
+    )
+
+
+@app_webapi.post("/convert/stream", response_class=StreamingResponse)
+async def post_convert_stream(
+    curr_snapshot_cache: CurrRateSnapshotCacheDep,
+    request: Request,
+    content_type: Annotated[str, Header()] = "text/csv",
+) -> StreamingResponse:
+    """Convert CSV (`amount,from,to` columns) or NDJSON rows streamed in request body."""
+    fmt = BULK_CONVERT_MEDIA_TYPES.get(content_type.partition(";")[0].strip().lower())
+    if not fmt:
+        raise HTTPException(status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE, detail="Expected text/csv or NDJSON body")
+
+    # * snapshot is pinned for the whole stream, so all rows are converted with the same rates
+    snapshot = await curr_snapshot_cache.get()
+    if not snapshot.rates:
+        raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail="Currency rates are not available")
+
+    try:
+        return await bulk_convert_response(snapshot, request.stream(), fmt)
+    except BulkConvertLineTooLongError as e:
+        raise HTTPException(status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE, detail=str(e)) from e
+    except BulkConvertFormatError as e:
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=str(e)) from e
@@ -1,8 +1,10 @@
 import logging
-from collections.abc import Awaitable, Callable
+import re
+from collections.abc import Iterable, Sequence
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from finnikacc_api import settings
 
@@ -11,26 +13,50 @@ LOG = logging.getLogger(__name__)
 _ALLOWED_ORIGINS = settings.app.API_WEB_ALLOW_ORIGINS
 
 
-def apply_middleware(app: FastAPI) -> None:
-    @app.middleware("http")
-    async def _check_origin_referer(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
-        origin = request.headers.get("origin")
-        referer = request.headers.get("referer")
+class OriginRefererMiddleware:
+    """Rejects requests with `Origin` not in `allowed_origins` or `Referer` not starting with one of them.
 
-        if origin and origin not in _ALLOWED_ORIGINS:
-            LOG.debug("Invalid origin %s", origin)
-            return Response(status_code=500)
+    Pure ASGI: raw scope headers are checked before anything else is allocated for the request.
+    """
 
-        if referer and not any(referer.startswith(allowed) for allowed in _ALLOWED_ORIGINS):
-            LOG.debug("Invalid refereer %s", referer)
-            return Response(status_code=500)
+    def __init__(self, app: ASGIApp, *, allowed_origins: Iterable[str]) -> None:
+        self._app = app
+        origins = [o.encode("latin-1") for o in allowed_origins]
+        self._origins = frozenset(origins)
+        # * one precompiled alternation, longest first, instead of `startswith` per allowed origin
+        self._referer_prefix = (
+            re.compile(b"|".join(re.escape(o) for o in sorted(origins, key=len, reverse=True))) if origins else None
+        )
 
-        return await call_next(request)
+    def _allowed(self, name: bytes, value: bytes) -> bool:
+        if name == b"origin":
+            allowed = value in self._origins
+        else:
+            allowed = bool(self._referer_prefix and self._referer_prefix.match(value))
+        if not allowed:
+            LOG.debug("Invalid %s %s", name.decode(), value)
+        return allowed
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                # * ASGI header names are lowercase, empty header is treated as absent
+                if value and name in (b"origin", b"referer") and not self._allowed(name, value):
+                    await send({"type": "http.response.start", "status": 500, "headers": [(b"content-length", b"0")]})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+
+        await self._app(scope, receive, send)
+
+
+def apply_middleware(app: FastAPI, allowed_origins: Sequence[str] = _ALLOWED_ORIGINS) -> None:
+    app.add_middleware(OriginRefererMiddleware, allowed_origins=allowed_origins)
 
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=_ALLOWED_ORIGINS,
+        allow_origins=allowed_origins,
         allow_credentials=True,
         allow_methods=["GET", "POST"],
         allow_headers=["*"],
+        max_age=settings.app.API_WEB_CORS_MAX_AGE_SEC,
     )
@@ -4,8 +4,10 @@ from typing import Annotated, Literal
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from finnikacc_api.rates.convert import MAX_AMOUNT
+
 CurrencyConvertRateType = Literal["recent", "average"]
-CurrencyConvertRateAge = Literal["1h", "1d", "2d", "outdated"]
+CurrencyConvertRateAge = Literal["1h", "1d", "2d", "7d", "outdated"]
 
 
 class BaseConvertModel(BaseModel):
@@ -21,3 +23,43 @@ class CurrencyConvertRateModel(BaseConvertModel):
     rate_type: Annotated[CurrencyConvertRateType, Field(alias="rateType")]
     rate_age: Annotated[CurrencyConvertRateAge, Field(alias="rateAge")]
     rate_at: Annotated[datetime, Field(alias="rateAt")]
+
+
+class ConvertItemModel(BaseConvertModel):
+    model_config = ConfigDict(validate_by_name=True)
+
+    amount: Annotated[Decimal, Field(ge=-MAX_AMOUNT, le=MAX_AMOUNT)]
+    from_currency: Annotated[str, Field(alias="from")]
+    to_currency: Annotated[str, Field(alias="to")]
+
+
+class ConvertBatchRequestModel(BaseConvertModel):
+    items: Annotated[list[ConvertItemModel], Field(max_length=10_000)]
+
+
+class ConvertedItemModel(ConvertItemModel):
+    converted_amount: Annotated[Decimal, Field(alias="convertedAmount")]
+    convert_rate: Annotated[Decimal, Field(alias="convertRate")]
+
+
+class ConvertBatchResponseModel(BaseConvertModel):
+    model_config = ConfigDict(validate_by_name=True)
+
+    snapshot_version: Annotated[int, Field(alias="snapshotVersion")]
+    rate_at: Annotated[datetime, Field(alias="rateAt")]
+    items: list[ConvertedItemModel]
+
+
+class CurrencyRatePointModel(BaseConvertModel):
+    model_config = ConfigDict(validate_by_name=True)
+
+    convert_rate: Annotated[Decimal, Field(alias="convertRate")]
+    rate_at: Annotated[datetime, Field(alias="rateAt")]
+
+
+class CurrencyRateHistoryModel(BaseConvertModel):
+    model_config = ConfigDict(validate_by_name=True)
+
+    base_currency: Annotated[str, Field(alias="baseCurrency")]
+    quote_currency: Annotated[str, Field(alias="quoteCurrency")]
+    items: list[CurrencyRatePointModel]
@@ -0,0 +1,22 @@
+import time
+from datetime import timedelta
+from typing import Final
+
+from finnikacc_api.app_webapi.model import CurrencyConvertRateAge
+
+# * hourly rates land a few minutes after the hour (fetch schedule plus job run time)
+_RATE_AGE_SLACK: Final = timedelta(minutes=15)
+_RATE_AGE_LIMITS: Final[tuple[tuple[float, CurrencyConvertRateAge], ...]] = (
+    ((timedelta(hours=1) + _RATE_AGE_SLACK).total_seconds(), "1h"),
+    ((timedelta(days=1) + _RATE_AGE_SLACK).total_seconds(), "1d"),
+    ((timedelta(days=2) + _RATE_AGE_SLACK).total_seconds(), "2d"),
+)
+
+
+def rate_age_of(last_modified: int, now: float | None = None) -> CurrencyConvertRateAge:
+    """Age bucket of rates last modified at `last_modified` (timestamp seconds)."""
+    age = (time.time() if now is None else now) - last_modified
+    for limit, rate_age in _RATE_AGE_LIMITS:
+        if age <= limit:
+            return rate_age
+    return "outdated"
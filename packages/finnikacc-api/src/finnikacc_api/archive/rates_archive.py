@@ -0,0 +1,231 @@
+"""Append-only columnar archive of rate snapshots on local disk.
+
+Rates are stored for pivot base currency only (other pairs are derived as cross rates),
+one directory per month (`{root}/{pivot}/{YYYY-MM}/`) holds:
+
+    timestamps.i64  int64 rates timestamps, ascending, one row per snapshot
+    {CUR}.f64       float64 rate of a currency per row, NaN where it was not in the snapshot
+
+Rows are appended to currency columns first and to `timestamps.i64` last, so the timestamps
+column defines how many rows are complete (a column cut short by a crash is truncated on the next append).
+Queries memory-map the files and only touch the pages they need: rows are found by binary search.
+
+Archive has a single writer (see `RATES_ARCHIVE_WRITER` setting), other processes open it read-only.
+"""
+
+import bisect
+import contextlib
+import logging
+import math
+import mmap
+import shutil
+import sys
+from array import array
+from collections import defaultdict
+from collections.abc import Generator, Iterator, Mapping
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Final
+
+from finnikacc_api.rates.cross_rates import PIVOT_CURRENCY
+
+LOG = logging.getLogger(__name__)
+
+_TIMESTAMPS_FILE: Final = "timestamps.i64"
+_COLUMN_SUFFIX: Final = ".f64"
+_ITEM_SIZE: Final = 8
+_MONTH_DIR_NAME_LEN: Final = len("YYYY-MM")
+
+
+def _month_of(at: int) -> str:
+    return datetime.fromtimestamp(at, UTC).strftime("%Y-%m")
+
+
+@contextlib.contextmanager
+def _mapped(path: Path, typecode: str) -> Generator[memoryview]:
+    """Read-only view of a column file (empty if file is missing or empty)."""
+    try:
+        f = path.open("rb")
+    except FileNotFoundError:
+        yield memoryview(array(typecode))
+        return
+    with f:
+        if path.stat().st_size < _ITEM_SIZE:
+            yield memoryview(array(typecode))
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            size = len(view) - len(view) % _ITEM_SIZE
+            column = view[:size].cast(typecode)
+            try:
+                yield column
+            finally:
+                # * views must be released before mmap can be closed
+                column.release()
+                view.release()
+
+
+class RatesArchive:
+    def __init__(self, root: Path | str, *, pivot: str = PIVOT_CURRENCY, writable: bool = True) -> None:
+        if sys.byteorder != "little":
+            # ! columns are written and read in native byte order, files are only portable between little-endian hosts
+            msg = "Rates archive requires little-endian host"
+            raise RuntimeError(msg)
+        self._root = Path(root)
+        self._pivot = pivot
+        self.writable = writable
+
+    def _check_writable(self) -> None:
+        if not self.writable:
+            msg = "Rates archive is read-only in this process (RATES_ARCHIVE_WRITER is not set)"
+            raise RuntimeError(msg)
+
+    def _month_dirs(self) -> list[Path]:
+        pivot_dir = self._root / self._pivot
+        if not pivot_dir.is_dir():
+            return []
+        # * skip temporary directories of `merge`
+        return sorted(p for p in pivot_dir.iterdir() if p.is_dir() and len(p.name) == _MONTH_DIR_NAME_LEN)
+
+    # * ----------------------------------------
+    # * write
+    # * ----------------------------------------
+
+    def append(self, at: int, rates: Mapping[str, float]) -> bool:
+        """Append pivot rates taken at `at` (timestamp seconds). Returns `False` if it is not newer than last row."""
+        self._check_writable()
+        month_dir = self._root / self._pivot / _month_of(at)
+        month_dir.mkdir(parents=True, exist_ok=True)
+        timestamps_path = month_dir / _TIMESTAMPS_FILE
+
+        with _mapped(timestamps_path, "q") as timestamps:
+            rows = len(timestamps)
+            if rows and timestamps[-1] >= at:
+                return False
+
+        columns = {p.name.removesuffix(_COLUMN_SUFFIX) for p in month_dir.glob(f"*{_COLUMN_SUFFIX}")}
+        for currency in columns | set(rates):
+            path = month_dir / f"{currency}{_COLUMN_SUFFIX}"
+            with path.open("ab") as f:
+                size = f.tell()
+                if size > rows * _ITEM_SIZE:
+                    f.truncate(rows * _ITEM_SIZE)
+                    size = rows * _ITEM_SIZE
+                # * currency new this month: rows before it are NaN
+                missing = rows - size // _ITEM_SIZE
+                f.write(array("d", [math.nan] * missing + [rates.get(currency, math.nan)]).tobytes())
+
+        with timestamps_path.open("ab") as f:
+            f.truncate(rows * _ITEM_SIZE)
+            f.write(array("q", [at]).tobytes())
+        return True
+
+    def merge(self, rows: Mapping[int, Mapping[str, float]]) -> int:
+        """Add pivot rates `{timestamp: {currency: rate}}` in any order (e.g. backfilled history).
+
+        Rows with timestamps already present are ignored. Rows newer than the last one of their month
+        are appended in place, otherwise the month is rewritten. Returns number of added rows.
+        """
+        self._check_writable()
+        by_month: dict[str, dict[int, Mapping[str, float]]] = defaultdict(dict)
+        for at, rates in rows.items():
+            by_month[_month_of(at)][at] = rates
+        return sum(self._merge_month(self._root / self._pivot / m, month_rows) for m, month_rows in by_month.items())
+
+    def _merge_month(self, month_dir: Path, rows: dict[int, Mapping[str, float]]) -> int:
+        with _mapped(month_dir / _TIMESTAMPS_FILE, "q") as timestamps:
+            existing = timestamps.tolist()
+        existing_ats = set(existing)
+        rows = {at: r for at, r in rows.items() if at not in existing_ats}
+        if not rows:
+            return 0
+        if not existing or min(rows) > existing[-1]:
+            return sum(self.append(at, rows[at]) for at in sorted(rows))
+
+        names = [p.name.removesuffix(_COLUMN_SUFFIX) for p in month_dir.glob(f"*{_COLUMN_SUFFIX}")]
+        columns = {c: self._column(month_dir, c, 0, len(existing)) for c in names}
+        row_of = {at: i for i, at in enumerate(existing)}
+        merged_ats = sorted([*existing, *rows])
+        currencies = set(columns).union(*rows.values())
+
+        # * month is written aside and swapped in, readers never see partially merged columns
+        tmp_dir = month_dir.with_name(f"{month_dir.name}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir()
+        for c in currencies:
+            values = [
+                columns[c][row_of[at]] if at in row_of and c in columns else rows.get(at, {}).get(c, math.nan)
+                for at in merged_ats
+            ]
+            (tmp_dir / f"{c}{_COLUMN_SUFFIX}").write_bytes(array("d", values).tobytes())
+        (tmp_dir / _TIMESTAMPS_FILE).write_bytes(array("q", merged_ats).tobytes())
+
+        old_dir = month_dir.with_name(f"{month_dir.name}.old")
+        month_dir.rename(old_dir)
+        tmp_dir.rename(month_dir)
+        shutil.rmtree(old_dir)
+        LOG.info("Merged %s rows into rates archive %s", len(rows), month_dir)
+        return len(rows)
+
+    # * ----------------------------------------
+    # * read
+    # * ----------------------------------------
+
+    def rate_at(self, base_currency: str, quote_currency: str, at: int) -> tuple[int, float] | None:
+        """Latest `(timestamp, rate)` at or before `at`, `None` if archive has nothing that old."""
+        month = _month_of(at)
+        month_dirs = [d for d in self._month_dirs() if d.name <= month]
+        for month_dir in reversed(month_dirs):
+            with _mapped(month_dir / _TIMESTAMPS_FILE, "q") as timestamps:
+                rows = bisect.bisect_right(timestamps, at)
+            # * rows where the pair is missing are skipped, looking further back
+            if point := next(self._rows_backwards(month_dir, base_currency, quote_currency, rows), None):
+                return point
+        return None
+
+    def series(self, base_currency: str, quote_currency: str, start: int, end: int) -> list[tuple[int, float]]:
+        """`(timestamp, rate)` points with `start <= timestamp <= end`."""
+        first, last = _month_of(start), _month_of(end)
+        points: list[tuple[int, float]] = []
+        for month_dir in self._month_dirs():
+            if not first <= month_dir.name <= last:
+                continue
+            with _mapped(month_dir / _TIMESTAMPS_FILE, "q") as timestamps:
+                lo, hi = bisect.bisect_left(timestamps, start), bisect.bisect_right(timestamps, end)
+                row_ats = timestamps[lo:hi].tolist()
+            rates = self._pair_rates(month_dir, base_currency, quote_currency, lo, hi)
+            points.extend((row_at, rate) for row_at, rate in zip(row_ats, rates, strict=True) if not math.isnan(rate))
+        return points
+
+    def _rows_backwards(
+        self,
+        month_dir: Path,
+        base_currency: str,
+        quote_currency: str,
+        rows: int,
+    ) -> Iterator[tuple[int, float]]:
+        step = 64
+        hi = rows
+        while hi > 0:
+            lo = max(hi - step, 0)
+            with _mapped(month_dir / _TIMESTAMPS_FILE, "q") as timestamps:
+                row_ats = timestamps[lo:hi].tolist()
+            rates = self._pair_rates(month_dir, base_currency, quote_currency, lo, hi)
+            for row_at, rate in zip(reversed(row_ats), reversed(rates), strict=True):
+                if not math.isnan(rate):
+                    yield row_at, rate
+            hi = lo
+
+    def _pair_rates(self, month_dir: Path, base_currency: str, quote_currency: str, lo: int, hi: int) -> list[float]:
+        """Rates of pair for rows `lo:hi`, derived from pivot columns (NaN where any of them is missing)."""
+        base = self._column(month_dir, base_currency, lo, hi)
+        quote = self._column(month_dir, quote_currency, lo, hi)
+        return [q / b if b else math.nan for b, q in zip(base, quote, strict=True)]
+
+    def _column(self, month_dir: Path, currency: str, lo: int, hi: int) -> list[float]:
+        if currency == self._pivot:
+            return [1.0] * (hi - lo)
+        with _mapped(month_dir / f"{currency}{_COLUMN_SUFFIX}", "d") as column:
+            values = column[lo:hi].tolist()
+        # * column can be shorter than timestamps while a row is being appended
+        return values + [math.nan] * (hi - lo - len(values))
@@ -1,13 +1,105 @@
+import time
 from collections.abc import Sequence
+from datetime import UTC, datetime, timedelta
+from typing import Final
 
+from arq import ArqRedis
 from arq.cron import CronJob, cron
+from arq.jobs import Job
 from arq.typing import WorkerCoroutine
-from arq.worker import Function
+from arq.worker import Function, func
 
-from finnikacc_api.arqjobs.fetchrates import fetch_conv_rates_oex
+from finnikacc_api.arqjobs.fetchrates import fetch_conv_rates
+from finnikacc_api.arqjobs.fetchschedule import (
+    FETCH_TIMEOUT_SEC,
+    next_fetch_conv_rates_at,
+    plan_next_conv_rates_fetch,
+)
+from finnikacc_api.lifecycle.dependencies import get_ext_deps_from_dict, get_int_deps_from_dict
+from finnikacc_api.redis.fetch_schedule_cache import FetchScheduleRedisCache
 
-arq_functions: Sequence[WorkerCoroutine | Function] = []
+# * out-of-schedule fetches are deduplicated: at most one per this period
+_REFRESH_CONV_RATES_PERIOD_SEC: Final = 300
+
+
+async def refresh_conv_rates(ctx: dict) -> None:
+    """Out-of-schedule rates fetch (see `enqueue_refresh_conv_rates`)."""
+    await _fetch_conv_rates_leased(ctx)
+
+
+async def scheduled_fetch_conv_rates(ctx: dict) -> None:
+    """Fetch rates, then plan and enqueue the next scheduled fetch (see `fetchschedule`)."""
+    try:
+        await _fetch_conv_rates_leased(ctx)
+    finally:
+        await _schedule_next_fetch(ctx)
+
+
+async def _fetch_conv_rates_leased(ctx: dict) -> None:
+    """Fetch rates under the fleet-wide lease, at most once per arq job id (the tick), see `fetch_lease`."""
+    fetch_lease = get_int_deps_from_dict(ctx).fetch_lease
+    if not (lease := await fetch_lease.acquire(ctx["job_id"])):
+        return
+    completed = False
+    try:
+        await fetch_conv_rates(ctx, lease=lease)
+        completed = True
+    finally:
+        await fetch_lease.release(lease, completed=completed)
+
+
+async def ensure_conv_rates_fetch_scheduled(ctx: dict) -> None:
+    """Plan a fetch if none is planned: on first start, or when the chain of scheduled fetches got broken."""
+    ideps = get_int_deps_from_dict(ctx)
+    planned_at = await ideps.fetch_schedule_cache.get_next_fetch_at(fresh=True)
+    # * planned fetch may be running or waiting for a busy worker, give it some time
+    if planned_at is None or planned_at + 2 * FETCH_TIMEOUT_SEC < time.time():
+        await _schedule_next_fetch(ctx)
+
+
+async def _schedule_next_fetch(ctx: dict) -> None:
+    next_at = await plan_next_conv_rates_fetch(get_int_deps_from_dict(ctx))
+    await get_ext_deps_from_dict(ctx).arq_redis.enqueue_job(
+        _scheduled_fetch_conv_rates.name,
+        _job_id=f"{_scheduled_fetch_conv_rates.name}:{next_at}",
+        _defer_until=datetime.fromtimestamp(next_at, UTC),
+    )
+
+
+_refresh_conv_rates = func(refresh_conv_rates, name="refresh_conv_rates", timeout=FETCH_TIMEOUT_SEC, max_tries=1)
+_scheduled_fetch_conv_rates = func(
+    scheduled_fetch_conv_rates,
+    name="scheduled_fetch_conv_rates",
+    timeout=FETCH_TIMEOUT_SEC,
+    max_tries=1,
+)
+
+arq_functions: Sequence[WorkerCoroutine | Function] = [
+    _refresh_conv_rates,
+    _scheduled_fetch_conv_rates,
+]
 
 arq_cron_jobs: Sequence[CronJob] = [
-    cron(fetch_conv_rates_oex, hour=set(range(24)), minute=4, run_at_startup=True, timeout=60),
+    cron(ensure_conv_rates_fetch_scheduled, minute=set(range(0, 60, 10)), run_at_startup=True, timeout=30),
 ]
+
+
+async def enqueue_refresh_conv_rates(
+    arq_redis: ArqRedis,
+    fetch_schedule_cache: FetchScheduleRedisCache | None = None,
+) -> Job | None:
+    """Enqueue out-of-schedule rates fetch.
+
+    Returns `None` if one was already enqueued recently, or if the next scheduled fetch (as planned
+    in `fetch_schedule_cache`) completes within the same period anyway and spares the request quota.
+    """
+    if fetch_schedule_cache:
+        now = datetime.now(UTC)
+        next_at = next_fetch_conv_rates_at(now, await fetch_schedule_cache.get_next_fetch_at())
+        if next_at - now <= timedelta(seconds=_REFRESH_CONV_RATES_PERIOD_SEC):
+            return None
+    period = int(time.time()) // _REFRESH_CONV_RATES_PERIOD_SEC
+    return await arq_redis.enqueue_job(
+        _refresh_conv_rates.name,
+        _job_id=f"{_refresh_conv_rates.name}:{period}",
+    )
@@ -0,0 +1,173 @@
+"""Backfill of historical daily rates from OEX (`historical/{date}.json`).
+
+Days are fetched with bounded concurrency over the shared `oex_client` session and written in bulk:
+one archive merge and one Redis transaction per batch of days. Fetched days are checkpointed in that
+same Redis transaction, so an interrupted backfill resumes where it stopped. Number of requests is
+capped by `RequestBudget`, derived from remaining OEX quota so that the hourly fetch keeps working.
+"""
+
+import asyncio
+import itertools
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta
+from http import HTTPStatus
+from typing import Final, Literal
+
+import aiohttp
+
+from finnikacc_api.arqjobs.fetchrates import _ALLOWED_CURRENCIES
+from finnikacc_api.lifecycle.dependencies import ExternalDependencies, InternalDependencies
+from finnikacc_api.providers.oex import fetch_oex_usage
+
+LOG = logging.getLogger(__name__)
+
+_BASE_CURRENCY: Final = "USD"
+# * left to scheduled fetches per remaining day of quota period (at least hourly)
+_RESERVED_REQUESTS_PER_DAY: Final = 24
+
+
+@dataclass(slots=True, kw_only=True)
+class RequestBudget:
+    limit: int
+    used: int = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(self.limit - self.used, 0)
+
+    def try_acquire(self) -> bool:
+        if self.used >= self.limit:
+            return False
+        self.used += 1
+        return True
+
+    def exhaust(self) -> None:
+        self.used = max(self.used, self.limit)
+
+
+@dataclass(slots=True, kw_only=True, frozen=True)
+class BackfillResult:
+    fetched: int
+    skipped: int
+    failed: int
+    budget_exhausted: bool
+
+
+async def oex_request_budget(
+    oex_client: aiohttp.ClientSession,
+    *,
+    max_requests: int,
+    reserve: int | None = None,
+) -> RequestBudget:
+    """Budget of at most `max_requests`, limited by remaining OEX quota minus `reserve`.
+
+    By default `reserve` covers hourly fetches for the rest of quota period. If usage can not be read,
+    budget is just `max_requests`.
+    """
+    usage = await fetch_oex_usage(oex_client)
+    if not usage:
+        LOG.warning("OEX usage is unknown, budget is %s requests", max_requests)
+        return RequestBudget(limit=max_requests)
+    remaining = usage.requests_remaining
+    if remaining < 0:
+        # * unlimited plan
+        return RequestBudget(limit=max_requests)
+    if reserve is None:
+        reserve = usage.days_remaining * _RESERVED_REQUESTS_PER_DAY
+    limit = max(min(max_requests, remaining - reserve), 0)
+    LOG.info("OEX requests remaining: %s, reserved: %s, budget: %s", remaining, reserve, limit)
+    return RequestBudget(limit=limit)
+
+
+async def backfill_conv_rates_oex(  # noqa: PLR0913
+    edeps: ExternalDependencies,
+    ideps: InternalDependencies,
+    *,
+    start: date,
+    end: date,
+    budget: RequestBudget,
+    concurrency: int = 4,
+    batch_days: int = 31,
+) -> BackfillResult:
+    """Fetch and store daily rates for days `start..end` (inclusive) not fetched by previous runs."""
+    history_cache = ideps.currency_rate_history_cache
+    if ideps.rates_archive and not ideps.rates_archive.writable:
+        # * days would be checkpointed as done (for all processes) without being archived
+        msg = "Rates archive is read-only in this process, run backfill with RATES_ARCHIVE_WRITER set"
+        raise RuntimeError(msg)
+    if not ideps.rates_archive:
+        # * without archive only days within Redis history retention can be stored
+        oldest = (datetime.now(UTC) - timedelta(seconds=history_cache.retention_seconds)).date()
+        if start < oldest:
+            LOG.warning("Rates archive is disabled, backfilling from %s instead of %s", oldest, start)
+            start = oldest
+
+    done = await history_cache.get_checkpoint(_BASE_CURRENCY)
+    days = [d for d in _days(start, end) if d.isoformat() not in done]
+    skipped = (end - start).days + 1 - len(days) if end >= start else 0
+    LOG.info("Backfilling %s days (%s already done), budget %s requests", len(days), skipped, budget.remaining)
+
+    fetched = failed = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    for batch in itertools.batched(days, batch_days, strict=False):
+        if not budget.remaining:
+            break
+        results = await asyncio.gather(*(_fetch_day(edeps.oex_client, d, semaphore, budget) for d in batch))
+        snapshots = {d: r for d, r in zip(batch, results, strict=True) if r}
+        failed += sum(1 for r in results if r is False)
+        if snapshots:
+            await _store_days(ideps, snapshots)
+            fetched += len(snapshots)
+
+    result = BackfillResult(fetched=fetched, skipped=skipped, failed=failed, budget_exhausted=not budget.remaining)
+    LOG.info("Backfill finished: %s", result)
+    return result
+
+
+def _days(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+async def _fetch_day(
+    oex_client: aiohttp.ClientSession,
+    day: date,
+    semaphore: asyncio.Semaphore,
+    budget: RequestBudget,
+) -> tuple[int, dict[str, float]] | Literal[False] | None:
+    """`(timestamp, rates)` of the day, `False` if request failed, `None` if it was not made (no budget)."""
+    async with semaphore:
+        if not budget.try_acquire():
+            return None
+        endpoint = f"historical/{day.isoformat()}.json"
+        try:
+            async with oex_client.get(endpoint) as response:
+                if response.status == HTTPStatus.TOO_MANY_REQUESTS:
+                    LOG.warning("OEX quota exceeded, stopping backfill")
+                    budget.exhaust()
+                    return False
+                if response.status != HTTPStatus.OK:
+                    LOG.warning("HTTP Status: %s. Endpoint: '%s' @ OEX", response.status, endpoint)
+                    return False
+                data = await response.json()
+        except aiohttp.ClientError:
+            LOG.warning("Request failed. Endpoint: '%s' @ OEX", endpoint, exc_info=True)
+            return False
+
+    if data.get("base") != _BASE_CURRENCY:
+        LOG.warning("Unexpected base currency '%s' for %s. Skipping.", data.get("base"), day)
+        return False
+    return int(data["timestamp"]), {k: v for k, v in data["rates"].items() if k in _ALLOWED_CURRENCIES}
+
+
+async def _store_days(ideps: InternalDependencies, snapshots: Mapping[date, tuple[int, dict[str, float]]]) -> None:
+    rows = dict(snapshots.values())
+    # * archive first: checkpoint is committed with Redis writes, so a crash in between only repeats this batch
+    if ideps.rates_archive:
+        await asyncio.to_thread(ideps.rates_archive.merge, rows)
+    await ideps.currency_rate_history_cache.insert_snapshots(
+        rows,
+        base_currency=_BASE_CURRENCY,
+        checkpoint=[d.isoformat() for d in snapshots],
+    )
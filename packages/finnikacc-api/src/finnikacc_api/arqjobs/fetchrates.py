@@ -1,107 +1,86 @@
+import asyncio
 import logging
-import re
-from datetime import UTC, datetime
-from email.utils import parsedate_to_datetime
-from http import HTTPStatus
-from typing import Any
 
-from aiohttp import hdrs
-from multidict import CIMultiDictProxy, istr
-
-from finnikacc_api.lifecycle.dependencies import get_ext_deps_from_dict, get_int_deps_from_dict
-from finnikacc_api.redis.model import CurrencyRateCacheValueTyped, RequestLastModETagCacheValue
-from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache, LastRequestETagRedisCache
+from finnikacc_api import settings
+from finnikacc_api.lifecycle.dependencies import InternalDependencies, get_int_deps_from_dict
+from finnikacc_api.providers.base import ProviderRates, RatesProvider, merge_provider_rates
+from finnikacc_api.redis.fetch_lease import FetchLease
+from finnikacc_api.redis.model import CurrencyRateCacheValueTyped
 
 LOG = logging.getLogger(__name__)
 
 _ALLOWED_CURRENCIES = ["USD", "EUR", "PLN", "UAH", "GBP", "CHF", "SEK", "NOK"]
 
 
-async def fetch_conv_rates_oex(ctx: dict) -> None:
-    edeps = get_ext_deps_from_dict(ctx)
-    ideps = get_int_deps_from_dict(ctx)
-    rates_cache = ideps.currency_rate_cache
-    etag_cache = ideps.last_request_etag_cache
-    endpoint = "latest.json"
-
-    prev_respons_meta = await etag_cache.hget_raw(endpoint)
-
-    async with edeps.oex_client.get(endpoint, headers=_date_etag_to_cc_headers(prev_respons_meta)) as response:
-        _log_http_status_and_headers(HTTPStatus(response.status), response.headers, endpoint, "OEX")
-
-        if response.status != HTTPStatus.OK:
-            return
-
-        data = await response.json()
+async def fetch_conv_rates(ctx: dict, *, lease: FetchLease | None = None) -> None:
+    """Fetch rates from all configured providers concurrently, merge and store them as one snapshot.
 
-        if (base_curr := data["base"]) != "USD":
-            LOG.warning("Unexpected base currency '%s'. Skipping.", base_curr)
-            return
-
-        await _store_response_etag(etag_cache, endpoint, response.headers)
-        await _store_curr_rates(rates_cache, data, response.headers)
-
-
-def _clean_etag(etag: str) -> str:
-    m = re.match(r'(?:W/)?"(.+)"', etag)
-    return m.group(1) if m else etag
+    With `lease`, every write is preceded by its fence check (see `FetchLeaseRedisCache.check_fence`).
+    """
+    ideps = get_int_deps_from_dict(ctx)
+    # * slow or failing provider only delays the job by its own timeout and does not fail the others
+    results = await asyncio.gather(*(_fetch_provider(p) for p in ideps.rates_providers))
+    available = [r for r in results if r]
+
+    modified = any(r.modified for r in available)
+    if not modified:
+        LOG.info("No new rates from providers: %s", ", ".join(p.name for p in ideps.rates_providers))
+
+    rates = merge_provider_rates(available, policy=settings.app.RATES_MERGE_POLICY)
+    await _store_curr_rates(
+        ideps,
+        {k: v for k, v in rates.items() if k in _ALLOWED_CURRENCIES},
+        modified=modified,
+        lease=lease,
+    )
 
 
-async def _store_response_etag(
-    etag_cache: LastRequestETagRedisCache,
-    endpoint: str,
-    headers: CIMultiDictProxy[str],
-) -> None:
-    if (etag := headers.get(hdrs.ETAG)) and (date_rfc_7231 := headers.get(hdrs.DATE)):
-        await etag_cache.hset_conv(
-            {
-                "etag": etag,
-                "rq_date": int(parsedate_to_datetime(date_rfc_7231).timestamp()),
-                "rq_date_rfc_7231": date_rfc_7231,
-            },
-            endpoint=endpoint,
-        )
+async def _fetch_provider(provider: RatesProvider) -> ProviderRates | None:
+    try:
+        async with asyncio.timeout(provider.timeout_seconds):
+            return await provider.fetch()
+    except TimeoutError:
+        LOG.warning("Rates provider '%s' timed out after %ss", provider.name, provider.timeout_seconds)
+    except Exception:
+        LOG.exception("Rates provider '%s' failed", provider.name)
+    return None
 
 
 async def _store_curr_rates(
-    rates_cache: CurrencyRateRedisCache,
-    data: Any,  # noqa: ANN401
-    headers: CIMultiDictProxy,
+    ideps: InternalDependencies,
+    rates: dict[str, CurrencyRateCacheValueTyped],
+    *,
+    modified: bool = True,
+    lease: FetchLease | None = None,
 ) -> None:
-    timestamp_fl = data.get("timestamp") or int(datetime.now(UTC).timestamp())
-    last_mod_rfc_7231 = headers.get(hdrs.LAST_MODIFIED)
-    last_mod_dt = (
-        parsedate_to_datetime(last_mod_rfc_7231) if last_mod_rfc_7231 else datetime.fromtimestamp(timestamp_fl, UTC)
+    """Store rates; not `modified` ones (confirmed by upstream as current) only refresh `request_at` and TTLs."""
+    if not rates:
+        return
+
+    async def check_fence() -> None:
+        if lease:
+            await ideps.fetch_lease.check_fence(lease)
+
+    # * last seen first: readers fall back to it whenever latest is missing
+    await check_fence()
+    await ideps.currency_rate_lastseen_cache.hset_m_diff_conv(rates, base_currency="USD")
+    await check_fence()
+    changes = await ideps.currency_rate_cache.hset_m_diff_conv(rates, base_currency="USD")
+    LOG.info(
+        "Stored USD rates v%s: %s changed, %s removed",
+        changes["version"],
+        len(changes["changed"]),
+        len(changes["removed"]),
     )
-
-    rates_transformed = {
-        k: CurrencyRateCacheValueTyped(
-            currency=k,
-            rate=v,
-            request_at=timestamp_fl,
-            last_modified=int(last_mod_dt.timestamp()),
+    await ideps.currency_rate_cache.publish_snapshot_updated("USD", changes["version"])
+    if not modified:
+        return
+    await check_fence()
+    await ideps.currency_rate_history_cache.append_snapshot(rates, base_currency="USD")
+    if ideps.rates_archive and ideps.rates_archive.writable:
+        await check_fence()
+        await asyncio.to_thread(
+            ideps.rates_archive.append,
+            max(r["request_at"] for r in rates.values()),
+            {k: v["rate"] for k, v in rates.items()},
         )
-        for k, v in data["rates"].items()
-        if k in _ALLOWED_CURRENCIES
-    }
-
-    await rates_cache.hset_m_conv(rates_transformed, base_currency="USD")
-
-
-def _date_etag_to_cc_headers(prev_meta: RequestLastModETagCacheValue | None) -> dict[istr, str] | None:
-    if prev_meta and (date_rfc_7231 := prev_meta.get("rq_date_rfc_7231")) and (etag := prev_meta.get("etag")):
-        h = {hdrs.IF_NONE_MATCH: etag, hdrs.IF_MODIFIED_SINCE: date_rfc_7231}
-        LOG.info("passing cache control headers: %s", h)
-        return h
-    return None
-
-
-def _log_http_status_and_headers(status: HTTPStatus, headers: CIMultiDictProxy, endpoint: str, provider: str) -> None:
-    log_msg = f"HTTP Status: {status.value} {status.phrase}. Endpoint: '{endpoint}' @ {provider}"
-    if status in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
-        LOG.info(log_msg)
-    else:
-        LOG.warning(log_msg)
-
-    for k, v in headers.items():
-        LOG.debug("header - %s: %s", k, v)
@@ -0,0 +1,124 @@
+"""Adaptive, quota-aware schedule of rates fetches.
+
+Instead of polling at a fixed minute of every hour, the next fetch is planned after each one:
+
+- upstream update cadence (period and phase) is learned from `Last-Modified` history of the
+  first (highest precedence) provider, hourly updates on the hour are assumed until there is enough of it;
+- remaining request quota of metered providers is spread evenly over the time left until it resets,
+  which gives the number of polls affordable per update period;
+- polls are packed right after the expected update time (quadratic spacing) and the rest of the period
+  is skipped as soon as the update has been seen.
+"""
+
+import logging
+import statistics
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from itertools import pairwise
+from typing import Final
+
+from finnikacc_api.lifecycle.dependencies import InternalDependencies
+from finnikacc_api.providers.base import RequestQuota
+
+LOG = logging.getLogger(__name__)
+
+FETCH_TIMEOUT_SEC: Final = 60
+# * upstream publishes a bit after its update time, first poll waits for it
+_FIRST_POLL_DELAY_SEC: Final = 4 * 60
+_MIN_POLL_INTERVAL_SEC: Final = 60
+# * share of remaining quota left for out-of-schedule refreshes and backfills
+_QUOTA_RESERVE_RATIO: Final = 0.1
+_MIN_UPDATES_TO_LEARN: Final = 4
+
+
+@dataclass(slots=True, kw_only=True, frozen=True)
+class UpdateCadence:
+    # * upstream updates at `phase + k * period` (timestamp seconds)
+    period: int
+    phase: int = 0
+
+    @classmethod
+    def learn(cls, update_times: Iterable[int], *, default: "UpdateCadence") -> "UpdateCadence":
+        """Cadence of observed update times, `default` if there are too few of them."""
+        times = sorted(set(update_times))
+        if len(times) < _MIN_UPDATES_TO_LEARN:
+            return default
+        # * median is robust to updates missed in between polls (gaps of multiple periods)
+        period = round(statistics.median(b - a for a, b in pairwise(times)) / 60) * 60
+        if period < _MIN_POLL_INTERVAL_SEC:
+            return default
+        # * circular median of offsets within period, relative to the latest update
+        ref = times[-1] % period
+        offsets = [(t - ref + period // 2) % period - period // 2 for t in times]
+        phase = round((ref + statistics.median(offsets)) / 60) * 60
+        return cls(period=period, phase=phase % period)
+
+    def update_at_or_before(self, at: int) -> int:
+        return at - (at - self.phase) % self.period
+
+
+DEFAULT_CADENCE: Final = UpdateCadence(period=3600)
+
+
+def quota_poll_interval(quotas: Iterable[RequestQuota]) -> float:
+    """Average seconds between fetches which spends remaining quotas (minus reserve) by the time they reset."""
+    interval: float = _MIN_POLL_INTERVAL_SEC
+    for quota in quotas:
+        usable = quota.remaining * (1 - _QUOTA_RESERVE_RATIO)
+        interval = max(interval, quota.reset_in_seconds / usable if usable >= 1 else quota.reset_in_seconds)
+    return interval
+
+
+def plan_next_fetch(now: int, *, cadence: UpdateCadence, last_update_at: int | None, poll_interval: float) -> int:
+    """Start time (timestamp seconds, after `now`) of the next fetch."""
+    if poll_interval >= cadence.period:
+        # * not every update is affordable: fetch right after the first one once the interval has passed
+        return cadence.update_at_or_before(now + int(poll_interval)) + _FIRST_POLL_DELAY_SEC
+
+    polls = max(int(cadence.period // poll_interval), 1)
+    window = cadence.period - _FIRST_POLL_DELAY_SEC
+    offsets = [_FIRST_POLL_DELAY_SEC + int(window * (i / polls) ** 2) for i in range(polls)]
+
+    expected_at = cadence.update_at_or_before(now)
+    if last_update_at is not None and last_update_at >= expected_at - cadence.period // 4:
+        # * update of this period has been seen already
+        return expected_at + cadence.period + offsets[0]
+    return next((expected_at + o for o in offsets if expected_at + o > now), expected_at + cadence.period + offsets[0])
+
+
+def next_fetch_conv_rates_at(now: datetime, planned_at: int | None = None) -> datetime:
+    """When the next fetch is expected to complete (start plus job timeout), estimated if nothing is planned."""
+    if planned_at is None or planned_at + FETCH_TIMEOUT_SEC <= now.timestamp():
+        # * shift back by timeout, so that fetch which is running right now is accounted for
+        since = int(now.timestamp()) - FETCH_TIMEOUT_SEC
+        planned_at = DEFAULT_CADENCE.update_at_or_before(since - _FIRST_POLL_DELAY_SEC) + _FIRST_POLL_DELAY_SEC
+        if planned_at <= since:
+            planned_at += DEFAULT_CADENCE.period
+    return datetime.fromtimestamp(planned_at + FETCH_TIMEOUT_SEC, UTC)
+
+
+async def plan_next_conv_rates_fetch(ideps: InternalDependencies, now: int | None = None) -> int:
+    """Plan the next fetch from providers' update history and quotas, and store the plan."""
+    now = int(time.time()) if now is None else now
+    providers = ideps.rates_providers
+    history = await providers[0].update_history() if providers else []
+    cadence = UpdateCadence.learn(history, default=DEFAULT_CADENCE)
+    quotas = [q for p in providers if (q := await p.request_quota())]
+    poll_interval = quota_poll_interval(quotas)
+
+    next_at = plan_next_fetch(
+        now,
+        cadence=cadence,
+        last_update_at=max(history, default=None),
+        poll_interval=poll_interval,
+    )
+    await ideps.fetch_schedule_cache.set_next_fetch_at(next_at)
+    LOG.info(
+        "Next rates fetch at %s (%s, poll interval %.0fs)",
+        datetime.fromtimestamp(next_at, UTC).isoformat(),
+        cadence,
+        poll_interval,
+    )
+    return next_at
@@ -1,11 +1,14 @@
 import logging
 import secrets
 from io import StringIO
+from typing import Annotated, Any
 
 from fastapi import Depends, FastAPI, HTTPException, Response, status
 from fastapi.security import APIKeyHeader
 
-from finnikacc_api.lifecycle.dependencies import CurrRateCacheDep
+from finnikacc_api.arqjobs.arq_jobs import enqueue_refresh_conv_rates
+from finnikacc_api.lifecycle.dependencies import CurrRateCacheDep, ExternalDependencies, FetchLeaseDep, get_ext_deps
+from finnikacc_api.redis.instrumentation import redis_stats
 
 LOG = logging.getLogger(__name__)
 
@@ -28,7 +31,7 @@ def verify_debug_token(token: str = Depends(api_key_header)) -> None:
 
 @app_debug_api.get("/debug-info", dependencies=[Depends(verify_debug_token)])
 async def get_debug_info(currencies_cache: CurrRateCacheDep) -> Response:
-    result = await currencies_cache.scan_hgetall_currencies_all("USD")
+    result = await currencies_cache.hgetall_currencies_all("USD")
 
     LOG.info("Currencies: %s", result)
 
@@ -37,3 +40,21 @@ async def get_debug_info(currencies_cache: CurrRateCacheDep) -> Response:
         print(r, file=sio)
 
     return Response(content=sio.getvalue(), media_type="text/plain")
+
+
+@app_debug_api.get("/fetch-lease-stats", dependencies=[Depends(verify_debug_token)])
+async def get_fetch_lease_stats(fetch_lease: FetchLeaseDep) -> dict[str, int]:
+    """Rates fetch lease outcomes across all instances: acquired, contended, done, completed, lost, fenced_off."""
+    return await fetch_lease.get_stats()
+
+
+@app_debug_api.post("/refresh-rates", dependencies=[Depends(verify_debug_token)])
+async def post_refresh_rates(ext_deps: Annotated[ExternalDependencies, Depends(get_ext_deps)]) -> dict[str, bool]:
+    """Enqueue out-of-schedule rates fetch, run by (embedded or standalone) arq worker."""
+    return {"enqueued": await enqueue_refresh_conv_rates(ext_deps.arq_redis) is not None}
+
+
+@app_debug_api.get("/redis-stats", dependencies=[Depends(verify_debug_token)])
+async def get_redis_stats(ext_deps: Annotated[ExternalDependencies, Depends(get_ext_deps)]) -> dict[str, Any]:
+    """Redis pool of this process (connections in use and idle, wait for connection) and latency per command."""
+    return redis_stats(ext_deps.redis)
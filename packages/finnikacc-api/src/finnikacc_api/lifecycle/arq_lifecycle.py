@@ -18,6 +18,8 @@ from finnikacc_api.lifecycle.dependencies import (
     get_ext_deps_from_app,
     get_int_deps_from_app,
 )
+from finnikacc_api.lifecycle.deps_ext_lifecycle import external_deps_lifespan
+from finnikacc_api.lifecycle.deps_int_lifecycle import internal_deps_lifespan
 
 LOG = logging.getLogger(__name__)
 
@@ -45,12 +47,37 @@ def _context_from_app_state(app: FastAPI) -> dict:
     }
 
 
+def _create_worker(app: FastAPI) -> Worker:
+    # * worker uses the process-wide pool instead of opening its own, `worker.close()` leaves the pool open
+    return create_worker(
+        ArqWorkerSettings,
+        redis_pool=get_ext_deps_from_app(app).arq_redis,
+        ctx=_context_from_app_state(app),
+    )
+
+
 @asynccontextmanager
 async def arq_lifespan(app: FastAPI) -> AsyncGenerator[Worker]:
-    worker = create_worker(ArqWorkerSettings, ctx=_context_from_app_state(app))
+    worker = _create_worker(app)
     task = asyncio.create_task(worker.async_run())
 
     yield worker
 
     task.cancel()
     await worker.close()
+
+
+async def run_standalone_arq_worker() -> None:
+    """Run arq worker with its own dependencies, in a process which does not serve HTTP, until cancelled."""
+    if settings.app.RATES_ARCHIVE_DIR and not settings.app.RATES_ARCHIVE_WRITER:
+        # * fetch jobs run by this worker would be missing from the archive
+        msg = "Standalone arq worker with read-only rates archive, set RATES_ARCHIVE_WRITER"
+        raise RuntimeError(msg)
+    app = FastAPI()
+    async with external_deps_lifespan(app), internal_deps_lifespan(app):
+        worker = _create_worker(app)
+        LOG.info("Standalone arq worker started.")
+        try:
+            await worker.async_run()
+        finally:
+            await worker.close()
@@ -6,7 +6,13 @@ import redis.asyncio as redis
 from arq import ArqRedis
 from fastapi import Depends, FastAPI, Request
 
-from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache, LastRequestETagRedisCache
+from finnikacc_api.archive.rates_archive import RatesArchive
+from finnikacc_api.providers.base import RatesProvider
+from finnikacc_api.redis.fetch_lease import FetchLeaseRedisCache
+from finnikacc_api.redis.fetch_schedule_cache import FetchScheduleRedisCache
+from finnikacc_api.redis.history_cache import CurrencyRateHistoryRedisCache
+from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache
+from finnikacc_api.redis.snapshot_cache import CurrencyRateSnapshotCache
 
 INTERNAL_DEPENDENCIES_CONTEXT_KEY: Final = "fccapi_internal_dependencies"
 EXTERNAL_DEPENDENCIES_CONTEXT_KEY: Final = "fccapi_external_dependencies"
@@ -15,7 +21,14 @@ EXTERNAL_DEPENDENCIES_CONTEXT_KEY: Final = "fccapi_external_dependencies"
 @dataclass(slots=True, kw_only=True, frozen=True)
 class InternalDependencies:
     currency_rate_cache: CurrencyRateRedisCache
-    last_request_etag_cache: LastRequestETagRedisCache
+    currency_rate_lastseen_cache: CurrencyRateRedisCache
+    currency_rate_snapshot_cache: CurrencyRateSnapshotCache
+    currency_rate_history_cache: CurrencyRateHistoryRedisCache
+    rates_archive: RatesArchive | None = None
+    # * in merge precedence order
+    rates_providers: tuple[RatesProvider, ...]
+    fetch_schedule_cache: FetchScheduleRedisCache
+    fetch_lease: FetchLeaseRedisCache
 
 
 @dataclass(slots=True, kw_only=True, frozen=True)
@@ -40,6 +53,47 @@ def get_curr_rate_redis_cache(ideps: Annotated[InternalDependencies, Depends(get
 CurrRateCacheDep = Annotated[CurrencyRateRedisCache, Depends(get_curr_rate_redis_cache)]
 
 
+def get_curr_rate_snapshot_cache(
+    ideps: Annotated[InternalDependencies, Depends(get_int_deps)],
+) -> CurrencyRateSnapshotCache:
+    return ideps.currency_rate_snapshot_cache
+
+
+CurrRateSnapshotCacheDep = Annotated[CurrencyRateSnapshotCache, Depends(get_curr_rate_snapshot_cache)]
+
+
+def get_curr_rate_history_cache(
+    ideps: Annotated[InternalDependencies, Depends(get_int_deps)],
+) -> CurrencyRateHistoryRedisCache:
+    return ideps.currency_rate_history_cache
+
+
+CurrRateHistoryCacheDep = Annotated[CurrencyRateHistoryRedisCache, Depends(get_curr_rate_history_cache)]
+
+
+def get_rates_archive(ideps: Annotated[InternalDependencies, Depends(get_int_deps)]) -> RatesArchive | None:
+    return ideps.rates_archive
+
+
+RatesArchiveDep = Annotated[RatesArchive | None, Depends(get_rates_archive)]
+
+
+def get_fetch_schedule_cache(
+    ideps: Annotated[InternalDependencies, Depends(get_int_deps)],
+) -> FetchScheduleRedisCache:
+    return ideps.fetch_schedule_cache
+
+
+FetchScheduleCacheDep = Annotated[FetchScheduleRedisCache, Depends(get_fetch_schedule_cache)]
+
+
+def get_fetch_lease(ideps: Annotated[InternalDependencies, Depends(get_int_deps)]) -> FetchLeaseRedisCache:
+    return ideps.fetch_lease
+
+
+FetchLeaseDep = Annotated[FetchLeaseRedisCache, Depends(get_fetch_lease)]
+
+
 def get_redis_client(ext_deps: Annotated[ExternalDependencies, Depends(get_ext_deps)]) -> redis.Redis:
     return ext_deps.redis
 
@@ -4,56 +4,78 @@ from collections.abc import AsyncGenerator
 
 import aiohttp
 import redis.asyncio as redis
-from aiohttp_client_cache import SQLiteBackend
 from aiohttp_client_cache.session import CachedSession
-from arq import ArqRedis, create_pool
+from arq import ArqRedis
 from fastapi import FastAPI
 from fastapi.concurrency import asynccontextmanager
 
 from finnikacc_api import settings
 from finnikacc_api.lifecycle.dependencies import EXTERNAL_DEPENDENCIES_CONTEXT_KEY, ExternalDependencies
+from finnikacc_api.lifecycle.http_cache_backends import oex_cache_backend
+from finnikacc_api.redis.instrumentation import InstrumentedConnectionPool, InstrumentedRedis
 
 
 @asynccontextmanager
 async def external_deps_lifespan(app: FastAPI) -> AsyncGenerator[ExternalDependencies]:
+    redis_client = _redis_async_factory()
     deps = ExternalDependencies(
-        redis=_redis_async_factory(),
-        arq_redis=await _arq_redis_async_factory(),
-        oex_client=_aiohttp_oex_client_factory(),
+        redis=redis_client,
+        arq_redis=_arq_redis_factory(redis_client.connection_pool),
+        oex_client=_aiohttp_oex_client_factory(redis_client),
     )
     setattr(app.state, EXTERNAL_DEPENDENCIES_CONTEXT_KEY, deps)
 
-    yield deps
+    try:
+        yield deps
+    finally:
+        delattr(app.state, EXTERNAL_DEPENDENCIES_CONTEXT_KEY)
 
-    delattr(app.state, EXTERNAL_DEPENDENCIES_CONTEXT_KEY)
+        await deps.oex_client.close()
 
-    await deps.oex_client.close()
+        # * clients share one pool
+        await deps.arq_redis.close()
+        await deps.redis.close()
+        await deps.redis.connection_pool.disconnect()
 
-    await deps.arq_redis.close()
-    await deps.arq_redis.connection_pool.disconnect()
 
-    await deps.redis.close()
-    await deps.redis.connection_pool.disconnect()
+def _redis_async_factory() -> redis.Redis:
+    return InstrumentedRedis(connection_pool=_redis_connection_pool_factory())
 
 
-def _redis_async_factory() -> redis.Redis:
+def _redis_connection_pool_factory() -> InstrumentedConnectionPool:
+    pool_kwargs = {
+        "max_connections": settings.app.REDIS_POOL_MAX_CONNECTIONS,
+        "timeout": settings.app.REDIS_POOL_TIMEOUT_SEC,
+        "socket_connect_timeout": settings.app.REDIS_SOCKET_CONNECT_TIMEOUT_SEC,
+        "socket_timeout": settings.app.REDIS_SOCKET_TIMEOUT_SEC,
+        "health_check_interval": settings.app.REDIS_HEALTH_CHECK_INTERVAL_SEC,
+    }
     if settings.app.REDIS_CONNECTION_STRING:
-        return redis.Redis.from_url(settings.app.REDIS_CONNECTION_STRING)
+        return InstrumentedConnectionPool.from_url(settings.app.REDIS_CONNECTION_STRING, **pool_kwargs)
     if settings.app.REDIS_HOST and settings.app.REDIS_PORT:
-        return redis.Redis(
+        return InstrumentedConnectionPool(
             host=settings.app.REDIS_HOST,
             port=settings.app.REDIS_PORT,
             db=settings.app.REDIS_DB or 0,
+            **pool_kwargs,
         )
     msg = "Redis connection details misconfigured"
     raise RuntimeError(msg)
 
 
-async def _arq_redis_async_factory() -> ArqRedis:
-    return await create_pool(settings.arq_redis_settings())
+class _SharedPoolArqRedis(ArqRedis):
+    """`ArqRedis` on the process-wide pool, which only `external_deps_lifespan` disconnects."""
+
+    async def aclose(self, close_connection_pool: bool | None = None) -> None:  # noqa: ARG002, FBT001
+        # * arq worker closes its client with `close_connection_pool=True`, other clients still use the pool
+        await super().aclose(close_connection_pool=False)
+
+
+def _arq_redis_factory(pool: redis.ConnectionPool) -> ArqRedis:
+    return _SharedPoolArqRedis(pool_or_conn=pool)
 
 
-def _aiohttp_oex_client_factory() -> aiohttp.ClientSession:
+def _aiohttp_oex_client_factory(redis_client: redis.Redis) -> aiohttp.ClientSession:
     return CachedSession(
         settings.app.OEX_RATES_BASE_URL,
         headers={
@@ -65,8 +87,5 @@ def _aiohttp_oex_client_factory() -> aiohttp.ClientSession:
         # * because of stupid bug or anything like that
         # in prod env can be disabled (set expiration to 0)
         # or configured to expire in few minutes.
-        cache=SQLiteBackend(
-            settings.app.OEX_CACHE_DB_NAME,
-            expire_after=settings.app.OEX_CACHE_EXPIRE_AFTER_SEC,
-        ),
+        cache=oex_cache_backend(redis_client),
     )
@@ -5,31 +5,96 @@ from datetime import timedelta
 
 from fastapi import FastAPI
 from fastapi.concurrency import asynccontextmanager
+from redis.asyncio import Redis
 
+from finnikacc_api import settings
+from finnikacc_api.archive.rates_archive import RatesArchive
+from finnikacc_api.arqjobs.arq_jobs import enqueue_refresh_conv_rates
+from finnikacc_api.arqjobs.fetchschedule import FETCH_TIMEOUT_SEC
 from finnikacc_api.lifecycle.dependencies import (
     INTERNAL_DEPENDENCIES_CONTEXT_KEY,
     InternalDependencies,
     get_ext_deps_from_app,
 )
-from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache, LastRequestETagRedisCache
+from finnikacc_api.providers.registry import create_rates_providers
+from finnikacc_api.redis.fetch_lease import FetchLeaseRedisCache
+from finnikacc_api.redis.fetch_schedule_cache import FetchScheduleRedisCache
+from finnikacc_api.redis.history_cache import CurrencyRateHistoryRedisCache
+from finnikacc_api.redis.model import CurrencyRateCacheType
+from finnikacc_api.redis.redis_cache import (
+    CurrencyRateRedisCache,
+    migrate_currency_rates_layout,
+)
+from finnikacc_api.redis.snapshot_cache import CurrencyRateSnapshotCache
 
 
 @asynccontextmanager
 async def internal_deps_lifespan(app: FastAPI) -> AsyncGenerator[InternalDependencies]:
     deps_ext = get_ext_deps_from_app(app)
+    currency_rate_cache = CurrencyRateRedisCache(
+        deps_ext.redis,
+        expiration_seconds=int(timedelta(hours=2).total_seconds()),
+        cache_type="latest",
+        layout=settings.app.REDIS_RATES_LAYOUT,
+    )
+    # * outlives a few failed hourly fetches, served (as stale) while latest is missing
+    currency_rate_lastseen_cache = CurrencyRateRedisCache(
+        deps_ext.redis,
+        expiration_seconds=int(timedelta(days=14).total_seconds()),
+        cache_type="lastseen",
+        layout=settings.app.REDIS_RATES_LAYOUT,
+    )
+    await _migrate_rates_layout(deps_ext.redis, currency_rate_cache, cache_type="latest")
+    await _migrate_rates_layout(deps_ext.redis, currency_rate_lastseen_cache, cache_type="lastseen")
+    fetch_schedule_cache = FetchScheduleRedisCache(deps_ext.redis)
     deps = InternalDependencies(
-        currency_rate_cache=CurrencyRateRedisCache(
-            deps_ext.redis,
-            expiration_seconds=int(timedelta(hours=2).total_seconds()),
-            cache_type="latest",
+        currency_rate_cache=currency_rate_cache,
+        currency_rate_lastseen_cache=currency_rate_lastseen_cache,
+        currency_rate_snapshot_cache=CurrencyRateSnapshotCache(
+            currency_rate_cache,
+            ttl_seconds=int(timedelta(minutes=15).total_seconds()),
+            lastseen_cache=currency_rate_lastseen_cache,
+            fresh_seconds=int(timedelta(hours=2).total_seconds()),
+            on_stale=lambda _: enqueue_refresh_conv_rates(deps_ext.arq_redis, fetch_schedule_cache),
         ),
-        last_request_etag_cache=LastRequestETagRedisCache(
+        currency_rate_history_cache=CurrencyRateHistoryRedisCache(
             deps_ext.redis,
-            expiration_seconds=int(timedelta(hours=2).total_seconds()),
+            retention_seconds=int(timedelta(days=8).total_seconds()),
         ),
+        rates_archive=(
+            RatesArchive(settings.app.RATES_ARCHIVE_DIR, writable=settings.app.RATES_ARCHIVE_WRITER)
+            if settings.app.RATES_ARCHIVE_DIR
+            else None
+        ),
+        # * last seen rates outlive latest ones, and are written first
+        rates_providers=create_rates_providers(
+            settings.app.RATES_PROVIDERS,
+            deps_ext,
+            stored_rates=currency_rate_lastseen_cache,
+        ),
+        fetch_schedule_cache=fetch_schedule_cache,
+        # * outlives fetch job timeout, expires soon enough if its holder dies
+        fetch_lease=FetchLeaseRedisCache(deps_ext.redis, ttl_seconds=FETCH_TIMEOUT_SEC + 30),
     )
     setattr(app.state, INTERNAL_DEPENDENCIES_CONTEXT_KEY, deps)
+    deps.currency_rate_snapshot_cache.start()
+
+    try:
+        yield deps
+    finally:
+        await deps.currency_rate_snapshot_cache.stop()
+        delattr(app.state, INTERNAL_DEPENDENCIES_CONTEXT_KEY)
 
-    yield deps
 
-    delattr(app.state, INTERNAL_DEPENDENCIES_CONTEXT_KEY)
+async def _migrate_rates_layout(
+    redis: Redis,
+    target: CurrencyRateRedisCache,
+    *,
+    cache_type: CurrencyRateCacheType,
+) -> None:
+    """Pick up rates written by previous deployment in default layout, once per layout switch."""
+    if target.layout == "hash_per_pair":
+        return
+    # * expiration of source is irrelevant, its rates are only read and deleted
+    source = CurrencyRateRedisCache(redis, expiration_seconds=0, cache_type=cache_type)
+    await migrate_currency_rates_layout(source, target, base_currency="USD")
@@ -0,0 +1,110 @@
+"""Storage backends of the OEX responses cache (`aiohttp_client_cache`), selected by `OEX_CACHE_BACKEND`.
+
+`sqlite` is a file per process: every worker has its own cache and writers contend for the file lock.
+`redis` stores responses in the shared Redis connection, so all workers see one coherent cache.
+`memory` is per process, bounded by number of entries, for setups without a writable disk.
+"""
+
+from collections import OrderedDict
+from collections.abc import AsyncIterable
+
+from aiohttp_client_cache import CacheBackend, SQLiteBackend
+from aiohttp_client_cache.backends.base import BaseCache, DictCache, ResponseOrKey
+from aiohttp_client_cache.response import CachedResponse
+from redis.asyncio import Redis
+
+from finnikacc_api import settings
+
+
+class RedisResponseCache(BaseCache):
+    """Cache entries as separate Redis keys `{prefix}:{key}` with TTL, over a connection owned by the app.
+
+    Unlike `aiohttp_client_cache` `RedisCache` (one hash for all entries), expired entries do not pile up,
+    and the shared connection is never closed by the cache.
+    """
+
+    def __init__(self, redis: Redis, *, prefix: str, ttl_seconds: int | None = None) -> None:
+        super().__init__()
+        self._redis = redis
+        self._prefix = prefix
+        self._ttl = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+
+    def _name(self, key: str) -> str:
+        return f"{self._prefix}:{key}"
+
+    async def _names(self) -> list[bytes]:
+        return [name async for name in self._redis.scan_iter(match=f"{self._prefix}:*")]
+
+    async def contains(self, key: str) -> bool:
+        return bool(await self._redis.exists(self._name(key)))
+
+    async def clear(self) -> None:
+        if names := await self._names():
+            await self._redis.delete(*names)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(self._name(key))
+
+    async def bulk_delete(self, keys: set) -> None:
+        if keys:
+            await self._redis.delete(*(self._name(k) for k in keys))
+
+    async def keys(self) -> AsyncIterable[str]:  # pyright: ignore[reportIncompatibleMethodOverride]
+        for name in await self._names():
+            yield name.decode().removeprefix(f"{self._prefix}:")
+
+    async def read(self, key: str) -> CachedResponse | str | None:
+        return self.deserialize(await self._redis.get(self._name(key)))
+
+    async def size(self) -> int:
+        return len(await self._names())
+
+    async def values(self) -> AsyncIterable[ResponseOrKey]:  # pyright: ignore[reportIncompatibleMethodOverride]
+        for name in await self._names():
+            if (item := await self._redis.get(name)) is not None:
+                yield self.deserialize(item)
+
+    async def write(self, key: str, item: ResponseOrKey) -> None:
+        await self._redis.set(self._name(key), self.serialize(item), ex=self._ttl)
+
+
+class BoundedDictCache(DictCache):
+    """In-memory cache keeping at most `max_entries` entries, least recently used are evicted first."""
+
+    def __init__(self, *, max_entries: int) -> None:
+        super().__init__()
+        self.data: OrderedDict[str, ResponseOrKey] = OrderedDict()
+        self._max_entries = max_entries
+
+    async def read(self, key: str) -> CachedResponse | str | None:
+        if key in self.data:
+            self.data.move_to_end(key)
+        return await super().read(key)
+
+    async def write(self, key: str, item: ResponseOrKey) -> None:
+        self.data[key] = item
+        self.data.move_to_end(key)
+        while len(self.data) > self._max_entries:
+            self.data.popitem(last=False)
+
+
+def oex_cache_backend(redis: Redis) -> CacheBackend:
+    expire_after = settings.app.OEX_CACHE_EXPIRE_AFTER_SEC
+    match settings.app.OEX_CACHE_BACKEND:
+        case "sqlite":
+            if not settings.app.OEX_CACHE_DB_NAME:
+                msg = "OEX_CACHE_DB_NAME is required for 'sqlite' OEX cache backend"
+                raise RuntimeError(msg)
+            return SQLiteBackend(settings.app.OEX_CACHE_DB_NAME, expire_after=expire_after)
+        case "redis":
+            backend = CacheBackend(expire_after=expire_after)
+            prefix = f"fcc:{settings.APP_ENV}:http_cache:oex"
+            # * key TTL only reclaims memory, freshness is still decided by `expire_after` on read
+            backend.responses = RedisResponseCache(redis, prefix=f"{prefix}:responses", ttl_seconds=expire_after)
+            backend.redirects = RedisResponseCache(redis, prefix=f"{prefix}:redirects", ttl_seconds=expire_after)
+            return backend
+        case "memory":
+            backend = CacheBackend(expire_after=expire_after)
+            backend.responses = BoundedDictCache(max_entries=settings.app.OEX_CACHE_MAX_ENTRIES)
+            backend.redirects = BoundedDictCache(max_entries=settings.app.OEX_CACHE_MAX_ENTRIES)
+            return backend
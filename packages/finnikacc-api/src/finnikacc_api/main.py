@@ -5,10 +5,11 @@ from contextlib import AsyncExitStack
 from fastapi import FastAPI
 from fastapi.concurrency import asynccontextmanager
 
+from finnikacc_api import settings
 from finnikacc_api.app_webapi.main import app_webapi
 from finnikacc_api.debug_api import app_debug_api
 from finnikacc_api.lifecycle.arq_lifecycle import arq_lifespan
-from finnikacc_api.lifecycle.dependencies import INTERNAL_DEPENDENCIES_CONTEXT_KEY
+from finnikacc_api.lifecycle.dependencies import EXTERNAL_DEPENDENCIES_CONTEXT_KEY, INTERNAL_DEPENDENCIES_CONTEXT_KEY
 from finnikacc_api.lifecycle.deps_ext_lifecycle import external_deps_lifespan
 from finnikacc_api.lifecycle.deps_int_lifecycle import internal_deps_lifespan
 
@@ -18,12 +19,16 @@ LOG = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
     async with AsyncExitStack() as stack:
-        _deps = await stack.enter_async_context(external_deps_lifespan(app))
+        deps_ext = await stack.enter_async_context(external_deps_lifespan(app))
         _ideps = await stack.enter_async_context(internal_deps_lifespan(app))
-        _wrk = await stack.enter_async_context(arq_lifespan(app))
+        if settings.app.ARQ_WORKER_EMBEDDED:
+            _wrk = await stack.enter_async_context(arq_lifespan(app))
+        else:
+            LOG.info("Embedded arq worker is disabled, jobs are run by standalone worker.")
         LOG.info("App lifespan initialization completed.")
 
         deps_int = getattr(app.state, INTERNAL_DEPENDENCIES_CONTEXT_KEY)
+        setattr(app_debug_api.state, EXTERNAL_DEPENDENCIES_CONTEXT_KEY, deps_ext)
         setattr(app_debug_api.state, INTERNAL_DEPENDENCIES_CONTEXT_KEY, deps_int)
         setattr(app_webapi.state, INTERNAL_DEPENDENCIES_CONTEXT_KEY, deps_int)
 
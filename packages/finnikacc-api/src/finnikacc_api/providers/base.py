@@ -0,0 +1,87 @@
+"""Upstream rates providers and merging of their snapshots into one.
+
+The fetch job queries all configured providers concurrently (see `providers.registry`),
+each one with its own timeout and conditional request state, and merges whatever came back
+into a single pivot based snapshot. Every merged rate keeps `request_at`/`last_modified`
+of the provider it was taken from.
+"""
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Literal, Protocol
+
+from finnikacc_api.rates.cross_rates import PIVOT_CURRENCY
+from finnikacc_api.redis.model import CurrencyRateCacheValueTyped
+
+# * precedence: rate is taken from the first provider (in configured order) which has the currency
+# * freshest: rate is taken from the provider with the most recent rates, ties go by precedence
+RatesMergePolicy = Literal["precedence", "freshest"]
+
+
+class RatesProviderError(RuntimeError):
+    pass
+
+
+@dataclass(slots=True, kw_only=True, frozen=True)
+class ProviderRates:
+    provider: str
+    # * for 1 unit of pivot currency
+    rates: dict[str, float]
+    request_at: int  # * timestamp seconds
+    last_modified: int  # * timestamp seconds
+    # * `False` if upstream reported rates as not modified since previous fetch
+    modified: bool = True
+
+
+@dataclass(slots=True, kw_only=True, frozen=True)
+class RequestQuota:
+    remaining: int
+    reset_in_seconds: int
+
+
+class RatesProvider(Protocol):
+    name: str
+    timeout_seconds: float
+
+    async def fetch(self) -> ProviderRates | None:
+        """Fetch current rates, `None` if provider has none to offer (e.g. request failed)."""
+        ...
+
+    async def update_history(self) -> list[int]:
+        """Recently seen upstream update times (`Last-Modified`, timestamp seconds), oldest first."""
+        ...
+
+    async def request_quota(self) -> RequestQuota | None:
+        """Return requests left until quota resets, `None` if provider is not metered."""
+        ...
+
+
+def to_pivot_rates(base_currency: str, rates: Mapping[str, float], *, pivot: str = PIVOT_CURRENCY) -> dict[str, float]:
+    """Rebase rates for 1 unit of `base_currency` to rates for 1 unit of `pivot`."""
+    if base_currency == pivot:
+        return dict(rates)
+    if not rates.get(pivot):
+        msg = f"Can not rebase '{base_currency}' rates to '{pivot}', no rate for '{pivot}'"
+        raise RatesProviderError(msg)
+    inv = 1.0 / rates[pivot]
+    return {base_currency: inv, **{c: r * inv for c, r in rates.items()}}
+
+
+def merge_provider_rates(
+    results: Sequence[ProviderRates],
+    *,
+    policy: RatesMergePolicy = "precedence",
+) -> dict[str, CurrencyRateCacheValueTyped]:
+    """Merge rates of providers into one snapshot, `results` are in precedence order."""
+    ordered = results if policy == "precedence" else sorted(results, key=lambda r: r.request_at, reverse=True)
+    merged: dict[str, CurrencyRateCacheValueTyped] = {}
+    for result in ordered:
+        for currency, rate in result.rates.items():
+            if currency not in merged and rate:
+                merged[currency] = {
+                    "currency": currency,
+                    "rate": rate,
+                    "request_at": result.request_at,
+                    "last_modified": result.last_modified,
+                }
+    return merged
@@ -0,0 +1,50 @@
+"""Provider reading rates from a local JSON file in OEX `latest.json` format (for tests and local runs)."""
+
+import asyncio
+import json
+import logging
+from dataclasses import replace
+from pathlib import Path
+
+from finnikacc_api.providers.base import ProviderRates, RequestQuota, to_pivot_rates
+
+LOG = logging.getLogger(__name__)
+
+
+class FileRatesProvider:
+    def __init__(self, path: Path | str, *, name: str = "file", timeout_seconds: float = 5) -> None:
+        self.name = name
+        self.timeout_seconds = timeout_seconds
+        self._path = Path(path)
+        self._last: ProviderRates | None = None
+        self._last_etag: tuple[int, int] | None = None
+
+    async def fetch(self) -> ProviderRates | None:
+        return await asyncio.to_thread(self._read)
+
+    async def update_history(self) -> list[int]:
+        return [self._last.last_modified] if self._last else []
+
+    async def request_quota(self) -> RequestQuota | None:
+        return None
+
+    def _read(self) -> ProviderRates | None:
+        try:
+            stat = self._path.stat()
+            # * file is re-read only when it changed, like a conditional request
+            etag = (stat.st_mtime_ns, stat.st_size)
+            if self._last and etag == self._last_etag:
+                return replace(self._last, modified=False)
+            data = json.loads(self._path.read_bytes())
+        except (OSError, ValueError):
+            LOG.warning("Can not read rates file '%s' @ %s", self._path, self.name, exc_info=True)
+            return None
+
+        self._last = ProviderRates(
+            provider=self.name,
+            rates=to_pivot_rates(data["base"], data["rates"]),
+            request_at=int(data.get("timestamp") or stat.st_mtime),
+            last_modified=int(stat.st_mtime),
+        )
+        self._last_etag = etag
+        return self._last
@@ -0,0 +1,172 @@
+"""Open Exchange Rates (`latest.json`) provider."""
+
+import logging
+import re
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime, timedelta
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+
+import aiohttp
+from aiohttp import hdrs
+from multidict import CIMultiDictProxy, istr
+
+from finnikacc_api.providers.base import ProviderRates, RequestQuota, to_pivot_rates
+from finnikacc_api.rates.cross_rates import PIVOT_CURRENCY
+from finnikacc_api.redis.model import RequestLastModETagCacheValue
+from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache, LastRequestETagRedisCache
+
+LOG = logging.getLogger(__name__)
+
+_LATEST_ENDPOINT = "latest.json"
+
+
+@dataclass(slots=True, kw_only=True, frozen=True)
+class OexUsage:
+    # * negative if plan is unlimited
+    requests_remaining: int
+    days_remaining: int
+
+
+async def fetch_oex_usage(client: aiohttp.ClientSession) -> OexUsage | None:
+    """Usage of current quota period (`usage.json`, does not count towards quota), `None` if it can not be read."""
+    try:
+        async with client.get("usage.json") as response:
+            if response.status != HTTPStatus.OK:
+                LOG.warning("Can not read OEX usage (HTTP %s)", response.status)
+                return None
+            usage = (await response.json())["data"]["usage"]
+        return OexUsage(
+            requests_remaining=int(usage["requests_remaining"]),
+            days_remaining=int(usage.get("days_remaining", 0)),
+        )
+    except (aiohttp.ClientError, KeyError, TypeError, ValueError):
+        LOG.warning("Can not read OEX usage", exc_info=True)
+        return None
+
+
+class OexRatesProvider:
+    def __init__(
+        self,
+        client: aiohttp.ClientSession,
+        etag_cache: LastRequestETagRedisCache,
+        *,
+        name: str = "oex",
+        timeout_seconds: float = 30,
+        stored_rates: CurrencyRateRedisCache | None = None,
+    ) -> None:
+        """`stored_rates` (pivot rates written by the fetch job) stand in for previous response in a new process."""
+        self.name = name
+        self.timeout_seconds = timeout_seconds
+        self._client = client
+        self._etag_cache = etag_cache
+        self._stored_rates = stored_rates
+        self._last: ProviderRates | None = None
+
+    async def fetch(self) -> ProviderRates | None:
+        endpoint = _LATEST_ENDPOINT
+        if not self._last:
+            # * previous response could be made by another process (restart, lease taken over)
+            self._last = await self._restore_last()
+        # * conditional request only if rates of previous response are at hand to be reused on 304,
+        # * otherwise merged snapshot would be missing this provider's rates
+        prev_response_meta = await self._etag_cache.hget_raw(endpoint) if self._last else None
+
+        async with self._client.get(endpoint, headers=_date_etag_to_cc_headers(prev_response_meta)) as response:
+            _log_http_status_and_headers(HTTPStatus(response.status), response.headers, endpoint, self.name)
+
+            if response.status == HTTPStatus.NOT_MODIFIED and self._last:
+                # * rates are confirmed as current, stored ones get fresh again
+                self._last = replace(self._last, request_at=int(datetime.now(UTC).timestamp()))
+                return replace(self._last, modified=False)
+            if response.status != HTTPStatus.OK:
+                return None
+
+            data = await response.json()
+            await _store_response_etag(self._etag_cache, endpoint, response.headers)
+
+        request_at = data.get("timestamp") or int(datetime.now(UTC).timestamp())
+        last_mod_rfc_7231 = response.headers.get(hdrs.LAST_MODIFIED)
+        last_modified = int(parsedate_to_datetime(last_mod_rfc_7231).timestamp()) if last_mod_rfc_7231 else request_at
+        self._last = ProviderRates(
+            provider=self.name,
+            rates=to_pivot_rates(data["base"], data["rates"]),
+            request_at=request_at,
+            last_modified=last_modified,
+        )
+        await self._etag_cache.add_update(last_modified, endpoint=endpoint)
+        return self._last
+
+    async def _restore_last(self) -> ProviderRates | None:
+        """Rebuild rates of the latest `200` response from stored rates, `None` if they are not there."""
+        if not self._stored_rates or not (updates := await self.update_history()):
+            return None
+        # * rates taken from the latest response carry its `Last-Modified`, other providers' ones do not
+        last_modified = updates[-1]
+        rates = [
+            r
+            for r in await self._stored_rates.hgetall_currencies_all(PIVOT_CURRENCY)
+            if r["last_modified"] == last_modified
+        ]
+        if not rates:
+            return None
+        LOG.info("Restored %s rates of previous response @ %s", len(rates), self.name)
+        return ProviderRates(
+            provider=self.name,
+            rates={r["currency"]: r["rate"] for r in rates},
+            request_at=max(r["request_at"] for r in rates),
+            last_modified=last_modified,
+        )
+
+    async def update_history(self) -> list[int]:
+        return await self._etag_cache.get_updates(_LATEST_ENDPOINT)
+
+    async def request_quota(self) -> RequestQuota | None:
+        usage = await fetch_oex_usage(self._client)
+        if not usage or usage.requests_remaining < 0:
+            return None
+        # * quota resets after `days_remaining` full days plus the rest of today
+        now = datetime.now(UTC)
+        end_of_today = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), UTC)
+        reset_in = end_of_today - now + timedelta(days=usage.days_remaining)
+        return RequestQuota(remaining=usage.requests_remaining, reset_in_seconds=int(reset_in.total_seconds()))
+
+
+def _clean_etag(etag: str) -> str:
+    m = re.match(r'(?:W/)?"(.+)"', etag)
+    return m.group(1) if m else etag
+
+
+async def _store_response_etag(
+    etag_cache: LastRequestETagRedisCache,
+    endpoint: str,
+    headers: CIMultiDictProxy[str],
+) -> None:
+    if (etag := headers.get(hdrs.ETAG)) and (date_rfc_7231 := headers.get(hdrs.DATE)):
+        await etag_cache.hset_conv(
+            {
+                "etag": etag,
+                "rq_date": int(parsedate_to_datetime(date_rfc_7231).timestamp()),
+                "rq_date_rfc_7231": date_rfc_7231,
+            },
+            endpoint=endpoint,
+        )
+
+
+def _date_etag_to_cc_headers(prev_meta: RequestLastModETagCacheValue | None) -> dict[istr, str] | None:
+    if prev_meta and (date_rfc_7231 := prev_meta.get("rq_date_rfc_7231")) and (etag := prev_meta.get("etag")):
+        h = {hdrs.IF_NONE_MATCH: etag, hdrs.IF_MODIFIED_SINCE: date_rfc_7231}
+        LOG.info("passing cache control headers: %s", h)
+        return h
+    return None
+
+
+def _log_http_status_and_headers(status: HTTPStatus, headers: CIMultiDictProxy, endpoint: str, provider: str) -> None:
+    log_msg = f"HTTP Status: {status.value} {status.phrase}. Endpoint: '{endpoint}' @ {provider}"
+    if status in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+        LOG.info(log_msg)
+    else:
+        LOG.warning(log_msg)
+
+    for k, v in headers.items():
+        LOG.debug("header - %s: %s", k, v)
@@ -0,0 +1,147 @@
+"""Local stand-in of the OEX API: records `latest.json` responses and replays them over HTTP.
+
+`OexReplayServer` serves recorded payloads one at a time, as OEX does: `ETag` and `Last-Modified` of
+the current payload, `304 Not Modified` for matching `If-None-Match` / `If-Modified-Since`.
+`advance()` switches to the next payload, as if OEX published new rates. Lets ingestion be tested
+and benchmarked offline, with an `aiohttp` client pointed at `base_url`.
+"""
+
+import hashlib
+import json
+import logging
+from collections.abc import Mapping, Sequence
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from http import HTTPStatus
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+import aiohttp
+from aiohttp import hdrs, web
+
+LOG = logging.getLogger(__name__)
+
+_LATEST_ENDPOINT = "latest.json"
+
+
+async def record_oex_latest(client: aiohttp.ClientSession, directory: Path | str) -> Path:
+    """Save body of current OEX `latest.json` as `{directory}/{timestamp}.json` (counts towards quota)."""
+    async with client.get(_LATEST_ENDPOINT) as response:
+        response.raise_for_status()
+        body = await response.read()
+    path = Path(directory) / f"{json.loads(body)['timestamp']}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(body)
+    LOG.info("Recorded OEX rates to %s", path)
+    return path
+
+
+def load_recordings(directory: Path | str) -> list[bytes]:
+    """Load recorded `latest.json` bodies, oldest first."""
+    return [p.read_bytes() for p in sorted(Path(directory).glob("*.json"), key=lambda p: int(p.stem))]
+
+
+def synthetic_oex_latest(currencies: int, *, timestamp: int, seed: int = 0, codes: Sequence[str] = ()) -> bytes:
+    """`latest.json` body with `currencies` rates (USD base): `codes` first, then made up `X000`, `X001`, ...
+
+    Every rate but USD differs between `seed`s.
+    """
+    names = list(dict.fromkeys(["USD", *codes]))[:currencies]
+    names += [f"X{i:03d}" for i in range(currencies - len(names))]
+    rates = {c: 1.0 if c == "USD" else round(1 + i / 7 + seed / 1000, 6) for i, c in enumerate(names)}
+    return json.dumps({"disclaimer": "synthetic", "timestamp": timestamp, "base": "USD", "rates": rates}).encode()
+
+
+class OexReplayServer:
+    def __init__(
+        self,
+        recordings: Sequence[bytes],
+        *,
+        usage: Mapping[str, Any] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        if not recordings:
+            msg = "At least one recording is required"
+            raise ValueError(msg)
+        self._recordings = list(recordings)
+        self._usage = usage or {"requests_remaining": -1, "days_remaining": 0}
+        self._host = host
+        self._port = port
+        self._current = 0
+        self._runner: web.AppRunner | None = None
+        self.status_counts: dict[int, int] = {}
+
+    @property
+    def base_url(self) -> str:
+        if not self._runner:
+            msg = "Replay server is not started"
+            raise RuntimeError(msg)
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}/"
+
+    def advance(self) -> bool:
+        """Serve next recording. Returns `False` (and keeps serving the last one) if there is none."""
+        if self._current + 1 >= len(self._recordings):
+            return False
+        self._current += 1
+        return True
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get(f"/{_LATEST_ENDPOINT}", self._latest)
+        app.router.add_get("/usage.json", self._usage_handler)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self._host, self._port).start()
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> Self:
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.stop()
+
+    async def _latest(self, request: web.Request) -> web.Response:
+        body = self._recordings[self._current]
+        etag = f'"{hashlib.sha1(body, usedforsecurity=False).hexdigest()}"'
+        last_modified = datetime.fromtimestamp(json.loads(body)["timestamp"], UTC)
+        headers = {
+            hdrs.ETAG: etag,
+            hdrs.LAST_MODIFIED: format_datetime(last_modified, usegmt=True),
+            hdrs.DATE: format_datetime(datetime.now(UTC), usegmt=True),
+            hdrs.CACHE_CONTROL: "private",
+        }
+        if _not_modified(request, etag, last_modified):
+            return self._respond(web.Response(status=HTTPStatus.NOT_MODIFIED, headers=headers))
+        return self._respond(web.Response(body=body, content_type="application/json", headers=headers))
+
+    async def _usage_handler(self, _: web.Request) -> web.Response:
+        return self._respond(web.json_response({"status": 200, "data": {"usage": dict(self._usage)}}))
+
+    def _respond(self, response: web.Response) -> web.Response:
+        self.status_counts[response.status] = self.status_counts.get(response.status, 0) + 1
+        return response
+
+
+def _not_modified(request: web.Request, etag: str, last_modified: datetime) -> bool:
+    # * RFC 9110: `If-None-Match` takes precedence, `If-Modified-Since` is only evaluated without it
+    if if_none_match := request.headers.get(hdrs.IF_NONE_MATCH):
+        return etag in (t.strip().removeprefix("W/") for t in if_none_match.split(","))
+    if if_modified_since := request.headers.get(hdrs.IF_MODIFIED_SINCE):
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
@@ -0,0 +1,60 @@
+"""Registry of rates providers by name, as listed in `RATES_PROVIDERS` setting."""
+
+from collections.abc import Callable, Iterable
+from datetime import timedelta
+from typing import Final
+
+from finnikacc_api import settings
+from finnikacc_api.lifecycle.dependencies import ExternalDependencies
+from finnikacc_api.providers.base import RatesProvider, RatesProviderError
+from finnikacc_api.providers.file import FileRatesProvider
+from finnikacc_api.providers.oex import OexRatesProvider
+from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache, LastRequestETagRedisCache
+
+# * `stored_rates` is the cache the fetch job writes pivot rates to, `None` if there is none
+type RatesProviderFactory = Callable[[ExternalDependencies, CurrencyRateRedisCache | None], RatesProvider]
+
+_ETAG_EXPIRATION_SEC: Final = int(timedelta(hours=2).total_seconds())
+
+_REGISTRY: dict[str, RatesProviderFactory] = {}
+
+
+def register_rates_provider(name: str) -> Callable[[RatesProviderFactory], RatesProviderFactory]:
+    def decorator(factory: RatesProviderFactory) -> RatesProviderFactory:
+        if name in _REGISTRY:
+            msg = f"Rates provider '{name}' is already registered"
+            raise RatesProviderError(msg)
+        _REGISTRY[name] = factory
+        return factory
+
+    return decorator
+
+
+def create_rates_providers(
+    names: Iterable[str],
+    edeps: ExternalDependencies,
+    *,
+    stored_rates: CurrencyRateRedisCache | None = None,
+) -> tuple[RatesProvider, ...]:
+    """Create providers in the order of `names` (which is their merge precedence)."""
+    providers = []
+    for name in names:
+        if name not in _REGISTRY:
+            msg = f"Unknown rates provider '{name}', known are: {', '.join(sorted(_REGISTRY))}"
+            raise RatesProviderError(msg)
+        providers.append(_REGISTRY[name](edeps, stored_rates))
+    return tuple(providers)
+
+
+@register_rates_provider("oex")
+def _oex_rates_provider(edeps: ExternalDependencies, stored_rates: CurrencyRateRedisCache | None) -> RatesProvider:
+    etag_cache = LastRequestETagRedisCache(edeps.redis, expiration_seconds=_ETAG_EXPIRATION_SEC, provider="oex")
+    return OexRatesProvider(edeps.oex_client, etag_cache, stored_rates=stored_rates)
+
+
+@register_rates_provider("file")
+def _file_rates_provider(_: ExternalDependencies, __: CurrencyRateRedisCache | None) -> RatesProvider:
+    if not settings.app.RATES_FILE_PROVIDER_PATH:
+        msg = "Rates provider 'file' requires RATES_FILE_PROVIDER_PATH setting"
+        raise RatesProviderError(msg)
+    return FileRatesProvider(settings.app.RATES_FILE_PROVIDER_PATH)
@@ -0,0 +1,53 @@
+"""Batch conversion of amounts over a single cross rates snapshot."""
+
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass
+from decimal import Context, Decimal
+from operator import mul
+from typing import Final
+
+from finnikacc_api.rates.cross_rates import CrossRateMatrix, UnknownCurrencyError
+
+# * largest accepted amount (absolute value)
+MAX_AMOUNT: Final = 10**15
+
+# * default context (28 digits) can not quantize large converted amounts, this one fits any finite float
+_ROUNDING_CONTEXT: Final = Context(prec=400)
+_CENTS: Final = Decimal("0.01")
+_RATE_PLACES: Final = Decimal("0.000001")
+
+
+@dataclass(slots=True, frozen=True)
+class ConvertBatchResult:
+    rates: array
+    converted: array
+
+
+def convert_batch(
+    cross_rates: CrossRateMatrix,
+    amounts: Sequence[float],
+    from_currencies: Sequence[str],
+    to_currencies: Sequence[str],
+) -> ConvertBatchResult:
+    """Convert `amounts[i]` from `from_currencies[i]` to `to_currencies[i]` for whole batch at once."""
+    index = cross_rates.index
+    if unknown := sorted({c for c in (*from_currencies, *to_currencies) if c not in index}):
+        msg = f"Unknown currencies: {', '.join(unknown)}"
+        raise UnknownCurrencyError(msg)
+
+    n = len(cross_rates)
+    matrix = cross_rates.matrix
+    offsets = array("q", (index[f] * n + index[t] for f, t in zip(from_currencies, to_currencies, strict=True)))
+    rates = array("d", map(matrix.__getitem__, offsets))
+    converted = array("d", map(mul, array("d", amounts), rates))
+    return ConvertBatchResult(rates=rates, converted=converted)
+
+
+def round_amount(amount: float) -> Decimal:
+    return Decimal(f"{amount}").quantize(_CENTS, context=_ROUNDING_CONTEXT)
+
+
+def round_rate(rate: float | str) -> Decimal:
+    """Round rate (float, or `f"{float}"` string as stored in Redis) as served by all rate endpoints."""
+    return Decimal(f"{rate}").quantize(_RATE_PLACES, context=_ROUNDING_CONTEXT)
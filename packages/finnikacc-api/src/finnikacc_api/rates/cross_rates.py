@@ -0,0 +1,51 @@
+"""Cross rates between any two currencies derived from rates against a single pivot currency.
+
+Provider gives rates for `PIVOT_CURRENCY` only (`1 PIVOT = rate QUOTE`), so rate of
+`quote` in units of `base` is `rate(quote) / rate(base)`. The full N x N matrix is
+computed once per snapshot, so requests for any base currency are plain lookups.
+"""
+
+from array import array
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Final
+
+PIVOT_CURRENCY: Final = "USD"
+
+
+class UnknownCurrencyError(ValueError):
+    pass
+
+
+@dataclass(slots=True, frozen=True)
+class CrossRateMatrix:
+    currencies: tuple[str, ...]
+    index: Mapping[str, int]
+    # * row-major: `matrix[i * n + j]` is rate of `currencies[j]` for 1 unit of `currencies[i]`
+    matrix: array
+
+    @classmethod
+    def from_pivot_rates(cls, pivot_rates: Mapping[str, float], *, pivot: str = PIVOT_CURRENCY) -> "CrossRateMatrix":
+        rates = {pivot: 1.0, **{c: float(r) for c, r in pivot_rates.items() if r}}
+        currencies = tuple(rates)
+        column = array("d", rates.values())
+        matrix = array("d")
+        for base_rate in column:
+            inv = 1.0 / base_rate
+            matrix.extend(array("d", (r * inv for r in column)))
+        return cls(currencies=currencies, index={c: i for i, c in enumerate(currencies)}, matrix=matrix)
+
+    def __contains__(self, currency: object) -> bool:
+        return currency in self.index
+
+    def __len__(self) -> int:
+        return len(self.currencies)
+
+    def rate(self, base_currency: str, quote_currency: str) -> float:
+        return self.matrix[self.index[base_currency] * len(self.currencies) + self.index[quote_currency]]
+
+    def row(self, base_currency: str) -> memoryview:
+        """Rates of all `currencies` (in the same order) for 1 unit of `base_currency`, zero-copy."""
+        n = len(self.currencies)
+        start = self.index[base_currency] * n
+        return memoryview(self.matrix)[start : start + n]
@@ -0,0 +1,94 @@
+"""Coalescing of concurrent Redis reads (single-flight + micro-batching, aka dataloader).
+
+Keys requested within `window_seconds` are loaded together by one `load` call (one pipeline), each distinct
+key once, and the value is fanned out to every waiter. A key whose load is already in flight is not loaded
+again, callers join it; so under burst load number of Redis commands follows distinct keys, not requests.
+
+! A caller joining an in-flight load may get a value read up to one round trip before its own request.
+! Values are shared between waiters and must not be mutated.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Iterable, Mapping
+
+
+class ReadBatcher[K: Hashable, V]:
+    def __init__(
+        self,
+        load: Callable[[list[K]], Awaitable[Mapping[K, V]]],
+        *,
+        window_seconds: float = 0.0,
+        max_batch: int = 1000,
+    ) -> None:
+        """`load` gets distinct keys and returns values of those which exist; `0` window batches one loop tick."""
+        self._load = load
+        self._window = window_seconds
+        self._max_batch = max_batch
+        self._futures: dict[K, asyncio.Future[V | None]] = {}
+        self._pending: list[K] = []
+        self._flush_handle: asyncio.Handle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def get(self, key: K) -> V | None:
+        return (await self.get_many([key]))[key]
+
+    async def get_many(self, keys: Iterable[K]) -> dict[K, V | None]:
+        """Values of `keys` (`None` for missing ones)."""
+        loop = asyncio.get_running_loop()
+        futures: dict[K, asyncio.Future[V | None]] = {}
+        for key in keys:
+            if key in futures:
+                continue
+            if (future := self._futures.get(key)) is None:
+                future = self._futures[key] = loop.create_future()
+                self._pending.append(key)
+            futures[key] = future
+
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._pending and not self._flush_handle:
+            self._flush_handle = (
+                loop.call_later(self._window, self._flush) if self._window > 0 else loop.call_soon(self._flush)
+            )
+        # * shielded: a cancelled caller must not cancel the load other callers wait for
+        return {key: await asyncio.shield(future) for key, future in futures.items()}
+
+    def _flush(self) -> None:
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._load_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, batch: list[K]) -> None:
+        futures = [self._futures[key] for key in batch]
+        try:
+            values = await self._load(batch)
+        # * not only `RedisError`: a value which fails to decode must fail its waiters too, never leave them hanging
+        except Exception as e:  # noqa: BLE001
+            _set_exception(futures, e)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        else:
+            _set_results(batch, futures, values)
+        finally:
+            for key, future in zip(batch, futures, strict=True):
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+
+
+def _set_results[K, V](keys: list[K], futures: list[asyncio.Future[V | None]], values: Mapping[K, V]) -> None:
+    for key, future in zip(keys, futures, strict=True):
+        if not future.done():
+            future.set_result(values.get(key))
+
+
+def _set_exception(futures: Iterable[asyncio.Future], e: Exception) -> None:
+    for future in futures:
+        if not future.done():
+            future.set_exception(e)
@@ -0,0 +1,120 @@
+"""Lua scripts writing or reading a whole rates snapshot together with its version, atomically, in one round trip.
+
+Writers bump the snapshot version (`INCR`) in the same script which replaces rates and sets their TTL,
+so readers never see a mix of old and new rates, and a version always names exactly one set of rates.
+
+! Pair keys are derived inside the scripts from `ARGV` prefix, which is fine for a single Redis instance
+! but not for Redis Cluster (all keys of a snapshot would need one hash slot), see `REDIS_RATES_LAYOUT` setting.
+"""
+
+from typing import Final
+
+# * KEYS: version, index, pair hashes...
+# * ARGV: ttl, pair hash name prefix, then per pair: currency, rate, request_at, last_modified
+PUBLISH_HASH_PER_PAIR: Final = """
+local ttl = ARGV[1]
+local version = redis.call('INCR', KEYS[1])
+-- pairs of previous snapshot are dropped with the index, none of them outlives it
+for _, currency in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+    redis.call('DEL', ARGV[2] .. currency)
+end
+redis.call('DEL', KEYS[2])
+for i = 3, #KEYS do
+    local a = 3 + (i - 3) * 4
+    redis.call('HSET', KEYS[i],
+        'currency', ARGV[a], 'rate', ARGV[a + 1], 'request_at', ARGV[a + 2], 'last_modified', ARGV[a + 3])
+    redis.call('EXPIRE', KEYS[i], ttl)
+    redis.call('SADD', KEYS[2], ARGV[a])
+end
+if #KEYS > 2 then
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+return version
+"""
+
+# * diff-only variant of PUBLISH_HASH_PER_PAIR: pairs with unchanged rate only get timestamps and TTL refreshed,
+# * changes (if any) are appended to a stream as one compact event
+# * KEYS: version, index, changes stream
+# * ARGV: ttl, pair hash name prefix, stream max length, then per pair: currency, rate, request_at, last_modified
+# * returns: version, changed pairs flat (currency, rate), removed currencies
+PUBLISH_HASH_PER_PAIR_DIFF: Final = """
+local ttl, prefix = ARGV[1], ARGV[2]
+local version = redis.call('INCR', KEYS[1])
+local current, changed, removed = {}, {}, {}
+for i = 4, #ARGV, 4 do
+    local currency, rate = ARGV[i], ARGV[i + 1]
+    local name = prefix .. currency
+    current[currency] = true
+    if redis.call('HGET', name, 'rate') == rate then
+        redis.call('HSET', name, 'request_at', ARGV[i + 2], 'last_modified', ARGV[i + 3])
+    else
+        redis.call('HSET', name,
+            'currency', currency, 'rate', rate, 'request_at', ARGV[i + 2], 'last_modified', ARGV[i + 3])
+        redis.call('SADD', KEYS[2], currency)
+        table.insert(changed, currency)
+        table.insert(changed, rate)
+    end
+    redis.call('EXPIRE', name, ttl)
+end
+for _, currency in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+    if not current[currency] then
+        redis.call('DEL', prefix .. currency)
+        redis.call('SREM', KEYS[2], currency)
+        table.insert(removed, currency)
+    end
+end
+if #ARGV > 3 then
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+if #changed > 0 or #removed > 0 then
+    redis.call('XADD', KEYS[3], 'MAXLEN', '~', ARGV[3], '*',
+        'version', version, 'changed', table.concat(changed, '|'), 'removed', table.concat(removed, '|'))
+end
+return {version, changed, removed}
+"""
+
+# * KEYS: version, index
+# * ARGV: pair hash name prefix (quote currency is appended)
+# * returns: version, then flat HGETALL reply per pair
+READ_HASH_PER_PAIR: Final = """
+local result = {tonumber(redis.call('GET', KEYS[1]) or '0')}
+for _, currency in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+    local pair = redis.call('HGETALL', ARGV[1] .. currency)
+    if #pair > 0 then
+        table.insert(result, pair)
+    end
+end
+return result
+"""
+
+# * KEYS: version, base hash
+# * ARGV: ttl, then per pair: quote currency, packed rate
+PUBLISH_HASH_PER_BASE: Final = """
+local version = redis.call('INCR', KEYS[1])
+redis.call('DEL', KEYS[2])
+if #ARGV > 1 then
+    redis.call('HSET', KEYS[2], unpack(ARGV, 2))
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+end
+return version
+"""
+
+# * KEYS: version, blob
+# * ARGV: ttl, encoded blob (empty to delete snapshot), offset of version in blob
+PUBLISH_SNAPSHOT_BLOB: Final = """
+local version = redis.call('INCR', KEYS[1])
+if ARGV[2] == '' then
+    redis.call('DEL', KEYS[2])
+    return version
+end
+local offset = tonumber(ARGV[3])
+local v = version
+local bytes = {}
+for i = 1, 8 do
+    bytes[i] = string.char(v % 256)
+    v = math.floor(v / 256)
+end
+local blob = string.sub(ARGV[2], 1, offset) .. table.concat(bytes) .. string.sub(ARGV[2], offset + 9)
+redis.call('SET', KEYS[2], blob, 'EX', ARGV[1])
+return version
+"""
@@ -0,0 +1,149 @@
+"""Fleet-wide lease on rates fetch: at most one fetch runs at a time, each tick is fetched once.
+
+A fetch of a tick (arq job id: planned time of scheduled fetch, period of out-of-schedule one) first
+acquires the lease. The lease expires after `ttl_seconds`, so a dead holder does not block later ticks.
+Every acquired lease gets a fencing token (a counter, always growing); writers `check_fence` before
+each write step, and a holder whose lease expired while it was stalled is refused once a newer holder
+has written. Completed ticks are remembered, so the same tick enqueued again (restart, retry, another
+queue) is skipped.
+
+Outcomes are counted in one hash shared by all instances (see `get_stats`).
+"""
+
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from typing import Final, Literal
+
+from redis.asyncio import Redis
+
+from finnikacc_api import settings
+from finnikacc_api.redis._redis_utils import _redis_await
+from finnikacc_api.redis.model import _convert_bytes_to_str
+
+LOG = logging.getLogger(__name__)
+
+FetchLeaseOutcome = Literal["acquired", "contended", "done", "completed", "lost", "fenced_off"]
+
+# * KEYS: lease, token counter, tick done marker, stats
+# * ARGV: lease ttl (ms), holder
+# * returns: {token, outcome}, token is 0 unless acquired
+_ACQUIRE: Final = """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('HINCRBY', KEYS[4], 'done', 1)
+    return {0, 'done'}
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBY', KEYS[4], 'contended', 1)
+    return {0, 'contended'}
+end
+local token = redis.call('INCR', KEYS[2])
+redis.call('SET', KEYS[1], token .. ':' .. ARGV[2], 'PX', ARGV[1])
+redis.call('HINCRBY', KEYS[4], 'acquired', 1)
+return {token, 'acquired'}
+"""
+
+# * KEYS: lease, tick done marker, stats
+# * ARGV: lease value, done marker ttl (s) or 0 to release without marking tick done
+# * returns: 1 if lease was still held, 0 if it expired (or was taken over) meanwhile
+_RELEASE: Final = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    redis.call('HINCRBY', KEYS[3], 'lost', 1)
+    return 0
+end
+redis.call('DEL', KEYS[1])
+if tonumber(ARGV[2]) > 0 then
+    redis.call('SET', KEYS[2], 1, 'EX', ARGV[2])
+    redis.call('HINCRBY', KEYS[3], 'completed', 1)
+end
+return 1
+"""
+
+# * KEYS: fence (highest token which has written), stats
+# * ARGV: token
+# * returns: 1 if token is not older than the fence (fence moves up to it), 0 otherwise
+_CHECK_FENCE: Final = """
+local fence = tonumber(redis.call('GET', KEYS[1]) or '0')
+local token = tonumber(ARGV[1])
+if token < fence then
+    redis.call('HINCRBY', KEYS[2], 'fenced_off', 1)
+    return 0
+end
+if token > fence then
+    redis.call('SET', KEYS[1], token)
+end
+return 1
+"""
+
+
+class StaleFetchLeaseError(RuntimeError):
+    """Lease holder is fenced off: a fetch with a newer lease has written already."""
+
+
+@dataclass(slots=True, kw_only=True, frozen=True)
+class FetchLease:
+    tick: str
+    token: int
+    value: str
+
+
+class FetchLeaseRedisCache:
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        ttl_seconds: int,
+        namespace: str = "fcc",
+        name: str = "fetch_conv_rates",
+        done_ttl_seconds: int = 24 * 3600,
+    ) -> None:
+        self._redis = redis
+        self._ttl_ms = ttl_seconds * 1000
+        self._done_ttl = done_ttl_seconds
+        self._name_prefix = f"{namespace}:{settings.APP_ENV}:lease:{name}"
+        self._lease_name = self._name_prefix
+        self._token_name = f"{self._name_prefix}:token"
+        self._fence_name = f"{self._name_prefix}:fence"
+        self._stats_name = f"{self._name_prefix}:stats"
+        self._done_name_template = f"{self._name_prefix}:done:{{tick}}"
+        self._holder = f"{socket.gethostname()}:{os.getpid()}"
+        self._acquire = redis.register_script(_ACQUIRE)
+        self._release = redis.register_script(_RELEASE)
+        self._check_fence = redis.register_script(_CHECK_FENCE)
+
+    def _done_name(self, tick: str) -> str:
+        return self._done_name_template.format(tick=tick)
+
+    async def acquire(self, tick: str) -> FetchLease | None:
+        """Lease for fetching `tick`, `None` if another fetch holds the lease or `tick` was fetched already."""
+        token, outcome = await self._acquire(
+            keys=[self._lease_name, self._token_name, self._done_name(tick), self._stats_name],
+            args=[self._ttl_ms, self._holder],
+        )
+        if not token:
+            LOG.info("Rates fetch lease not acquired for '%s': %s", tick, _convert_bytes_to_str(outcome))
+            return None
+        LOG.debug("Rates fetch lease acquired for '%s', token %s", tick, token)
+        return FetchLease(tick=tick, token=int(token), value=f"{token}:{self._holder}")
+
+    async def release(self, lease: FetchLease, *, completed: bool) -> bool:
+        """Give lease up; `completed` marks its tick as fetched. Returns `False` if lease had expired meanwhile."""
+        held = await self._release(
+            keys=[self._lease_name, self._done_name(lease.tick), self._stats_name],
+            args=[lease.value, self._done_ttl if completed else 0],
+        )
+        if not held:
+            LOG.warning("Rates fetch lease for '%s' (token %s) expired before release", lease.tick, lease.token)
+        return bool(held)
+
+    async def check_fence(self, lease: FetchLease) -> None:
+        """Raise `StaleFetchLeaseError` if a fetch with a newer lease has written already."""
+        if not await self._check_fence(keys=[self._fence_name, self._stats_name], args=[lease.token]):
+            msg = f"Rates fetch lease for '{lease.tick}' (token {lease.token}) is fenced off by a newer one"
+            raise StaleFetchLeaseError(msg)
+
+    async def get_stats(self) -> dict[FetchLeaseOutcome, int]:
+        """Count lease outcomes across all instances."""
+        result: dict[bytes, bytes] = await _redis_await(self._redis.hgetall(self._stats_name))
+        return {_convert_bytes_to_str(k): int(v) for k, v in result.items()}  # pyright: ignore[reportReturnType]
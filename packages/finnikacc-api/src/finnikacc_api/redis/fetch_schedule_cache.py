@@ -0,0 +1,37 @@
+"""Time of the next planned rates fetch, written by the fetch scheduler and read by the web API for `Cache-Control`."""
+
+import logging
+import time
+
+from redis.asyncio import Redis
+
+from finnikacc_api import settings
+from finnikacc_api.redis._redis_utils import _redis_await
+
+LOG = logging.getLogger(__name__)
+
+# * once planned time passes, new plan is expected any moment (when that fetch completes)
+_PASSED_REFRESH_SEC = 1.0
+
+
+class FetchScheduleRedisCache:
+    def __init__(self, redis: Redis, *, namespace: str = "fcc", refresh_seconds: float = 30) -> None:
+        self._redis = redis
+        self._name = f"{namespace}:{settings.APP_ENV}:fetch_schedule:next_fetch_at"
+        self._refresh_seconds = refresh_seconds
+        self._next_fetch_at: int | None = None
+        self._read_at = float("-inf")
+
+    async def set_next_fetch_at(self, at: int) -> None:
+        # * expires soon after it passes, missing value means nothing is planned
+        await _redis_await(self._redis.set(self._name, at, exat=at + 3600))
+        self._next_fetch_at, self._read_at = at, time.monotonic()
+
+    async def get_next_fetch_at(self, *, fresh: bool = False) -> int | None:
+        """Planned fetch time (timestamp seconds); read from Redis at most every `refresh_seconds` unless `fresh`."""
+        now = time.monotonic()
+        passed = self._next_fetch_at is not None and self._next_fetch_at < time.time()
+        if fresh or now - self._read_at > (_PASSED_REFRESH_SEC if passed else self._refresh_seconds):
+            result: bytes | None = await _redis_await(self._redis.get(self._name))
+            self._next_fetch_at, self._read_at = (int(result) if result else None), now
+        return self._next_fetch_at
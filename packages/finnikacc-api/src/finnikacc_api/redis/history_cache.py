@@ -0,0 +1,302 @@
+"""Time-series of ingested rates per currency pair, with rolling averages maintained on write.
+
+Every snapshot stored by the fetch job is appended to a sorted set per pair (score is rates timestamp).
+Running sum and count for each averaging window are kept in one hash per base currency and updated
+incrementally: new point is added, points which fell out of the window are subtracted. Reading
+averages is a single `HMGET`/`HGETALL`, no matter how long the history is.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import Final
+
+from redis.asyncio import Redis
+
+from finnikacc_api import settings
+from finnikacc_api.rates.cross_rates import PIVOT_CURRENCY, CrossRateMatrix, UnknownCurrencyError
+from finnikacc_api.redis._redis_utils import _redis_await
+from finnikacc_api.redis.model import (
+    _PACKED_CR_SEPARATOR,
+    CurrencyRateAverageWindow,
+    CurrencyRateCacheValueTyped,
+    _convert_bytes_to_str,
+)
+
+LOG = logging.getLogger(__name__)
+
+AVERAGE_WINDOWS: Final[dict[CurrencyRateAverageWindow, int]] = {
+    "1d": 24 * 3600,
+    "2d": 2 * 24 * 3600,
+    "7d": 7 * 24 * 3600,
+}
+_MAX_WINDOW_SEC: Final = max(AVERAGE_WINDOWS.values())
+_MIN_WINDOW_SEC: Final = min(AVERAGE_WINDOWS.values())
+
+
+@dataclass(slots=True, kw_only=True)
+class _AverageState:
+    last_at: int
+    sums: list[float]
+    counts: list[int]
+
+    @classmethod
+    def first(cls, at: int, rate: float) -> "_AverageState":
+        return cls(last_at=at, sums=[rate] * len(AVERAGE_WINDOWS), counts=[1] * len(AVERAGE_WINDOWS))
+
+    @classmethod
+    def from_points(cls, points: list[tuple[int, float]]) -> "_AverageState":
+        last_at = max(at for at, _ in points)
+        sums, counts = [], []
+        for window in AVERAGE_WINDOWS.values():
+            in_window = [r for at, r in points if at > last_at - window]
+            sums.append(sum(in_window))
+            counts.append(len(in_window))
+        return cls(last_at=last_at, sums=sums, counts=counts)
+
+    @classmethod
+    def unpack(cls, packed: str | bytes) -> "_AverageState":
+        last_at, *values = _convert_bytes_to_str(packed).split(_PACKED_CR_SEPARATOR)
+        return cls(
+            last_at=int(last_at),
+            sums=[float(v) for v in values[0::2]],
+            counts=[int(v) for v in values[1::2]],
+        )
+
+    def pack(self) -> str:
+        values = [str(self.last_at)]
+        for s, c in zip(self.sums, self.counts, strict=True):
+            values.extend((f"{s}", str(c)))
+        return _PACKED_CR_SEPARATOR.join(values)
+
+    def advance(self, at: int, rate: float, evicted: list[tuple[int, float]]) -> None:
+        """Add point `(at, rate)`, drop `evicted` points which are not within windows ending at `at` anymore."""
+        for i, window in enumerate(AVERAGE_WINDOWS.values()):
+            # * window ending at `t` contains points `t - window < point_at <= t`
+            out = [r for p_at, r in evicted if self.last_at - window < p_at <= at - window]
+            self.sums[i] += rate - sum(out)
+            self.counts[i] += 1 - len(out)
+            if self.counts[i] <= 1:
+                # * do not carry float rounding error over once window is (almost) empty
+                self.sums[i], self.counts[i] = rate, 1
+        self.last_at = at
+
+
+def _pack_point(at: int, rate: float) -> str:
+    return f"{at}{_PACKED_CR_SEPARATOR}{rate}"
+
+
+def _unpack_point(packed: str | bytes) -> tuple[int, float]:
+    at, rate = _convert_bytes_to_str(packed).split(_PACKED_CR_SEPARATOR)
+    return int(at), float(rate)
+
+
+class CurrencyRateHistoryRedisCache:
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        retention_seconds: int,
+        namespace: str = "fcc",
+        provider: str = "oex",
+    ) -> None:
+        if retention_seconds < _MAX_WINDOW_SEC:
+            msg = f"History retention must cover the longest averaging window ({_MAX_WINDOW_SEC}s)"
+            raise ValueError(msg)
+        self._redis = redis
+        self._retention = retention_seconds
+        self._name_prefix = f"{namespace}:{settings.APP_ENV}:history:{provider}"
+        self._series_name_template = f"{self._name_prefix}:{{base_currency}}:{{quote_currency}}"
+        self._averages_name_template = f"{self._name_prefix}:averages:{{base_currency}}"
+        self._checkpoint_name_template = f"{self._name_prefix}:backfill:{{base_currency}}"
+
+    @property
+    def retention_seconds(self) -> int:
+        return self._retention
+
+    def _series_name(self, base_currency: str, quote_currency: str) -> str:
+        return self._series_name_template.format(base_currency=base_currency, quote_currency=quote_currency)
+
+    def _averages_name(self, base_currency: str) -> str:
+        return self._averages_name_template.format(base_currency=base_currency)
+
+    def _checkpoint_name(self, base_currency: str) -> str:
+        return self._checkpoint_name_template.format(base_currency=base_currency)
+
+    async def append_snapshot(self, rates: dict[str, CurrencyRateCacheValueTyped], *, base_currency: str) -> int:
+        """Append rates (timestamped by `request_at`) to pair series and update averages.
+
+        Rates not newer than the last appended point of the pair are skipped. Returns number of appended points.
+        """
+        if not rates:
+            return 0
+        quotes = list(rates)
+        packed_states: list[bytes | None] = await _redis_await(
+            self._redis.hmget(self._averages_name(base_currency), quotes),
+        )
+        states = {q: _AverageState.unpack(p) for q, p in zip(quotes, packed_states, strict=True) if p}
+
+        # * only points leaving averaging windows are read, never the whole series
+        to_advance = [
+            q
+            for q in quotes
+            if (s := states.get(q)) and s.last_at < rates[q]["request_at"] < s.last_at + _MAX_WINDOW_SEC
+        ]
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for q in to_advance:
+                pipe.zrangebyscore(
+                    self._series_name(base_currency, q),
+                    f"({states[q].last_at - _MAX_WINDOW_SEC}",
+                    rates[q]["request_at"] - _MIN_WINDOW_SEC,
+                )
+            evicted = dict(zip(to_advance, await pipe.execute(), strict=True))
+
+        appended = {}
+        for q, r in rates.items():
+            at, state = r["request_at"], states.get(q)
+            if state and at <= state.last_at:
+                continue
+            if state and q in evicted:
+                state.advance(at, r["rate"], [_unpack_point(p) for p in evicted[q]])
+            else:
+                # * first point, or all previous points are out of every window
+                state = _AverageState.first(at, r["rate"])
+            appended[q] = (at, r["rate"], state)
+
+        if not appended:
+            return 0
+        async with self._redis.pipeline() as pipe:
+            for q, (at, rate, _) in appended.items():
+                name = self._series_name(base_currency, q)
+                pipe.zadd(name, {_pack_point(at, rate): at})
+                pipe.zremrangebyscore(name, "-inf", f"({at - self._retention}")
+                pipe.expire(name, self._retention)
+            pipe.hset(self._averages_name(base_currency), mapping={q: s.pack() for q, (_, _, s) in appended.items()})
+            pipe.expire(self._averages_name(base_currency), self._retention)
+            await pipe.execute()
+        LOG.debug("Appended %s %s rates to history", len(appended), base_currency)
+        return len(appended)
+
+    async def insert_snapshots(
+        self,
+        snapshots: Mapping[int, Mapping[str, float]],
+        *,
+        base_currency: str,
+        checkpoint: Iterable[str] = (),
+    ) -> int:
+        """Insert past snapshots (`{timestamp: {quote: rate}}`) in one transaction and rebuild averages.
+
+        Points older than retention are skipped, point stored for the same timestamp is replaced.
+        `checkpoint` ids are committed in the same transaction (see `get_checkpoint`).
+        Returns number of inserted points.
+        """
+        oldest_at = int(time.time()) - self._retention
+        points: dict[str, dict[str, int]] = defaultdict(dict)
+        for at, rates in snapshots.items():
+            if at > oldest_at:
+                for q, rate in rates.items():
+                    points[q][_pack_point(at, rate)] = at
+
+        async with self._redis.pipeline() as pipe:
+            for q, mapping in points.items():
+                name = self._series_name(base_currency, q)
+                for at in mapping.values():
+                    pipe.zremrangebyscore(name, at, at)
+                pipe.zadd(name, mapping)
+                pipe.expire(name, self._retention)
+            if checkpoint := list(checkpoint):
+                pipe.sadd(self._checkpoint_name(base_currency), *checkpoint)
+            await pipe.execute()
+
+        if points:
+            await self._rebuild_averages(base_currency, list(points))
+        return sum(len(m) for m in points.values())
+
+    async def get_checkpoint(self, base_currency: str) -> set[str]:
+        result: set[bytes] = await _redis_await(self._redis.smembers(self._checkpoint_name(base_currency)))
+        return {_convert_bytes_to_str(c) for c in result}
+
+    async def _rebuild_averages(self, base_currency: str, quotes: list[str]) -> None:
+        # * not incremental: reads whole (retention limited) series of every pair
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for q in quotes:
+                pipe.zrange(self._series_name(base_currency, q), 0, -1)
+            series = await pipe.execute()
+        states = {
+            q: _AverageState.from_points([_unpack_point(p) for p in s]).pack()
+            for q, s in zip(quotes, series, strict=True)
+            if s
+        }
+        if states:
+            async with self._redis.pipeline() as pipe:
+                pipe.hset(self._averages_name(base_currency), mapping=states)
+                pipe.expire(self._averages_name(base_currency), self._retention)
+                await pipe.execute()
+
+    async def get_averages(
+        self,
+        base_currency: str,
+        window: CurrencyRateAverageWindow,
+        *,
+        pivot: str = PIVOT_CURRENCY,
+    ) -> list[CurrencyRateCacheValueTyped]:
+        """Average rate over `window` per quote currency; `request_at`/`last_modified` is time of the last point.
+
+        Averages are maintained for `pivot` base only, for other bases they are derived as cross rates of averages.
+        """
+        result: dict[bytes, bytes] = await _redis_await(self._redis.hgetall(self._averages_name(pivot)))
+        i = list(AVERAGE_WINDOWS).index(window)
+        averages: list[CurrencyRateCacheValueTyped] = []
+        for c, p in sorted(result.items()):
+            state = _AverageState.unpack(p)
+            averages.append(
+                {
+                    "currency": _convert_bytes_to_str(c),
+                    "rate": state.sums[i] / state.counts[i],
+                    "request_at": state.last_at,
+                    "last_modified": state.last_at,
+                },
+            )
+        if base_currency == pivot or not averages:
+            return averages
+
+        cross_rates = CrossRateMatrix.from_pivot_rates({a["currency"]: a["rate"] for a in averages}, pivot=pivot)
+        if base_currency not in cross_rates:
+            msg = f"Unknown base currency '{base_currency}'"
+            raise UnknownCurrencyError(msg)
+        row = cross_rates.row(base_currency)
+        return [{**a, "rate": row[cross_rates.index[a["currency"]]]} for a in averages]
+
+    async def get_range(
+        self,
+        base_currency: str,
+        quote_currency: str,
+        *,
+        start: int,
+        end: int,
+        pivot: str = PIVOT_CURRENCY,
+    ) -> list[tuple[int, float]]:
+        """Rate points `start <= at <= end`; pairs without `pivot` are derived from two pivot series."""
+        if base_currency == pivot:
+            return await self._get_series(pivot, quote_currency, start, end)
+        base_series = await self._get_series(pivot, base_currency, start, end)
+        if quote_currency == pivot:
+            return [(at, 1 / r) for at, r in base_series if r]
+        quote_series = await self._get_series(pivot, quote_currency, start, end)
+        # * all pairs of a snapshot share timestamp, so series are joined by it
+        base_rates = dict(base_series)
+        return [(at, r / base_rates[at]) for at, r in quote_series if base_rates.get(at)]
+
+    async def _get_series(
+        self,
+        base_currency: str,
+        quote_currency: str,
+        start: int,
+        end: int,
+    ) -> list[tuple[int, float]]:
+        result: list[bytes] = await _redis_await(
+            self._redis.zrangebyscore(self._series_name(base_currency, quote_currency), start, end),
+        )
+        return [_unpack_point(p) for p in result]
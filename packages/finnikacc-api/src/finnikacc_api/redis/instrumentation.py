@@ -0,0 +1,112 @@
+"""Redis connection pool and client which measure themselves, in process (see `redis_stats`).
+
+Pool (blocking: with all `max_connections` in use, a command waits up to `timeout` for one to be
+released): connections in use and idle, time waited for a connection, waits which failed (timed out
+or could not connect). Client: latency of each command by name, pipelines counted as `PIPELINE`.
+
+! Stats are per process and reset on restart; numbers of all workers add up to fleet ones.
+"""
+
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any
+
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.asyncio.client import Pipeline
+
+PIPELINE_COMMAND = "PIPELINE"
+
+
+@dataclass(slots=True, kw_only=True)
+class LatencyStats:
+    count: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def observe(self, seconds: float, *, error: bool = False) -> None:
+        self.count += 1
+        self.errors += error
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def as_dict(self) -> dict[str, int | float]:
+        avg = self.total_seconds / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(avg * 1e3, 3),
+            "max_ms": round(self.max_seconds * 1e3, 3),
+        }
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    def __init__(self, **kwargs: Any) -> None:  # noqa: ANN401
+        super().__init__(**kwargs)
+        self.wait_stats = LatencyStats()
+
+    async def get_connection(self, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        # * includes connecting (and health check PING) when connection is new or idle for long
+        start = time.perf_counter()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except Exception:
+            self.wait_stats.observe(time.perf_counter() - start, error=True)
+            raise
+        self.wait_stats.observe(time.perf_counter() - start)
+        return connection
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "in_use": len(self._in_use_connections),
+            "idle": len(self._available_connections),
+            "wait": self.wait_stats.as_dict(),
+        }
+
+
+class _InstrumentedPipeline(Pipeline):
+    stats: LatencyStats
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:  # noqa: FBT001, FBT002
+        start = time.perf_counter()
+        try:
+            result = await super().execute(raise_on_error)
+        except Exception:
+            self.stats.observe(time.perf_counter() - start, error=True)
+            raise
+        self.stats.observe(time.perf_counter() - start)
+        return result
+
+
+class InstrumentedRedis(Redis):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+        super().__init__(*args, **kwargs)
+        self.command_stats: defaultdict[str, LatencyStats] = defaultdict(LatencyStats)
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:  # noqa: ANN401
+        stats = self.command_stats[str(args[0]).upper()]
+        start = time.perf_counter()
+        try:
+            result = await super().execute_command(*args, **options)
+        except Exception:
+            stats.observe(time.perf_counter() - start, error=True)
+            raise
+        stats.observe(time.perf_counter() - start)
+        return result
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> Pipeline:  # noqa: FBT001, FBT002
+        pipeline = _InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipeline.stats = self.command_stats[PIPELINE_COMMAND]
+        return pipeline
+
+
+def redis_stats(redis: Redis) -> dict[str, Any]:
+    """Pool gauges and wait time, latency per command; empty parts if `redis` is not instrumented."""
+    pool = redis.connection_pool
+    commands = redis.command_stats if isinstance(redis, InstrumentedRedis) else {}
+    return {
+        "pool": pool.stats() if isinstance(pool, InstrumentedConnectionPool) else {},
+        "commands": {name: stats.as_dict() for name, stats in sorted(commands.items())},
+    }
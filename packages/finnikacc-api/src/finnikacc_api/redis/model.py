@@ -1,6 +1,13 @@
 from typing import Any, Literal, TypedDict
 
 CurrencyRateCacheType = Literal["latest", "lastseen"]
+# * hash_per_pair: one hash per currency pair, one field per value
+# * hash_per_base: one hash per base currency, field is quote currency, value is packed record
+# * snapshot_blob: one string per base currency, whole snapshot in binary format (see `snapshot_blob`)
+CurrencyRateCacheLayout = Literal["hash_per_pair", "hash_per_base", "snapshot_blob"]
+CurrencyRateAverageWindow = Literal["1d", "2d", "7d"]
+
+_PACKED_CR_SEPARATOR = "|"
 
 class RequestLastModETagCacheValue(TypedDict):
     etag: str
@@ -34,6 +41,23 @@ def _convert_to_untyped_cr(mapping: CurrencyRateCacheValueTyped) -> CurrencyRate
     }
 
 
+class CurrencyRateChanges(TypedDict):
+    version: int
+    changed: dict[str, float]  # * new rate per changed or added quote currency
+    removed: list[str]
+
+
+def _unpack_changes(fields: dict[bytes, bytes]) -> CurrencyRateChanges:
+    """Change event from stream entry fields (`changed` is packed `currency|rate|...`, `removed` is `currency|...`)."""
+    event = _convert_dict_bytes_to_str(fields)
+    changed = event.get("changed", "").split(_PACKED_CR_SEPARATOR) if event.get("changed") else []
+    return {
+        "version": int(event["version"]),
+        "changed": {c: float(r) for c, r in zip(changed[0::2], changed[1::2], strict=True)},
+        "removed": event["removed"].split(_PACKED_CR_SEPARATOR) if event.get("removed") else [],
+    }
+
+
 def _convert_to_typed_cr(mapping: CurrencyRateCacheValue) -> CurrencyRateCacheValueTyped:
     return {
         "currency": _convert_bytes_to_str(mapping["currency"]),
@@ -42,6 +66,19 @@ def _convert_to_typed_cr(mapping: CurrencyRateCacheValue) -> CurrencyRateCacheVa
         "last_modified": int(mapping["last_modified"]),
     }
 
+def _pack_cr(mapping: CurrencyRateCacheValue) -> str:
+    return _PACKED_CR_SEPARATOR.join((mapping["rate"], mapping["request_at"], mapping["last_modified"]))
+
+
+def _unpack_cr(currency: str | bytes, packed: str | bytes) -> CurrencyRateCacheValue:
+    rate, request_at, last_modified = _convert_bytes_to_str(packed).split(_PACKED_CR_SEPARATOR)
+    return {
+        "currency": _convert_bytes_to_str(currency),
+        "rate": rate,
+        "request_at": request_at,
+        "last_modified": last_modified,
+    }
+
 def _convert_to_untyped_etag(mapping: RequestLastModETagCacheValueTyped) -> RequestLastModETagCacheValue:
     return {
         "etag": mapping["etag"],
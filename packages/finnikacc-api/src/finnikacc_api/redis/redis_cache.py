@@ -1,22 +1,46 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
 from collections.abc import AsyncGenerator
-from typing import cast
+from typing import Final, cast
 
 from redis.asyncio import Redis
 
 from finnikacc_api import settings
+from finnikacc_api.redis import _snapshot_scripts
+from finnikacc_api.redis._read_batcher import ReadBatcher
 from finnikacc_api.redis._redis_utils import _hgetall_names, _redis_await, hsetex
 from finnikacc_api.redis.model import (
+    _PACKED_CR_SEPARATOR,
+    CurrencyRateCacheLayout,
     CurrencyRateCacheType,
     CurrencyRateCacheValue,
     CurrencyRateCacheValueTyped,
+    CurrencyRateChanges,
     RequestLastModETagCacheValue,
     RequestLastModETagCacheValueTyped,
+    _convert_bytes_to_str,
     _convert_dict_bytes_to_str,
     _convert_to_typed_cr,
     _convert_to_typed_etag,
     _convert_to_untyped_cr,
     _convert_to_untyped_etag,
+    _pack_cr,
+    _unpack_changes,
+    _unpack_cr,
 )
+from finnikacc_api.redis.snapshot_blob import (
+    SNAPSHOT_BLOB_VERSION_OFFSET,
+    SnapshotBlob,
+    decode_snapshot_blob,
+    encode_snapshot_blob,
+)
+
+LOG = logging.getLogger(__name__)
+
+# * outlives migration of a few hundred rates, expires soon enough if the migrating process dies
+_MIGRATION_LOCK_SEC: Final = 30
 
 
 class LastRequestETagRedisCache:
@@ -27,15 +51,21 @@ class LastRequestETagRedisCache:
         expiration_seconds: int,
         namespace: str = "fcc",
         provider: str = "oex",
+        history_seconds: int = 7 * 24 * 3600,
     ) -> None:
         self._redis = redis
         self._ex = expiration_seconds
+        self._history_ex = history_seconds
         self._name_prefix = f"{namespace}:{settings.APP_ENV}:last_request:{provider}"
         self._name_template = f"{self._name_prefix}:{{endpoint}}"
+        self._updates_name_template = f"{self._name_prefix}:{{endpoint}}:updates"
 
     def _name(self, endpoint: str) -> str:
         return self._name_template.format(endpoint=endpoint)
 
+    def _updates_name(self, endpoint: str) -> str:
+        return self._updates_name_template.format(endpoint=endpoint)
+
     async def hget_conv(self, endpoint: str) -> RequestLastModETagCacheValueTyped | None:
         result = await self.hget_raw(endpoint)
         return _convert_to_typed_etag(result) if result else None
@@ -59,9 +89,23 @@ class LastRequestETagRedisCache:
             )
             await pipe.execute()
 
+    async def add_update(self, last_modified: int, *, endpoint: str) -> None:
+        """Record `Last-Modified` (timestamp seconds) of a response, kept for `history_seconds`."""
+        name = self._updates_name(endpoint)
+        async with self._redis.pipeline() as pipe:
+            pipe.zadd(name, {str(last_modified): last_modified})
+            pipe.zremrangebyscore(name, "-inf", f"({int(time.time()) - self._history_ex}")
+            pipe.expire(name, self._history_ex)
+            await pipe.execute()
+
+    async def get_updates(self, endpoint: str) -> list[int]:
+        """Distinct recorded `Last-Modified` timestamps, oldest first."""
+        result: list[bytes] = await _redis_await(self._redis.zrange(self._updates_name(endpoint), 0, -1))
+        return [int(m) for m in result]
+
 
 class CurrencyRateRedisCache:
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         redis: Redis,
         *,
@@ -69,53 +113,411 @@ class CurrencyRateRedisCache:
         namespace: str = "fcc",
         provider: str = "oex",
         cache_type: CurrencyRateCacheType,
+        layout: CurrencyRateCacheLayout = "hash_per_pair",
+        changes_maxlen: int = 1000,
+        read_batch_seconds: float = 0.002,
     ) -> None:
         self._redis = redis
         self._ex = expiration_seconds
+        self._changes_maxlen = changes_maxlen
+        self._layout: CurrencyRateCacheLayout = layout
         self._name_prefix = f"{namespace}:{settings.APP_ENV}:rates:{provider}:{cache_type}"
         self._name_template = f"{self._name_prefix}:{{base_currency}}:{{quote_currency}}"
+        self._base_name_template = f"{self._name_prefix}:{{base_currency}}"
+        self._blob_name_template = f"{self._name_prefix}:blob:{{base_currency}}"
+        self._version_name_template = f"{self._name_prefix}:version:{{base_currency}}"
+        self._index_name_template = f"{self._name_prefix}:index:{{base_currency}}"
+        self._changes_name_template = f"{self._name_prefix}:changes:{{base_currency}}"
+        self._migrated_name_template = f"{self._name_prefix}:migrated:{{base_currency}}"
+        self._channel_snapshot_updated = f"{self._name_prefix}:snapshot_updated"
+        # * scripts are loaded lazily (EVALSHA, falls back to EVAL on first use)
+        self._publish_hash_per_pair = redis.register_script(_snapshot_scripts.PUBLISH_HASH_PER_PAIR)
+        self._publish_hash_per_pair_diff = redis.register_script(_snapshot_scripts.PUBLISH_HASH_PER_PAIR_DIFF)
+        self._read_hash_per_pair = redis.register_script(_snapshot_scripts.READ_HASH_PER_PAIR)
+        self._publish_hash_per_base = redis.register_script(_snapshot_scripts.PUBLISH_HASH_PER_BASE)
+        self._publish_snapshot_blob = redis.register_script(_snapshot_scripts.PUBLISH_SNAPSHOT_BLOB)
+        # * concurrent reads are coalesced: keys requested within `read_batch_seconds` are read by one pipeline
+        self._pair_reads = ReadBatcher(self._load_pairs, window_seconds=read_batch_seconds)
+        self._base_field_reads = ReadBatcher(self._load_base_fields, window_seconds=read_batch_seconds)
+        self._blob_reads = ReadBatcher(self._load_blobs, window_seconds=read_batch_seconds)
+        # * whole snapshot reads only join the ones of the same loop tick (or in flight), never wait for a window
+        self._versioned_reads = ReadBatcher(self._load_versioned)
 
     def _name(self, base_currency: str, quote_currency: str) -> str:
         return self._name_template.format(base_currency=base_currency, quote_currency=quote_currency)
 
-    async def scan_hgetall_currencies_all(self, base_currency: str) -> list[CurrencyRateCacheValueTyped]:
+    def _base_name(self, base_currency: str) -> str:
+        return self._base_name_template.format(base_currency=base_currency)
+
+    def _blob_name(self, base_currency: str) -> str:
+        return self._blob_name_template.format(base_currency=base_currency)
+
+    @property
+    def layout(self) -> CurrencyRateCacheLayout:
+        return self._layout
+
+    def _version_name(self, base_currency: str) -> str:
+        return self._version_name_template.format(base_currency=base_currency)
+
+    def _index_name(self, base_currency: str) -> str:
+        return self._index_name_template.format(base_currency=base_currency)
+
+    def _changes_name(self, base_currency: str) -> str:
+        return self._changes_name_template.format(base_currency=base_currency)
+
+    def _migrated_name(self, base_currency: str) -> str:
+        return self._migrated_name_template.format(base_currency=base_currency)
+
+    async def get_version(self, base_currency: str) -> int:
+        """Version of the snapshot stored for `base_currency`, `0` if nothing was stored yet."""
+        result: bytes | None = await _redis_await(self._redis.get(self._version_name(base_currency)))
+        return int(result) if result else 0
+
+    async def publish_snapshot_updated(self, base_currency: str, version: int) -> None:
+        await _redis_await(self._redis.publish(self._channel_snapshot_updated, f"{base_currency}:{version}"))
+
+    async def listen_snapshot_updated(self) -> AsyncGenerator[tuple[str, int]]:
+        """Yield `(base_currency, version)` for every "snapshot updated" message until cancelled."""
+        async with self._redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+            await pubsub.subscribe(self._channel_snapshot_updated)
+            async for message in pubsub.listen():
+                try:
+                    base_currency, version = _convert_bytes_to_str(message["data"]).rsplit(":", 1)
+                    yield base_currency, int(version)
+                except ValueError:
+                    LOG.warning("Unexpected snapshot updated message: %s", message)
+
+    async def smembers_currencies(self, base_currency: str) -> list[str]:
+        """Quote currencies stored for `base_currency`, read from the index maintained on write."""
+        result: list[bytes] | set[bytes]
+        if self._layout == "snapshot_blob":
+            blob = await self.get_snapshot_blob(base_currency)
+            return sorted(blob.currencies) if blob else []
+        if self._layout == "hash_per_base":
+            result = await _redis_await(self._redis.hkeys(self._base_name(base_currency)))
+        else:
+            result = await _redis_await(self._redis.smembers(self._index_name(base_currency)))
+        return sorted(_convert_bytes_to_str(c) for c in result)
+
+    async def get_snapshot_blob(self, base_currency: str) -> SnapshotBlob | None:
+        """Whole snapshot of `base_currency` decoded in one pass, `None` if not stored (`snapshot_blob` layout)."""
+        return await self._blob_reads.get(base_currency)
+
+    async def hgetall_versioned(self, base_currency: str) -> tuple[int, list[CurrencyRateCacheValueTyped]]:
+        """Snapshot version and all its rates, read consistently (never rates of one version with another version)."""
+        return cast("tuple[int, list[CurrencyRateCacheValueTyped]]", await self._versioned_reads.get(base_currency))
+
+    async def _load_versioned(self, bases: list[str]) -> dict[str, tuple[int, list[CurrencyRateCacheValueTyped]]]:
+        return dict(zip(bases, await asyncio.gather(*(self._read_versioned(b) for b in bases)), strict=True))
+
+    async def _read_versioned(self, base_currency: str) -> tuple[int, list[CurrencyRateCacheValueTyped]]:
+        if self._layout == "snapshot_blob":
+            if blob := await self.get_snapshot_blob(base_currency):
+                return blob.version, sorted(blob.to_typed().values(), key=lambda r: r["currency"])
+            return await self.get_version(base_currency), []
+        if self._layout == "hash_per_base":
+            async with self._redis.pipeline() as pipe:
+                pipe.get(self._version_name(base_currency))
+                pipe.hgetall(self._base_name(base_currency))
+                version, packed = await pipe.execute()
+            rates = [_convert_to_typed_cr(_unpack_cr(k, v)) for k, v in sorted(packed.items())]
+            return int(version or 0), rates
+
+        version, *pairs = await self._read_hash_per_pair(
+            keys=[self._version_name(base_currency), self._index_name(base_currency)],
+            args=[self._name(base_currency, "")],
+        )
+        if not pairs:
+            return int(version), await self._scan_hgetall_currencies_all(base_currency)
+        rates = self._convert_bytes_dicts_to_cr_list([dict(zip(p[0::2], p[1::2], strict=True)) for p in pairs])
+        return int(version), sorted(rates, key=lambda r: r["currency"])
+
+    async def hgetall_currencies_all(self, base_currency: str) -> list[CurrencyRateCacheValueTyped]:
+        if self._layout == "snapshot_blob":
+            blob = await self.get_snapshot_blob(base_currency)
+            return sorted(blob.to_typed().values(), key=lambda r: r["currency"]) if blob else []
+        if self._layout == "hash_per_base":
+            result: dict[bytes, bytes] = await _redis_await(self._redis.hgetall(self._base_name(base_currency)))
+            return [_convert_to_typed_cr(_unpack_cr(k, v)) for k, v in sorted(result.items())]
+
+        if currencies := await self.smembers_currencies(base_currency):
+            return await self.hgetall_currencies(base_currency, currencies)
+        return await self._scan_hgetall_currencies_all(base_currency)
+
+    async def _scan_hgetall_currencies_all(self, base_currency: str) -> list[CurrencyRateCacheValueTyped]:
+        # * fallback for rates stored before the index was introduced, rebuilds index if anything found
         result = await _hgetall_names(self._redis, self._redis.scan_iter(self._name(base_currency, "*")))
-        return self._convert_bytes_dicts_to_cr_list(result)
+        result = self._convert_bytes_dicts_to_cr_list(result)
+        if result:
+            async with self._redis.pipeline() as pipe:
+                pipe.sadd(self._index_name(base_currency), *(r["currency"] for r in result))
+                pipe.expire(self._index_name(base_currency), self._ex)
+                await pipe.execute()
+        return result
 
     async def hgetall_currencies(self, base_currency: str, currencies: list[str]) -> list[CurrencyRateCacheValueTyped]:
-        async def _async_iter() -> AsyncGenerator[str]:
-            for c in currencies:
-                yield self._name(base_currency, c)
+        if self._layout == "snapshot_blob":
+            blob = await self.get_snapshot_blob(base_currency)
+            rates = blob.to_typed() if blob else {}
+            return [rates[c] for c in currencies if c in rates]
+        if self._layout == "hash_per_base":
+            packed = await self._base_field_reads.get_many((base_currency, c) for c in currencies)
+            return [_convert_to_typed_cr(_unpack_cr(c, v)) for c in currencies if (v := packed[base_currency, c])]
+
+        pairs = await self._pair_reads.get_many(self._name(base_currency, c) for c in currencies)
+        return self._convert_bytes_dicts_to_cr_list([pairs[self._name(base_currency, c)] or {} for c in currencies])
 
-        result = await _hgetall_names(self._redis, _async_iter())
-        return self._convert_bytes_dicts_to_cr_list(result)
+    async def _load_pairs(self, names: list[str]) -> dict[str, dict[bytes, bytes]]:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.hgetall(name)
+            return dict(zip(names, await pipe.execute(), strict=True))
+
+    async def _load_base_fields(self, keys: list[tuple[str, str]]) -> dict[tuple[str, str], bytes | None]:
+        by_base: dict[str, list[str]] = defaultdict(list)
+        for base_currency, currency in keys:
+            by_base[base_currency].append(currency)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for base_currency, currencies in by_base.items():
+                pipe.hmget(self._base_name(base_currency), currencies)
+            results = await pipe.execute()
+        return {
+            (base_currency, c): v
+            for (base_currency, currencies), packed in zip(by_base.items(), results, strict=True)
+            for c, v in zip(currencies, packed, strict=True)
+        }
+
+    async def _load_blobs(self, bases: list[str]) -> dict[str, SnapshotBlob]:
+        results: list[bytes | None] = await _redis_await(self._redis.mget([self._blob_name(b) for b in bases]))
+        return {b: decode_snapshot_blob(r) for b, r in zip(bases, results, strict=True) if r}
 
     def _convert_bytes_dicts_to_cr_list(self, inp: list[dict[bytes, bytes]]) -> list[CurrencyRateCacheValueTyped]:
-        return [_convert_to_typed_cr(cast("CurrencyRateCacheValue", _convert_dict_bytes_to_str(r))) for r in inp]
+        # * empty dict means key does not exist (e.g. expired or unknown currency)
+        return [_convert_to_typed_cr(cast("CurrencyRateCacheValue", _convert_dict_bytes_to_str(r))) for r in inp if r]
 
     async def hset_conv(self, mapping: CurrencyRateCacheValueTyped, *, base_currency: str, quote_currency: str) -> None:
         await self.hset_raw(_convert_to_untyped_cr(mapping), base_currency=base_currency, quote_currency=quote_currency)
 
     async def hset_raw(self, mapping: CurrencyRateCacheValue, *, base_currency: str, quote_currency: str) -> None:
-        await _redis_await(
-            self._redis.hsetex(
+        if self._layout == "snapshot_blob":
+            msg = "Single rate can not be stored in snapshot_blob layout, store whole snapshot with hset_m_*"
+            raise RuntimeError(msg)
+        async with self._redis.pipeline() as pipe:
+            if self._layout == "hash_per_base":
+                await hsetex(
+                    pipe,
+                    name=self._base_name(base_currency),
+                    mapping={quote_currency: _pack_cr(mapping)},
+                    ex=self._ex,
+                )
+                await pipe.execute()
+                return
+
+            await hsetex(
+                pipe,
                 name=self._name(base_currency, quote_currency),
                 mapping=cast("dict[str, str]", mapping),
                 ex=self._ex,
-            ),
-        )
+            )
+            pipe.sadd(self._index_name(base_currency), quote_currency)
+            pipe.expire(self._index_name(base_currency), self._ex)
+            await pipe.execute()
 
-    async def hset_m_conv(self, mappings: dict[str, CurrencyRateCacheValueTyped], *, base_currency: str) -> None:
+    async def hset_m_conv(self, mappings: dict[str, CurrencyRateCacheValueTyped], *, base_currency: str) -> int:
+        if self._layout == "snapshot_blob":
+            return await self._set_snapshot_blob(mappings, base_currency=base_currency)
         mappings_un = {k: _convert_to_untyped_cr(v) for k, v in mappings.items()}
-        await self.hset_m_raw(mappings_un, base_currency=base_currency)
+        return await self.hset_m_raw(mappings_un, base_currency=base_currency)
 
-    async def hset_m_raw(self, mappings: dict[str, CurrencyRateCacheValue], *, base_currency: str) -> None:
-        async with self._redis.pipeline() as pipe:
-            for q_curr, mapping in mappings.items():
-                await hsetex(
-                    pipe,
-                    name=self._name(base_currency, q_curr),
-                    mapping=cast("dict[str, str]", mapping),
-                    ex=self._ex,
-                )
+    async def hset_m_raw(self, mappings: dict[str, CurrencyRateCacheValue], *, base_currency: str) -> int:
+        """Store all `mappings` and bump snapshot version. Returns new snapshot version."""
+        if self._layout == "snapshot_blob":
+            mappings_t = {k: _convert_to_typed_cr(v) for k, v in mappings.items()}
+            return await self._set_snapshot_blob(mappings_t, base_currency=base_currency)
+        if self._layout == "hash_per_base":
+            return await self._hset_m_raw_per_base(mappings, base_currency=base_currency)
+
+        # * one script: pairs, index (replaced as a whole, so dropped currencies disappear) and version
+        result = await self._publish_hash_per_pair(
+            keys=[
+                self._version_name(base_currency),
+                self._index_name(base_currency),
+                *(self._name(base_currency, c) for c in mappings),
+            ],
+            args=[
+                self._ex,
+                self._name(base_currency, ""),
+                *(
+                    v
+                    for m in mappings.values()
+                    for v in (m["currency"], m["rate"], m["request_at"], m["last_modified"])
+                ),
+            ],
+        )
+        return int(result)
+
+    async def _hset_m_raw_per_base(self, mappings: dict[str, CurrencyRateCacheValue], *, base_currency: str) -> int:
+        # * whole snapshot is one key: replaced at once, expires (or gets evicted) at once
+        result = await self._publish_hash_per_base(
+            keys=[self._version_name(base_currency), self._base_name(base_currency)],
+            args=[self._ex, *(v for k, m in mappings.items() for v in (k, _pack_cr(m)))],
+        )
+        return int(result)
+
+    async def _set_snapshot_blob(self, mappings: dict[str, CurrencyRateCacheValueTyped], *, base_currency: str) -> int:
+        # * version is part of the blob: script bumps it and stamps it into the blob before storing
+        blob = (
+            encode_snapshot_blob(
+                base_currency,
+                {k: v["rate"] for k, v in mappings.items()},
+                version=0,
+                request_at=max(v["request_at"] for v in mappings.values()),
+                last_modified=max(v["last_modified"] for v in mappings.values()),
+            )
+            if mappings
+            else b""
+        )
+        result = await self._publish_snapshot_blob(
+            keys=[self._version_name(base_currency), self._blob_name(base_currency)],
+            args=[self._ex, blob, SNAPSHOT_BLOB_VERSION_OFFSET],
+        )
+        return int(result)
+
+    async def hset_m_diff_conv(
+        self,
+        mappings: dict[str, CurrencyRateCacheValueTyped],
+        *,
+        base_currency: str,
+    ) -> CurrencyRateChanges:
+        """Store snapshot writing only what changed against the stored one, bump its version.
+
+        Rates that changed, appeared or disappeared are appended as one event to the changes stream
+        (see `read_changes`); nothing is appended if all rates are the same.
+        """
+        if self._layout == "hash_per_pair":
+            version, changed, removed = await self._publish_hash_per_pair_diff(
+                keys=[
+                    self._version_name(base_currency),
+                    self._index_name(base_currency),
+                    self._changes_name(base_currency),
+                ],
+                args=[
+                    self._ex,
+                    self._name(base_currency, ""),
+                    self._changes_maxlen,
+                    *(
+                        v
+                        for m in map(_convert_to_untyped_cr, mappings.values())
+                        for v in (m["currency"], m["rate"], m["request_at"], m["last_modified"])
+                    ),
+                ],
+            )
+            changed = [_convert_bytes_to_str(v) for v in changed]
+            return {
+                "version": int(version),
+                "changed": {c: float(r) for c, r in zip(changed[0::2], changed[1::2], strict=True)},
+                "removed": [_convert_bytes_to_str(c) for c in removed],
+            }
+
+        # * other layouts store snapshot as one value, which is replaced anyway; only the event is diffed
+        _, stored = await self.hgetall_versioned(base_currency)
+        stored_rates = {r["currency"]: r["rate"] for r in stored}
+        version = await self.hset_m_conv(mappings, base_currency=base_currency)
+        changed = {c: m["rate"] for c, m in mappings.items() if stored_rates.get(c) != m["rate"]}
+        changes: CurrencyRateChanges = {
+            "version": version,
+            "changed": changed,
+            "removed": [c for c in stored_rates if c not in mappings],
+        }
+        if changes["changed"] or changes["removed"]:
+            await _redis_await(
+                self._redis.xadd(
+                    self._changes_name(base_currency),
+                    {
+                        "version": version,
+                        "changed": _PACKED_CR_SEPARATOR.join(v for c, r in changed.items() for v in (c, f"{r}")),
+                        "removed": _PACKED_CR_SEPARATOR.join(changes["removed"]),
+                    },
+                    maxlen=self._changes_maxlen,
+                    approximate=True,
+                ),
+            )
+        return changes
+
+    async def read_changes(
+        self,
+        base_currency: str,
+        *,
+        after_id: str = "0-0",
+        count: int = 100,
+        block_ms: int | None = None,
+    ) -> list[tuple[str, CurrencyRateChanges]]:
+        """Change events after stream entry `after_id` (`"$"` for new ones only), as `(entry_id, changes)`.
+
+        With `block_ms`, waits up to that long for new events when there are none yet.
+        """
+        result = await _redis_await(
+            self._redis.xread({self._changes_name(base_currency): after_id}, count=count, block=block_ms),
+        )
+        # * reply is `[[stream name, [(entry id, fields), ...]]]`, empty if nothing new
+        entries = result[0][1] if result else []
+        return [(_convert_bytes_to_str(entry_id), _unpack_changes(fields)) for entry_id, fields in entries]
+
+    async def delete_all(self, base_currency: str) -> None:
+        """Drop all rates stored for `base_currency` in this layout (snapshot version is kept)."""
+        if self._layout == "snapshot_blob":
+            await _redis_await(self._redis.delete(self._blob_name(base_currency)))
+            return
+        if self._layout == "hash_per_base":
+            await _redis_await(self._redis.delete(self._base_name(base_currency)))
+            return
+
+        names = [self._name(base_currency, c) for c in await self.smembers_currencies(base_currency)]
+        await _redis_await(self._redis.delete(self._index_name(base_currency), *names))
+
+    async def is_migrated(self, base_currency: str) -> bool:
+        """Check if rates of `base_currency` were migrated into this layout (see `migrate_currency_rates_layout`)."""
+        result: bytes | None = await _redis_await(self._redis.get(self._migrated_name(base_currency)))
+        return result is not None and _convert_bytes_to_str(result) == self._layout
+
+    async def lock_migration(self, base_currency: str, *, ttl_seconds: int) -> bool:
+        """Take the lock on migration of `base_currency` rates, `False` if another process holds it."""
+        name = f"{self._migrated_name(base_currency)}:lock"
+        return bool(await _redis_await(self._redis.set(name, self._layout, nx=True, ex=ttl_seconds)))
+
+    async def mark_migrated(self, base_currency: str) -> None:
+        """Record migration of `base_currency` rates into this layout and release the lock."""
+        name = self._migrated_name(base_currency)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            # * marker expires with rates: older ones are gone anyway, layout may be switched back and forth
+            pipe.set(name, self._layout, ex=self._ex)
+            pipe.delete(f"{name}:lock")
             await pipe.execute()
+
+
+async def migrate_currency_rates_layout(
+    source: CurrencyRateRedisCache,
+    target: CurrencyRateRedisCache,
+    *,
+    base_currency: str,
+    lock_seconds: int = _MIGRATION_LOCK_SEC,
+) -> int:
+    """Move rates of `base_currency` from `source` to `target` cache (e.g. into another layout).
+
+    Runs once per layout switch: processes starting concurrently race for a lock, the winner marks
+    the target as migrated, later ones only check the marker.
+
+    Returns new snapshot version in `target`, `0` if `source` had nothing to migrate (or it was done already).
+    """
+    if source.layout == target.layout or await target.is_migrated(base_currency):
+        return 0
+    if not await target.lock_migration(base_currency, ttl_seconds=lock_seconds):
+        LOG.info("Rates %s are being migrated by another process", base_currency)
+        return 0
+    version = 0
+    if rates := await source.hgetall_currencies_all(base_currency):
+        version = await target.hset_m_conv({r["currency"]: r for r in rates}, base_currency=base_currency)
+        await source.delete_all(base_currency)
+        LOG.info("Migrated %s rates %s: %s -> %s", len(rates), base_currency, source.layout, target.layout)
+    await target.mark_migrated(base_currency)
+    return version
@@ -0,0 +1,120 @@
+"""Compact binary format of a whole rates snapshot, stored as a single Redis value.
+
+Layout (little-endian):
+
+    header      magic "FCCR", format version u8, code width u8, reserved u16, count u32,
+                snapshot version u64, request_at i64, last_modified i64
+    base        code width bytes, ASCII, NUL padded
+    codes       count * code width bytes, ASCII, NUL padded
+    padding     NUL bytes up to 8 bytes alignment
+    rates       count * float64
+
+All rates of a snapshot come from one fetch, so timestamps are stored once in the header.
+Rates block is exposed without copying (`memoryview` cast to doubles).
+"""
+
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Final
+
+from finnikacc_api.redis.model import CurrencyRateCacheValueTyped
+
+_MAGIC: Final = b"FCCR"
+SNAPSHOT_BLOB_FORMAT_VERSION: Final = 1
+
+_HEADER: Final = struct.Struct("<4sBBHIQqq")
+# * snapshot version (u64) position, lets writer stamp version into an encoded blob
+SNAPSHOT_BLOB_VERSION_OFFSET: Final = struct.calcsize("<4sBBHI")
+_ALIGN: Final = 8
+
+
+class SnapshotBlobError(ValueError):
+    pass
+
+
+@dataclass(slots=True, frozen=True)
+class SnapshotBlob:
+    base_currency: str
+    version: int
+    request_at: int
+    last_modified: int
+    currencies: tuple[str, ...]
+    rates: memoryview | array
+
+    def to_typed(self) -> dict[str, CurrencyRateCacheValueTyped]:
+        return {
+            c: {"currency": c, "rate": r, "request_at": self.request_at, "last_modified": self.last_modified}
+            for c, r in zip(self.currencies, self.rates, strict=True)
+        }
+
+
+def encode_snapshot_blob(
+    base_currency: str,
+    rates: Mapping[str, float],
+    *,
+    version: int,
+    request_at: int,
+    last_modified: int,
+) -> bytes:
+    codes = [c.encode("ascii") for c in rates]
+    width = max((len(c) for c in (base_currency.encode("ascii"), *codes)), default=0)
+    header = _HEADER.pack(
+        _MAGIC,
+        SNAPSHOT_BLOB_FORMAT_VERSION,
+        width,
+        0,
+        len(codes),
+        version,
+        request_at,
+        last_modified,
+    )
+    parts = [header, base_currency.encode("ascii").ljust(width, b"\0"), *(c.ljust(width, b"\0") for c in codes)]
+    size = _HEADER.size + width * (len(codes) + 1)
+    parts.append(b"\0" * (-size % _ALIGN))
+
+    rates_arr = array("d", rates.values())
+    if sys.byteorder != "little":
+        rates_arr.byteswap()
+    parts.append(rates_arr.tobytes())
+    return b"".join(parts)
+
+
+def decode_snapshot_blob(blob: bytes | bytearray | memoryview) -> SnapshotBlob:
+    view = memoryview(blob)
+    if len(view) < _HEADER.size:
+        msg = "Snapshot blob is truncated"
+        raise SnapshotBlobError(msg)
+
+    magic, fmt_version, width, _, count, version, request_at, last_modified = _HEADER.unpack_from(view)
+    if magic != _MAGIC or fmt_version != SNAPSHOT_BLOB_FORMAT_VERSION:
+        msg = f"Unsupported snapshot blob (magic {magic!r}, format version {fmt_version})"
+        raise SnapshotBlobError(msg)
+
+    codes_start = _HEADER.size
+    codes_end = codes_start + width * (count + 1)
+    rates_start = codes_end + (-codes_end % _ALIGN)
+    if len(view) != rates_start + count * 8:
+        msg = "Snapshot blob size does not match its header"
+        raise SnapshotBlobError(msg)
+
+    codes = bytes(view[codes_start:codes_end])
+    names = [codes[i : i + width].rstrip(b"\0").decode("ascii") for i in range(0, len(codes), width)]
+
+    rates: memoryview | array
+    if sys.byteorder == "little":
+        rates = view[rates_start:].cast("d")
+    else:
+        rates = array("d", view[rates_start:])
+        rates.byteswap()
+
+    return SnapshotBlob(
+        base_currency=names[0],
+        version=version,
+        request_at=request_at,
+        last_modified=last_modified,
+        currencies=tuple(names[1:]),
+        rates=rates,
+    )
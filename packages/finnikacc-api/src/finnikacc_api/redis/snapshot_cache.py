@@ -0,0 +1,238 @@
+"""In-process snapshot of currency rates in front of `CurrencyRateRedisCache`.
+
+Rates change once per fetch job run, so each process keeps the last loaded snapshot
+in memory and reloads it only when the fetch job publishes "snapshot updated" message
+or when the snapshot gets older than `ttl_seconds` (safety net for missed messages).
+
+Reads are two-tier (stale-while-revalidate): `latest` rates are served while fresh; when they are
+missing (e.g. expired after failed fetches) or older than `fresh_seconds`, rates from the long-lived
+`lastseen` cache are served right away as a stale snapshot and a background refresh is requested
+(at most once per `refresh_interval_seconds` by each process).
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+
+from finnikacc_api.rates.cross_rates import PIVOT_CURRENCY, CrossRateMatrix, UnknownCurrencyError
+from finnikacc_api.redis.model import CurrencyRateCacheValueTyped
+from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache
+
+LOG = logging.getLogger(__name__)
+
+_LISTEN_RETRY_DELAY_SEC = 5.0
+_STALE_TTL_SEC = 60
+# * empty snapshot (nothing fetched yet) is cached briefly, so that requests do not hit Redis each
+_EMPTY_TTL_SEC = 5
+# * stale (or empty) snapshot is reloaded every few seconds, refresh is not requested on every reload
+_REFRESH_INTERVAL_SEC = 60
+
+
+@dataclass(slots=True, kw_only=True, frozen=True)
+class CurrencyRateSnapshot:
+    base_currency: str
+    version: int
+    rates: dict[str, CurrencyRateCacheValueTyped]
+    loaded_at: float = field(default_factory=time.monotonic)
+    stale: bool = False
+    cross_rates: CrossRateMatrix = field(default=None, repr=False, compare=False)  # pyright: ignore[reportAssignmentType]
+    _rebased: dict[str, "CurrencyRateSnapshot"] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.cross_rates is None:
+            cross_rates = CrossRateMatrix.from_pivot_rates(
+                {c: r["rate"] for c, r in self.rates.items()},
+                pivot=self.base_currency,
+            )
+            object.__setattr__(self, "cross_rates", cross_rates)
+
+    def rebase(self, base_currency: str) -> "CurrencyRateSnapshot":
+        """Rebase snapshot to rates for 1 unit of `base_currency`, derived from precomputed cross rates."""
+        if base_currency == self.base_currency:
+            return self
+        if rebased := self._rebased.get(base_currency):
+            return rebased
+        if not self.rates:
+            return CurrencyRateSnapshot(base_currency=base_currency, version=self.version, rates={}, stale=self.stale)
+        if base_currency not in self.cross_rates:
+            msg = f"Unknown base currency '{base_currency}'"
+            raise UnknownCurrencyError(msg)
+
+        row = self.cross_rates.row(base_currency)
+        index = self.cross_rates.index
+        rebased = CurrencyRateSnapshot(
+            base_currency=base_currency,
+            version=self.version,
+            rates={c: {**r, "rate": row[index[c]]} for c, r in self.rates.items() if c in index},
+            loaded_at=self.loaded_at,
+            stale=self.stale,
+            cross_rates=self.cross_rates,
+        )
+        self._rebased[base_currency] = rebased
+        return rebased
+
+    @property
+    def last_modified(self) -> int:
+        return max((r["last_modified"] for r in self.rates.values()), default=0)
+
+    @property
+    def request_at(self) -> int:
+        return max((r["request_at"] for r in self.rates.values()), default=0)
+
+    def select(self, quote_currencies: Iterable[str] | None = None) -> list[CurrencyRateCacheValueTyped]:
+        if not quote_currencies:
+            return list(self.rates.values())
+        return [r for c in quote_currencies if (r := self.rates.get(c))]
+
+
+type StaleSnapshotCallback = Callable[[str], Awaitable[object]]
+
+
+class CurrencyRateSnapshotCache:
+    def __init__(  # noqa: PLR0913
+        self,
+        rates_cache: CurrencyRateRedisCache,
+        *,
+        ttl_seconds: int,
+        lastseen_cache: CurrencyRateRedisCache | None = None,
+        fresh_seconds: int | None = None,
+        on_stale: StaleSnapshotCallback | None = None,
+        empty_ttl_seconds: int = _EMPTY_TTL_SEC,
+        refresh_interval_seconds: int = _REFRESH_INTERVAL_SEC,
+    ) -> None:
+        self._rates_cache = rates_cache
+        self._lastseen_cache = lastseen_cache
+        self._ttl = ttl_seconds
+        self._empty_ttl = empty_ttl_seconds
+        self._fresh_seconds = fresh_seconds
+        self._on_stale = on_stale
+        self._refresh_interval = refresh_interval_seconds
+        self._refresh_requested_at: dict[str, float] = {}
+        self._snapshots: dict[str, CurrencyRateSnapshot] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._listener: asyncio.Task | None = None
+        self._background_tasks: set[asyncio.Task] = set()
+
+    async def get(self, base_currency: str = PIVOT_CURRENCY) -> CurrencyRateSnapshot:
+        """Snapshot for `base_currency`; only pivot currency is stored, others derived from cross rates."""
+        snapshot = self._snapshots.get(PIVOT_CURRENCY)
+        if not snapshot or self._is_expired(snapshot):
+            snapshot = await self._load(PIVOT_CURRENCY)
+        return snapshot.rebase(base_currency)
+
+    def invalidate(self, base_currency: str | None = None) -> None:
+        if base_currency is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(base_currency, None)
+
+    def _is_expired(self, snapshot: CurrencyRateSnapshot) -> bool:
+        # * stale snapshot is re-checked often, refreshed rates should replace it quickly
+        ttl = min(self._ttl, _STALE_TTL_SEC) if snapshot.stale else self._ttl
+        if not snapshot.rates:
+            # * data may appear any moment (e.g. first fetch after deploy)
+            ttl = min(ttl, self._empty_ttl)
+        return time.monotonic() - snapshot.loaded_at >= ttl
+
+    def _is_fresh(self, rates: list[CurrencyRateCacheValueTyped]) -> bool:
+        if not rates:
+            return False
+        if self._fresh_seconds is None:
+            return True
+        return time.time() - max(r["request_at"] for r in rates) <= self._fresh_seconds
+
+    async def _load(self, base_currency: str, *, min_version: int = 0) -> CurrencyRateSnapshot:
+        async with self._locks.setdefault(base_currency, asyncio.Lock()):
+            # * another waiter could have already loaded it
+            snapshot = self._snapshots.get(base_currency)
+            if snapshot and not self._is_expired(snapshot) and snapshot.version >= min_version:
+                return snapshot
+
+            version, rates = await self._rates_cache.hgetall_versioned(base_currency)
+            stale = not self._is_fresh(rates)
+            if stale:
+                version, rates = await self._load_lastseen(base_currency, version, rates)
+                self._request_refresh(base_currency)
+            snapshot = CurrencyRateSnapshot(
+                base_currency=base_currency,
+                version=version,
+                rates={r["currency"]: r for r in rates},
+                stale=stale,
+            )
+            self._snapshots[base_currency] = snapshot
+            LOG.debug("Loaded rates snapshot %s v%s (%s rates)", base_currency, version, len(snapshot.rates))
+            return snapshot
+
+    async def _load_lastseen(
+        self,
+        base_currency: str,
+        version: int,
+        rates: list[CurrencyRateCacheValueTyped],
+    ) -> tuple[int, list[CurrencyRateCacheValueTyped]]:
+        """Rates from `lastseen` tier if they are more recent than (possibly empty) `latest` ones."""
+        if not self._lastseen_cache:
+            return version, rates
+        try:
+            ls_version, ls_rates = await self._lastseen_cache.hgetall_versioned(base_currency)
+        except Exception:
+            LOG.warning("Failed to load last seen rates %s", base_currency, exc_info=True)
+            return version, rates
+        if ls_rates and (not rates or max(r["request_at"] for r in ls_rates) > max(r["request_at"] for r in rates)):
+            LOG.info("Serving last seen rates %s v%s", base_currency, ls_version)
+            return ls_version, ls_rates
+        return version, rates
+
+    def _request_refresh(self, base_currency: str) -> None:
+        if not self._on_stale:
+            return
+        now = time.monotonic()
+        requested_at = self._refresh_requested_at.get(base_currency)
+        if requested_at is not None and now - requested_at < self._refresh_interval:
+            return
+        self._refresh_requested_at[base_currency] = now
+        task = asyncio.create_task(self._on_stale(base_currency))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._on_refresh_requested)
+
+    def _on_refresh_requested(self, task: asyncio.Task) -> None:
+        self._background_tasks.discard(task)
+        if not task.cancelled() and (e := task.exception()):
+            LOG.warning("Failed to request rates refresh", exc_info=e)
+
+    # * ----------------------------------------
+    # * "snapshot updated" listener
+    # * ----------------------------------------
+
+    def start(self) -> None:
+        if not self._listener:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+        for task in list(self._background_tasks):
+            task.cancel()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for base_currency, version in self._rates_cache.listen_snapshot_updated():
+                    current = self._snapshots.get(base_currency)
+                    # * versions of `lastseen` tier are not comparable with `latest` ones
+                    if current and not current.stale and current.version >= version:
+                        continue
+                    self.invalidate(base_currency)
+                    await self._load(base_currency, min_version=version)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                LOG.warning("Rates snapshot listener failed. Retrying.", exc_info=True)
+                # * messages could be missed while disconnected
+                self.invalidate()
+                await asyncio.sleep(_LISTEN_RETRY_DELAY_SEC)
@@ -1,16 +1,21 @@
 import logging
+import logging.config
 from importlib.metadata import version
-from typing import Annotated, Any, Final, Literal
+from typing import Annotated, Any, Final, Literal, Self
 
 from arq.connections import RedisSettings
-from pydantic import field_validator
+from pydantic import field_validator, model_validator
 from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
+from finnikacc_api.providers.base import RatesMergePolicy
+from finnikacc_api.redis.model import CurrencyRateCacheLayout
+
 logging.basicConfig(level=logging.INFO)
 
 _LOG = logging.getLogger(__name__)
 
 AppEnv = Literal["dev_container", "prod_render", "test_unit"]
+OexCacheBackend = Literal["sqlite", "redis", "memory"]
 
 
 class _AppEnvSettings(BaseSettings):
@@ -33,23 +38,67 @@ class _AppSettings(BaseSettings):
     model_config = SettingsConfigDict(env_file=f"config/{_APP_ENV}/app.env")
 
     API_WEB_ALLOW_ORIGINS: Annotated[list[str], NoDecode]
+    # * browsers cache CORS preflight responses for this long (Chromium caps it at 2 hours)
+    API_WEB_CORS_MAX_AGE_SEC: int = 7200
 
     REDIS_CONNECTION_STRING: str | None = None
     REDIS_HOST: str | None = None
     REDIS_PORT: int | None = None
     REDIS_DB: str | int | None = None
+    # ! Redis Cluster is not supported by any layout: rates snapshot is written and read by Lua scripts touching
+    # ! keys in different hash slots, some of them (pairs of `hash_per_pair`) derived inside the scripts
+    REDIS_RATES_LAYOUT: CurrencyRateCacheLayout = "hash_per_pair"
+    # * one blocking connection pool per process, shared by app, arq enqueue and embedded worker clients:
+    # * with all connections in use, a command waits up to `REDIS_POOL_TIMEOUT_SEC` for one to be released
+    REDIS_POOL_MAX_CONNECTIONS: int = 16
+    REDIS_POOL_TIMEOUT_SEC: float | None = 5
+    REDIS_SOCKET_CONNECT_TIMEOUT_SEC: float | None = 5
+    # ! bounds blocking reads as well: rates snapshot pub/sub listener would reconnect on every timeout
+    REDIS_SOCKET_TIMEOUT_SEC: float | None = None
+    # * connection idle for longer is checked (PING) before reuse, 0 disables
+    REDIS_HEALTH_CHECK_INTERVAL_SEC: int = 30
+
+    # * local on-disk rates archive, disabled if not set
+    # ! single writer: fetched (and backfilled) rates are archived only by the one process with `RATES_ARCHIVE_WRITER`
+    # ! (standalone `arq-worker`, or the only web process running embedded worker); every process serving history
+    # ! must read the same directory (same host or shared volume), otherwise each one sees a different partial archive
+    RATES_ARCHIVE_DIR: str | None = None
+    RATES_ARCHIVE_WRITER: bool = False
+
+    # * arq worker runs inside the web process, disable when it runs as a separate process (`arq-worker`)
+    ARQ_WORKER_EMBEDDED: bool = True
+
+    # * providers queried by the fetch job, comma separated, in merge precedence order
+    RATES_PROVIDERS: Annotated[list[str], NoDecode] = ["oex"]
+    RATES_MERGE_POLICY: RatesMergePolicy = "precedence"
+    # * JSON file in OEX `latest.json` format, for `file` provider
+    RATES_FILE_PROVIDER_PATH: str | None = None
 
     OEX_RATES_BASE_URL: str
-    OEX_CACHE_DB_NAME: str
+    # * `redis` shares one responses cache between all workers, `sqlite` and `memory` are per process
+    OEX_CACHE_BACKEND: OexCacheBackend = "sqlite"
+    OEX_CACHE_DB_NAME: str | None = None
+    OEX_CACHE_MAX_ENTRIES: int = 256
     OEX_CACHE_EXPIRE_AFTER_SEC: int
 
-    @field_validator("API_WEB_ALLOW_ORIGINS", mode="before")
+    @field_validator("API_WEB_ALLOW_ORIGINS", "RATES_PROVIDERS", mode="before")
     @classmethod
-    def split_urls(cls, v: Any) -> Any:  # noqa: ANN401
+    def split_list(cls, v: Any) -> Any:  # noqa: ANN401
         if isinstance(v, str):
             return [u.strip() for u in v.split(",") if u.strip()]
         return v
 
+    @model_validator(mode="after")
+    def check_rates_archive_writer(self) -> Self:
+        if self.RATES_ARCHIVE_WRITER and not self.RATES_ARCHIVE_DIR:
+            msg = "RATES_ARCHIVE_WRITER requires RATES_ARCHIVE_DIR"
+            raise ValueError(msg)
+        if self.RATES_ARCHIVE_DIR and self.ARQ_WORKER_EMBEDDED and not self.RATES_ARCHIVE_WRITER:
+            # * fetch jobs run by this process would be missing from the archive
+            msg = "Embedded arq worker needs RATES_ARCHIVE_WRITER (or ARQ_WORKER_EMBEDDED=false) with rates archive"
+            raise ValueError(msg)
+        return self
+
 
 class _AppSecretSettings(BaseSettings):
     model_config = SettingsConfigDict(env_file=f"config/{_APP_ENV}/app.secret.env")
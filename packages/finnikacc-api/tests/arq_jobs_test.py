@@ -0,0 +1,40 @@
+import time
+from typing import TYPE_CHECKING, cast
+
+import pytest
+from finnikacc_api.arqjobs.arq_jobs import enqueue_refresh_conv_rates
+
+if TYPE_CHECKING:
+    from arq import ArqRedis
+    from finnikacc_api.redis.fetch_schedule_cache import FetchScheduleRedisCache
+
+
+class _StubArqRedis:
+    def __init__(self) -> None:
+        self.job_ids: list[str] = []
+
+    async def enqueue_job(self, function: str, *, _job_id: str) -> str:  # noqa: ARG002
+        self.job_ids.append(_job_id)
+        return _job_id
+
+
+class _StubScheduleCache:
+    def __init__(self, next_fetch_at: int | None) -> None:
+        self.next_fetch_at = next_fetch_at
+
+    async def get_next_fetch_at(self) -> int | None:
+        return self.next_fetch_at
+
+
+async def _enqueue(next_fetch_at: int | None) -> bool:
+    arq_redis = _StubArqRedis()
+    schedule = cast("FetchScheduleRedisCache", _StubScheduleCache(next_fetch_at))
+    return await enqueue_refresh_conv_rates(cast("ArqRedis", arq_redis), schedule) is not None
+
+
+@pytest.mark.asyncio
+async def test_refresh_skipped_when_scheduled_fetch_is_due():
+    now = int(time.time())
+
+    assert not await _enqueue(now + 60)
+    assert await _enqueue(now + 3600)
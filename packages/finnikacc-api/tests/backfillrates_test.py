@@ -0,0 +1,91 @@
+from datetime import UTC, date, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Self, cast
+
+import pytest
+from finnikacc_api.archive.rates_archive import RatesArchive
+from finnikacc_api.arqjobs.backfillrates import RequestBudget, backfill_conv_rates_oex
+
+if TYPE_CHECKING:
+    from finnikacc_api.lifecycle.dependencies import ExternalDependencies, InternalDependencies
+
+
+class _StubResponse:
+    def __init__(self, status: int, data: dict) -> None:
+        self.status = status
+        self._data = data
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        pass
+
+    async def json(self) -> dict:
+        return self._data
+
+
+class _StubOexClient:
+    def __init__(self) -> None:
+        self.endpoints: list[str] = []
+
+    def get(self, endpoint: str) -> _StubResponse:
+        self.endpoints.append(endpoint)
+        day = date.fromisoformat(endpoint.removeprefix("historical/").removesuffix(".json"))
+        if day.day == 3:  # noqa: PLR2004
+            return _StubResponse(500, {})
+        at = int(datetime(day.year, day.month, day.day, 23, tzinfo=UTC).timestamp())
+        return _StubResponse(200, {"base": "USD", "timestamp": at, "rates": {"USD": 1, "EUR": 0.8, "XYZ": 2}})
+
+
+class _StubHistoryCache:
+    retention_seconds = 8 * 86400
+
+    def __init__(self) -> None:
+        self.checkpoint: set[str] = set()
+        self.inserts: list[dict] = []
+
+    async def get_checkpoint(self, base_currency: str) -> set[str]:  # noqa: ARG002
+        return set(self.checkpoint)
+
+    async def insert_snapshots(
+        self,
+        snapshots: dict,
+        *,
+        base_currency: str,  # noqa: ARG002
+        checkpoint: list[str],
+    ) -> int:
+        self.inserts.append(snapshots)
+        self.checkpoint.update(checkpoint)
+        return len(snapshots)
+
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_within_budget(tmp_path: Path):
+    oex, history = _StubOexClient(), _StubHistoryCache()
+    edeps = cast("ExternalDependencies", type("E", (), {"oex_client": oex})())
+    ideps = cast(
+        "InternalDependencies",
+        type("I", (), {"currency_rate_history_cache": history, "rates_archive": RatesArchive(tmp_path)})(),
+    )
+
+    async def _run(budget: int):  # noqa: ANN202
+        return await backfill_conv_rates_oex(
+            edeps,
+            ideps,
+            start=date(2025, 1, 1),
+            end=date(2025, 1, 6),
+            budget=RequestBudget(limit=budget),
+            concurrency=2,
+            batch_days=2,
+        )
+
+    first = await _run(budget=3)
+    assert (first.fetched, first.failed, first.budget_exhausted) == (2, 1, True)
+    assert sorted(history.checkpoint) == ["2025-01-01", "2025-01-02"]
+
+    second = await _run(budget=10)
+    assert (second.fetched, second.skipped, second.failed, second.budget_exhausted) == (3, 2, 1, False)
+    assert len(oex.endpoints) == 3 + 4
+    assert [list(rates) for rates in history.inserts[0].values()] == [["USD", "EUR"], ["USD", "EUR"]]
+    assert len(RatesArchive(tmp_path).series("USD", "EUR", 0, 2**32)) == 5  # noqa: PLR2004
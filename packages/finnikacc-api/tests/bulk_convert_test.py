@@ -0,0 +1,128 @@
+import itertools
+import json
+from collections.abc import AsyncGenerator
+
+import pytest
+from finnikacc_api.app_webapi.bulk_convert import (
+    _MAX_LINE_CHARS,
+    BulkConvertFormat,
+    BulkConvertLineTooLongError,
+    _convert_rows,
+    _Row,
+    bulk_convert_response,
+)
+from finnikacc_api.redis.snapshot_cache import CurrencyRateSnapshot
+
+_SNAPSHOT = CurrencyRateSnapshot(
+    base_currency="USD",
+    version=1,
+    rates={
+        c: {"currency": c, "rate": r, "request_at": 1700000100, "last_modified": 1700000000}
+        for c, r in {"USD": 1.0, "EUR": 0.8}.items()
+    },
+)
+
+
+async def _body(lines: list[str]) -> AsyncGenerator[bytes]:
+    for line in lines:
+        yield f"{line}\n".encode()
+
+
+async def _endless_line() -> AsyncGenerator[bytes]:
+    for _ in itertools.count():
+        yield b"1" * 1024
+
+
+async def _content(lines: list[str], fmt: BulkConvertFormat) -> str:
+    response = await bulk_convert_response(_SNAPSHOT, _body(lines), fmt)
+    content = b"".join([chunk async for chunk in response.body_iterator])  # pyright: ignore[reportGeneralTypeIssues]
+    return content.decode()
+
+
+async def _convert(lines: list[str], fmt: BulkConvertFormat) -> list[str]:
+    return (await _content(lines, fmt)).splitlines()
+
+
+@pytest.mark.asyncio
+async def test_csv_non_finite_and_huge_amounts_are_row_errors():
+    out = await _convert(["amount,from,to", "10,USD,EUR", "inf,USD,EUR", "1e30,USD,EUR", "5,EUR,USD"], "csv")
+
+    assert out == [
+        "amount,from,to,convertedAmount,convertRate,error",
+        "10,USD,EUR,8.00,0.800000,",
+        "inf,USD,EUR,,,invalid amount",
+        "1e30,USD,EUR,,,invalid amount",
+        "5,EUR,USD,6.25,1.250000,",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_non_finite_and_huge_amounts_are_row_errors():
+    rows = [
+        '{"amount": 10, "from": "USD", "to": "EUR"}',
+        '{"amount": Infinity, "from": "USD", "to": "EUR"}',
+        '{"amount": 1e30, "from": "USD", "to": "EUR"}',
+        '{"amount": 5, "from": "EUR", "to": "USD"}',
+    ]
+    out = [json.loads(line) for line in await _convert(rows, "ndjson")]
+
+    assert [r.get("convertedAmount") for r in out] == ["8.00", None, None, "6.25"]
+    assert [r.get("error") for r in out] == [None, "invalid amount", "invalid amount", None]
+
+
+def test_convert_rows_failed_row_does_not_fail_others():
+    rows = [
+        _Row(fields=[], amount=1.0, from_currency="USD", to_currency="EUR"),
+        _Row(fields=[], amount=float("inf"), from_currency="USD", to_currency="EUR"),
+        _Row(fields=[], amount=2.0, from_currency="USD", to_currency="EUR"),
+    ]
+
+    assert _convert_rows(_SNAPSHOT, rows) == [("0.80", "0.800000"), None, ("1.60", "0.800000")]
+    assert rows[1].error == "conversion failed"
+
+
+@pytest.mark.asyncio
+async def test_csv_quoted_field_spanning_lines():
+    lines = ["amount,from,to,note", '10,USD,EUR,"first', "", 'second ""quoted"""', "5,EUR,USD,plain"]
+
+    content = await _content(lines, "csv")
+
+    assert content == (
+        "amount,from,to,note,convertedAmount,convertRate,error\n"
+        '10,USD,EUR,"first\n\nsecond ""quoted""",8.00,0.800000,\n'
+        "5,EUR,USD,plain,6.25,1.250000,\n"
+    )
+
+
+@pytest.mark.asyncio
+async def test_csv_endless_header_rejected():
+    with pytest.raises(BulkConvertLineTooLongError):
+        await bulk_convert_response(_SNAPSHOT, _endless_line(), "csv")
+
+
+@pytest.mark.asyncio
+async def test_ndjson_endless_line_ends_stream_with_error_row():
+    response = await bulk_convert_response(_SNAPSHOT, _endless_line(), "ndjson")
+    content = b"".join([chunk async for chunk in response.body_iterator])  # pyright: ignore[reportGeneralTypeIssues]
+
+    assert content == b'{"error":"line too long"}\n'
+
+
+@pytest.mark.asyncio
+async def test_too_long_line_ends_stream_with_error_row():
+    out = await _convert(["amount,from,to", "10,USD,EUR", "1" * (_MAX_LINE_CHARS + 1), "5,EUR,USD"], "csv")
+
+    assert out == [
+        "amount,from,to,convertedAmount,convertRate,error",
+        "10,USD,EUR,8.00,0.800000,",
+        ",,,,,line too long",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_unclosed_quoted_field_is_capped():
+    lines = ["amount,from,to", '10,USD,"EUR', *(["x" * 1000] * (_MAX_LINE_CHARS // 1000 + 1))]
+
+    out = await _convert(lines, "csv")
+
+    assert out[-1] == ",,,,,line too long"
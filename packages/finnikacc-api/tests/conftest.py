@@ -0,0 +1,11 @@
+from collections.abc import AsyncGenerator
+
+import pytest_asyncio
+from fakeredis import FakeAsyncRedis, FakeServer
+
+
+@pytest_asyncio.fixture
+async def fake_redis() -> AsyncGenerator[FakeAsyncRedis]:
+    """Redis stand-in running Lua scripts (`lupa`), a fresh empty server for every test."""
+    async with FakeAsyncRedis(server=FakeServer()) as redis:
+        yield redis
@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+import pytest
+from finnikacc_api.app_webapi.model import ConvertItemModel
+from finnikacc_api.rates.convert import MAX_AMOUNT, convert_batch, round_amount, round_rate
+from finnikacc_api.rates.cross_rates import CrossRateMatrix, UnknownCurrencyError
+from pydantic import ValidationError
+
+_CROSS_RATES = CrossRateMatrix.from_pivot_rates({"USD": 1.0, "EUR": 0.8, "PLN": 4.0})
+
+
+def test_convert_batch():
+    result = convert_batch(_CROSS_RATES, [100, 12.5, 7], ["EUR", "PLN", "USD"], ["PLN", "USD", "USD"])
+
+    assert list(result.rates) == pytest.approx([5.0, 0.25, 1.0])
+    assert list(result.converted) == pytest.approx([500.0, 3.125, 7.0])
+
+
+def test_convert_batch_unknown_currency():
+    with pytest.raises(UnknownCurrencyError, match="GBP, XXX"):
+        convert_batch(_CROSS_RATES, [1, 1], ["XXX", "EUR"], ["USD", "GBP"])
+
+
+@pytest.mark.parametrize("amount", [MAX_AMOUNT, -MAX_AMOUNT, "0.01"])
+def test_convert_item_amount_within_bounds(amount: float | str):
+    assert ConvertItemModel.model_validate({"amount": amount, "from": "USD", "to": "EUR"}).amount == Decimal(amount)
+
+
+@pytest.mark.parametrize("amount", [MAX_AMOUNT + 1, -MAX_AMOUNT - 1, 1e30, "Infinity", "NaN"])
+def test_convert_item_amount_out_of_bounds(amount: float | str):
+    with pytest.raises(ValidationError):
+        ConvertItemModel.model_validate({"amount": amount, "from": "USD", "to": "EUR"})
+
+
+def test_round_large_values():
+    # * default decimal context (28 digits) can not quantize these
+    assert str(round_amount(1e30)) == f"1{'0' * 30}.00"
+    assert str(round_rate(1e30)) == f"1{'0' * 30}.000000"
+    assert str(round_amount(2.675)) == "2.68"
+    assert str(round_rate(0.0221234567)) == "0.022123"
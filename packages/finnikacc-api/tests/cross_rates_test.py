@@ -0,0 +1,42 @@
+import pytest
+from finnikacc_api.rates.cross_rates import CrossRateMatrix, UnknownCurrencyError
+from finnikacc_api.redis.snapshot_cache import CurrencyRateSnapshot
+
+_USD_RATES = {"USD": 1.0, "EUR": 0.8, "PLN": 4.0, "UAH": 40.0}
+
+
+def test_cross_rate_matrix():
+    m = CrossRateMatrix.from_pivot_rates(_USD_RATES)
+
+    assert len(m) == 4  # noqa: PLR2004
+    assert m.rate("USD", "PLN") == pytest.approx(4.0)
+    assert m.rate("EUR", "PLN") == pytest.approx(5.0)
+    assert m.rate("PLN", "EUR") == pytest.approx(0.2)
+    assert m.rate("UAH", "UAH") == pytest.approx(1.0)
+    assert list(m.row("EUR")) == pytest.approx([1.25, 1.0, 5.0, 50.0])
+
+
+def test_cross_rate_matrix_adds_pivot():
+    m = CrossRateMatrix.from_pivot_rates({"EUR": 0.8})
+
+    assert m.currencies == ("USD", "EUR")
+    assert m.rate("EUR", "USD") == pytest.approx(1.25)
+
+
+def test_snapshot_rebase():
+    snapshot = CurrencyRateSnapshot(
+        base_currency="USD",
+        version=7,
+        rates={c: {"currency": c, "rate": r, "request_at": 1, "last_modified": 2} for c, r in _USD_RATES.items()},
+    )
+
+    rebased = snapshot.rebase("EUR")
+
+    assert rebased.base_currency == "EUR"
+    assert rebased.version == 7  # noqa: PLR2004
+    assert rebased.rates["PLN"]["rate"] == pytest.approx(5.0)
+    assert rebased.rates["PLN"]["last_modified"] == 2  # noqa: PLR2004
+    assert snapshot.rebase("EUR") is rebased
+    assert snapshot.rebase("USD") is snapshot
+    with pytest.raises(UnknownCurrencyError):
+        snapshot.rebase("XXX")
@@ -0,0 +1,48 @@
+import gzip
+
+import pytest
+from finnikacc_api.app_webapi.encoded_response import EncodedResponseCache, negotiate_encoding
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        (None, "identity"),
+        ("", "identity"),
+        ("identity", "identity"),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("br;q=0.5, gzip;q=0.8", "gzip"),
+        ("*", "br"),
+        ("gzip;q=0, *;q=0", "identity"),
+    ],
+)
+def test_negotiate_encoding(accept_encoding: str | None, expected: str):
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_encoded_response_cache_builds_once_and_evicts():
+    cache = EncodedResponseCache(max_entries=2)
+    builds = []
+
+    def _build(v: int) -> bytes:
+        builds.append(v)
+        return b"[%d]" % v
+
+    assert cache.get_or_build(("k", 1), lambda: _build(1)).identity == b"[1]"
+    assert cache.get_or_build(("k", 1), lambda: _build(1)).identity == b"[1]"
+    cache.get_or_build(("k", 2), lambda: _build(2))
+    cache.get_or_build(("k", 3), lambda: _build(3))
+    cache.get_or_build(("k", 1), lambda: _build(1))
+
+    assert builds == [1, 2, 3, 1]
+
+
+def test_encoded_body_compressed_once():
+    body = EncodedResponseCache().get_or_build("k", lambda: b"[]" * 1000)
+
+    gzipped = body.get("gzip")
+
+    assert gzip.decompress(gzipped) == body.identity
+    assert body.get("gzip") is gzipped
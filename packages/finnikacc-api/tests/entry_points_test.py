@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+import tomllib
+from pathlib import Path
+
+import pytest
+
+_API_PACKAGE_DIR = Path(__file__).parents[1]
+_ROOT_PYPROJECT = Path(__file__).parents[3] / "pyproject.toml"
+_SCRIPTS: dict[str, str] = tomllib.loads(_ROOT_PYPROJECT.read_text())["project"]["scripts"]
+
+# * modules console scripts import only once running (settings are loaded on import, relative to package directory)
+_DEFERRED_IMPORTS: dict[str, list[str]] = {
+    "arq-worker": ["finnikacc_api.lifecycle.arq_lifecycle"],
+    "backfill-rates": [
+        "finnikacc_api.arqjobs.backfillrates",
+        "finnikacc_api.lifecycle.deps_ext_lifecycle",
+        "finnikacc_api.lifecycle.deps_int_lifecycle",
+    ],
+    "record-oex-rates": ["finnikacc_api.lifecycle.deps_ext_lifecycle", "finnikacc_api.providers.oex_replay"],
+}
+
+
+def test_deferred_imports_are_of_known_scripts():
+    assert set(_DEFERRED_IMPORTS) <= set(_SCRIPTS)
+
+
+@pytest.mark.parametrize("script", sorted(_SCRIPTS))
+def test_entry_point_imports(script: str):
+    module, attr = _SCRIPTS[script].split(":")
+    code = "\n".join(
+        [
+            "import importlib",
+            f"assert callable(getattr(importlib.import_module({module!r}), {attr!r}))",
+            *(f"import {m}" for m in _DEFERRED_IMPORTS.get(script, [])),
+        ],
+    )
+    # * fresh interpreter, as a console script is started: nothing is imported by pytest or uvicorn beforehand;
+    # * settings are only validated, nothing is connected to on import
+    env = {
+        **os.environ,
+        "APP_ENV": "dev_container",
+        "OEX_RATES_APP_ID": "test",
+        "REDIS_HOST": "localhost",
+        "REDIS_PORT": "6379",
+    }
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        cwd=_API_PACKAGE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+    assert result.returncode == 0, result.stderr
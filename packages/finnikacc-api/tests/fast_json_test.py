@@ -0,0 +1,29 @@
+from datetime import UTC, datetime
+
+import pytest
+from finnikacc_api.app_webapi.fast_json import dump_convert_rates_json
+from finnikacc_api.app_webapi.model import CurrencyConvertRateModel
+from finnikacc_api.rates.convert import round_rate
+from pydantic import TypeAdapter
+
+
+@pytest.mark.parametrize("rate", [1.0, 0.86, 41.7105, 0.0005, 1e-05, 0.00012345678, 1234567.891, 1e22])
+def test_dump_convert_rates_json_same_as_pydantic(rate: float):
+    record = {"currency": "EUR", "rate": rate, "request_at": 1700000100, "last_modified": 1700000000}
+    model = CurrencyConvertRateModel(
+        base_currency="USD",
+        quote_currency="EUR",
+        convert_rate=round_rate(rate),
+        rate_type="recent",
+        rate_age="1h",
+        rate_at=datetime.fromtimestamp(1700000000, UTC),
+    )
+
+    expected = TypeAdapter(list[CurrencyConvertRateModel]).dump_json([model], by_alias=True)
+
+    assert dump_convert_rates_json("USD", [record]) == expected
+    assert dump_convert_rates_json("USD", [{k: f"{v}" for k, v in record.items()}]) == expected
+
+
+def test_dump_convert_rates_json_empty():
+    assert dump_convert_rates_json("USD", []) == b"[]"
@@ -0,0 +1,139 @@
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, cast
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from finnikacc_api import settings
+from finnikacc_api.arqjobs import arq_jobs
+from finnikacc_api.redis.fetch_lease import FetchLease, FetchLeaseRedisCache, StaleFetchLeaseError
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+# * name of the lease key of `_lease_cache`
+_LEASE_NAME = f"test:{settings.APP_ENV}:lease:fetch"
+
+
+class _StubFetchLease:
+    def __init__(self, *, free: bool) -> None:
+        self.free = free
+        self.released: list[tuple[str, bool]] = []
+
+    async def acquire(self, tick: str) -> FetchLease | None:
+        return FetchLease(tick=tick, token=7, value="7:test") if self.free else None
+
+    async def release(self, lease: FetchLease, *, completed: bool) -> bool:
+        self.released.append((lease.tick, completed))
+        return True
+
+
+def _ctx(monkeypatch: pytest.MonkeyPatch, fetch_lease: _StubFetchLease) -> dict:
+    monkeypatch.setattr(arq_jobs, "get_int_deps_from_dict", lambda _: SimpleNamespace(fetch_lease=fetch_lease))
+    return {"job_id": "tick:1"}
+
+
+@pytest.mark.asyncio
+async def test_fetch_skipped_without_lease(monkeypatch: pytest.MonkeyPatch):
+    fetches: list[FetchLease | None] = []
+
+    async def fetch(_: dict, *, lease: FetchLease | None = None) -> None:
+        fetches.append(lease)
+
+    monkeypatch.setattr(arq_jobs, "fetch_conv_rates", fetch)
+    fetch_lease = _StubFetchLease(free=False)
+
+    await arq_jobs.refresh_conv_rates(_ctx(monkeypatch, fetch_lease))
+
+    assert fetches == []
+    assert fetch_lease.released == []
+
+
+@pytest.mark.asyncio
+async def test_fetch_under_lease_marks_tick_completed(monkeypatch: pytest.MonkeyPatch):
+    fetches: list[FetchLease | None] = []
+
+    async def fetch(_: dict, *, lease: FetchLease | None = None) -> None:
+        fetches.append(lease)
+
+    monkeypatch.setattr(arq_jobs, "fetch_conv_rates", fetch)
+    fetch_lease = _StubFetchLease(free=True)
+
+    await arq_jobs.refresh_conv_rates(_ctx(monkeypatch, fetch_lease))
+
+    assert fetches == [FetchLease(tick="tick:1", token=7, value="7:test")]
+    assert fetch_lease.released == [("tick:1", True)]
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_releases_lease_without_completing_tick(monkeypatch: pytest.MonkeyPatch):
+    async def fetch(_: dict, *, lease: FetchLease | None = None) -> None:  # noqa: ARG001
+        msg = "Redis is down"
+        raise ConnectionError(msg)
+
+    monkeypatch.setattr(arq_jobs, "fetch_conv_rates", fetch)
+    fetch_lease = _StubFetchLease(free=True)
+
+    with pytest.raises(ConnectionError):
+        await arq_jobs.refresh_conv_rates(_ctx(monkeypatch, fetch_lease))
+
+    assert fetch_lease.released == [("tick:1", False)]
+
+
+def _lease_cache(redis: FakeAsyncRedis) -> FetchLeaseRedisCache:
+    return FetchLeaseRedisCache(cast("Redis", redis), ttl_seconds=60, namespace="test", name="fetch")
+
+
+@pytest.mark.asyncio
+async def test_lease_refused_while_held(fake_redis: FakeAsyncRedis):
+    first, second = _lease_cache(fake_redis), _lease_cache(fake_redis)
+
+    lease = await first.acquire("tick:1")
+    refused = await second.acquire("tick:2")
+    assert lease
+    await first.release(lease, completed=True)
+    after_release = await second.acquire("tick:2")
+    done = await second.acquire("tick:1")
+
+    assert refused is None
+    assert after_release
+    assert after_release.token > lease.token
+    assert done is None
+    assert await first.get_stats() == {"acquired": 2, "contended": 1, "completed": 1, "done": 1}
+
+
+@pytest.mark.asyncio
+async def test_release_of_expired_lease_is_noop(fake_redis: FakeAsyncRedis):
+    stalled, current = _lease_cache(fake_redis), _lease_cache(fake_redis)
+    stale = await stalled.acquire("tick:1")
+    assert stale
+    # * lease expires while its holder is stalled, another one takes over
+    await fake_redis.delete(_LEASE_NAME)
+    lease = await current.acquire("tick:2")
+    assert lease
+
+    released = await stalled.release(stale, completed=True)
+
+    assert released is False
+    # * lease of the new holder is kept, tick of the stale one is not marked as fetched
+    assert await stalled.acquire("tick:3") is None
+    assert await current.release(lease, completed=True) is True
+    assert await stalled.acquire("tick:1")
+    assert (await stalled.get_stats())["lost"] == 1
+
+
+@pytest.mark.asyncio
+async def test_write_with_older_fence_rejected(fake_redis: FakeAsyncRedis):
+    stalled, current = _lease_cache(fake_redis), _lease_cache(fake_redis)
+    stale = await stalled.acquire("tick:1")
+    assert stale
+    await stalled.check_fence(stale)
+    await fake_redis.delete(_LEASE_NAME)
+    lease = await current.acquire("tick:2")
+    assert lease
+
+    await current.check_fence(lease)
+    with pytest.raises(StaleFetchLeaseError):
+        await stalled.check_fence(stale)
+    # * newer holder keeps writing
+    await current.check_fence(lease)
+    assert (await current.get_stats())["fenced_off"] == 1
@@ -1,33 +1,68 @@
+import aiohttp
 import pytest
 import pytest_asyncio
 import redis.asyncio as redis
-from aiohttp_client_cache import SQLiteBackend
-from aiohttp_client_cache.session import CachedSession
 from arq import ArqRedis
-from finnikacc_api import settings
-from finnikacc_api.arqjobs.fetchrates import fetch_conv_rates_oex
-from finnikacc_api.lifecycle.dependencies import EXTERNAL_DEPENDENCIES_CONTEXT_KEY, ExternalDependencies
+from fastapi import FastAPI
+from finnikacc_api.arqjobs.fetchrates import _ALLOWED_CURRENCIES, fetch_conv_rates
+from finnikacc_api.lifecycle.dependencies import (
+    EXTERNAL_DEPENDENCIES_CONTEXT_KEY,
+    INTERNAL_DEPENDENCIES_CONTEXT_KEY,
+    ExternalDependencies,
+    InternalDependencies,
+)
+from finnikacc_api.lifecycle.deps_int_lifecycle import internal_deps_lifespan
+from finnikacc_api.providers.oex_replay import OexReplayServer, synthetic_oex_latest
+
+_T0 = 1700000000
 
 
 @pytest_asyncio.fixture(scope="module")
-async def external_dependencies():
-    deps = ExternalDependencies(
-        redis=redis.Redis(),
-        arq_redis=ArqRedis(),
-        oex_client=CachedSession(
-            settings.app.OEX_RATES_BASE_URL,
-            headers={"Authorization": f"Token {settings.secret.OEX_RATES_APP_ID}"},
-            allow_redirects=False,
-            cache=SQLiteBackend(
-                settings.app.OEX_CACHE_DB_NAME,
-                expire_after=settings.app.OEX_CACHE_EXPIRE_AFTER_SEC,
-            ),
-        ),
-    )
-    yield deps
-
-    await deps.oex_client.close()
+async def replay_server():
+    recordings = [
+        synthetic_oex_latest(170, timestamp=_T0, codes=_ALLOWED_CURRENCIES),
+        synthetic_oex_latest(170, timestamp=_T0 + 3600, seed=1, codes=_ALLOWED_CURRENCIES),
+    ]
+    async with OexReplayServer(recordings) as server:
+        yield server
+
+
+@pytest_asyncio.fixture(scope="module")
+async def ctx(replay_server: OexReplayServer):
+    # * OEX is replaced by local replay server, Redis is the local one
+    app = FastAPI()
+    async with aiohttp.ClientSession(replay_server.base_url) as oex_client, redis.Redis() as redis_client:
+        edeps = ExternalDependencies(redis=redis_client, arq_redis=ArqRedis(), oex_client=oex_client)
+        setattr(app.state, EXTERNAL_DEPENDENCIES_CONTEXT_KEY, edeps)
+        async with internal_deps_lifespan(app) as ideps:
+            await ideps.currency_rate_cache.delete_all("USD")
+            yield {EXTERNAL_DEPENDENCIES_CONTEXT_KEY: edeps, INTERNAL_DEPENDENCIES_CONTEXT_KEY: ideps}
+
+
+async def _eur_rate(ideps: InternalDependencies) -> tuple[int, float]:
+    version, rates = await ideps.currency_rate_cache.hgetall_versioned("USD")
+    return version, next(r["rate"] for r in rates if r["currency"] == "EUR")
+
 
 @pytest.mark.asyncio(scope="module")
-async def test_fetchrates(external_dependencies: ExternalDependencies):
-    await fetch_conv_rates_oex({EXTERNAL_DEPENDENCIES_CONTEXT_KEY: external_dependencies})
+async def test_fetchrates(ctx: dict, replay_server: OexReplayServer):
+    ideps: InternalDependencies = ctx[INTERNAL_DEPENDENCIES_CONTEXT_KEY]
+
+    await fetch_conv_rates(ctx)
+    first = await _eur_rate(ideps)
+    await fetch_conv_rates(ctx)
+    not_modified = await _eur_rate(ideps)
+    replay_server.advance()
+    await fetch_conv_rates(ctx)
+    updated = await _eur_rate(ideps)
+
+    # * rates confirmed by `304` are stored again, as fresh as a new response
+    assert not_modified[1] == first[1]
+    assert not_modified[0] > first[0]
+    _, rates = await ideps.currency_rate_cache.hgetall_versioned("USD")
+    assert min(r["request_at"] for r in rates) > _T0
+    assert updated[0] > not_modified[0]
+    assert updated[1] != first[1]
+    assert replay_server.status_counts == {200: 2, 304: 1}
+    currencies = await ideps.currency_rate_cache.smembers_currencies("USD")
+    assert set(currencies) == set(_ALLOWED_CURRENCIES)
@@ -0,0 +1,66 @@
+from datetime import UTC, datetime
+
+import pytest
+from finnikacc_api.arqjobs.fetchschedule import (
+    DEFAULT_CADENCE,
+    UpdateCadence,
+    next_fetch_conv_rates_at,
+    plan_next_fetch,
+    quota_poll_interval,
+)
+from finnikacc_api.providers.base import RequestQuota
+
+_HOUR = 3600
+_T0 = int(datetime(2024, 1, 1, tzinfo=UTC).timestamp())
+
+
+def test_learn_cadence():
+    # * updates every 30 minutes at :10 and :40, one of them missed, slight jitter
+    missed = 5
+    updates = [_T0 + 600 + i * 1800 + (i % 3) for i in range(12) if i != missed]
+
+    assert UpdateCadence.learn(updates, default=DEFAULT_CADENCE) == UpdateCadence(period=1800, phase=600)
+    assert UpdateCadence.learn(updates[:3], default=DEFAULT_CADENCE) == DEFAULT_CADENCE
+
+
+def test_learn_cadence_phase_around_period_start():
+    updates = [_T0 + i * _HOUR + d for i, d in enumerate([-20, 10, -10, 20, 0])]
+
+    assert UpdateCadence.learn(updates, default=DEFAULT_CADENCE) == UpdateCadence(period=_HOUR, phase=0)
+
+
+def test_quota_poll_interval():
+    assert quota_poll_interval([]) == 60  # noqa: PLR2004
+    # * 10 days left, 900 of 1000 requests usable: one per 16 minutes
+    assert quota_poll_interval([RequestQuota(remaining=1000, reset_in_seconds=10 * 86400)]) == 960  # noqa: PLR2004
+    assert quota_poll_interval([RequestQuota(remaining=0, reset_in_seconds=86400)]) == 86400  # noqa: PLR2004
+
+
+@pytest.mark.parametrize(
+    ("now", "last_update_at", "poll_interval", "expected"),
+    [
+        # * one poll per hour, right after expected update
+        (_T0 + 60, _T0 - _HOUR, _HOUR - 1, _T0 + 240),
+        (_T0 + 300, _T0 - _HOUR, _HOUR - 1, _T0 + _HOUR + 240),
+        # * four polls per hour, packed after expected update: at 4, 7.5, 18 and 35.5 minutes
+        (_T0 + 300, _T0 - _HOUR, 900, _T0 + 450),
+        (_T0 + 1100, _T0 - _HOUR, 900, _T0 + 2130),
+        # * update of this hour already seen, rest of the polls skipped
+        (_T0 + 300, _T0, 900, _T0 + _HOUR + 240),
+        # * budget allows one poll per 3 hours
+        (_T0 + 300, _T0, 3 * _HOUR, _T0 + 3 * _HOUR + 240),
+    ],
+)
+def test_plan_next_fetch(now: int, last_update_at: int, poll_interval: float, expected: int):
+    assert (
+        plan_next_fetch(now, cadence=DEFAULT_CADENCE, last_update_at=last_update_at, poll_interval=poll_interval)
+        == expected
+    )
+
+
+def test_next_fetch_at_planned():
+    now = datetime.fromtimestamp(_T0 + 60, UTC)
+
+    assert next_fetch_conv_rates_at(now, _T0 + 600) == datetime.fromtimestamp(_T0 + 660, UTC)
+    # * plan passed long ago, falls back to estimate
+    assert next_fetch_conv_rates_at(now, _T0 - _HOUR) == datetime.fromtimestamp(_T0 + 300, UTC)
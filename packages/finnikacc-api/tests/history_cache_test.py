@@ -0,0 +1,26 @@
+import pytest
+from finnikacc_api.redis.history_cache import AVERAGE_WINDOWS, _AverageState
+
+
+def _mean(points: list[tuple[int, float]], at: int, window: int) -> float:
+    in_window = [r for p_at, r in points if at - window < p_at <= at]
+    return sum(in_window) / len(in_window)
+
+
+def test_average_state_matches_full_recompute():
+    points = [(i * 3600, 1.0 + (i % 13) / 10) for i in range(24 * 10)]
+    state = _AverageState.first(*points[0])
+
+    for i, (at, rate) in enumerate(points[1:], start=1):
+        # * what `append_snapshot` reads: points in (last_at - max window, at - min window]
+        evicted = [p for p in points[:i] if state.last_at - 7 * 86400 < p[0] <= at - 86400]
+        state.advance(at, rate, evicted)
+
+        for j, window in enumerate(AVERAGE_WINDOWS.values()):
+            assert state.sums[j] / state.counts[j] == pytest.approx(_mean(points[: i + 1], at, window))
+
+
+def test_average_state_pack_round_trip():
+    state = _AverageState(last_at=1700000000, sums=[24.5, 49.0, 171.5], counts=[24, 48, 168])
+
+    assert _AverageState.unpack(state.pack().encode()) == state
@@ -0,0 +1,29 @@
+import pytest
+from finnikacc_api.lifecycle.http_cache_backends import BoundedDictCache
+
+
+@pytest.mark.asyncio
+async def test_bounded_dict_cache_evicts_least_recently_used():
+    cache = BoundedDictCache(max_entries=2)
+    await cache.write("a", "A")
+    await cache.write("b", "B")
+    assert await cache.read("a") == "A"
+
+    await cache.write("c", "C")
+
+    assert await cache.size() == 2  # noqa: PLR2004
+    assert await cache.read("b") is None
+    assert await cache.read("a") == "A"
+    assert await cache.read("c") == "C"
+
+
+@pytest.mark.asyncio
+async def test_bounded_dict_cache_overwrite_does_not_evict():
+    cache = BoundedDictCache(max_entries=2)
+    await cache.write("a", "A")
+    await cache.write("b", "B")
+
+    await cache.write("a", "A2")
+
+    assert await cache.read("a") == "A2"
+    assert await cache.read("b") == "B"
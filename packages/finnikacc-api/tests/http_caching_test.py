@@ -0,0 +1,80 @@
+from datetime import UTC, datetime
+from http import HTTPStatus
+
+import pytest
+from finnikacc_api.app_webapi.encoded_response import EncodedBody
+from finnikacc_api.app_webapi.http_caching import (
+    cache_control_max_age,
+    conditional_snapshot_response,
+    is_not_modified,
+    snapshot_etag,
+)
+from finnikacc_api.redis.snapshot_cache import CurrencyRateSnapshot
+
+_SNAPSHOT = CurrencyRateSnapshot(
+    base_currency="USD",
+    version=3,
+    rates={"EUR": {"currency": "EUR", "rate": 0.86, "request_at": 1700000100, "last_modified": 1700000000}},
+)
+_ETAG = snapshot_etag(_SNAPSHOT, "identity")
+
+
+def test_snapshot_etag_distinct_per_encoding():
+    assert snapshot_etag(_SNAPSHOT, "gzip") != _ETAG
+    assert snapshot_etag(_SNAPSHOT, "identity", "1d") != _ETAG
+    assert _ETAG.startswith('"')
+    assert _ETAG.endswith('"')
+
+
+@pytest.mark.parametrize(
+    ("if_none_match", "if_modified_since", "expected"),
+    [
+        (None, None, False),
+        (_ETAG, None, True),
+        (f'"other", W/{_ETAG}', None, True),
+        ("*", None, True),
+        ('"other"', "Tue, 14 Nov 2023 22:13:20 GMT", False),
+        (None, "Tue, 14 Nov 2023 22:13:20 GMT", True),
+        (None, "Tue, 14 Nov 2023 22:13:19 GMT", False),
+        (None, "not a date", False),
+    ],
+)
+def test_is_not_modified(if_none_match: str | None, if_modified_since: str | None, expected: bool):  # noqa: FBT001
+    assert (
+        is_not_modified(
+            _ETAG,
+            _SNAPSHOT.last_modified,
+            if_none_match=if_none_match,
+            if_modified_since=if_modified_since,
+        )
+        == expected
+    )
+
+
+@pytest.mark.parametrize(
+    ("variant", "expected"),
+    [(None, HTTPStatus.NOT_MODIFIED), ("1d", HTTPStatus.OK)],
+)
+def test_if_modified_since_ignored_for_variant(variant: str | None, expected: HTTPStatus):
+    response = conditional_snapshot_response(
+        _SNAPSHOT,
+        EncodedBody(b"{}"),
+        accept_encoding=None,
+        if_none_match=None,
+        if_modified_since="Tue, 14 Nov 2023 22:13:20 GMT",
+        variant=variant,
+    )
+
+    assert response.status_code == expected
+
+
+@pytest.mark.parametrize(
+    ("now", "expected"),
+    [
+        ("2024-01-01T10:00:00", 5 * 60),  # * fetch at 10:04 completes by 10:05
+        ("2024-01-01T10:04:30", 30),  # * fetch is running right now
+        ("2024-01-01T10:05:00", 60 * 60),
+    ],
+)
+def test_cache_control_max_age(now: str, expected: int):
+    assert cache_control_max_age(datetime.fromisoformat(now).replace(tzinfo=UTC)) == expected
@@ -0,0 +1,48 @@
+import pytest
+from finnikacc_api.app_webapi.middleware import OriginRefererMiddleware
+from starlette.types import Message, Receive, Scope, Send
+
+_ALLOWED = ["https://cc.finnika.app", "http://localhost:5173"]
+
+
+async def _ok(_: Scope, __: Receive, send: Send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _status(headers: list[tuple[bytes, bytes]], allowed_origins: list[str] = _ALLOWED) -> int:
+    sent: list[Message] = []
+
+    async def send(message: Message) -> None:
+        sent.append(message)
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b""}
+
+    middleware = OriginRefererMiddleware(_ok, allowed_origins=allowed_origins)
+    await middleware({"type": "http", "method": "GET", "path": "/", "headers": headers}, receive, send)
+    return sent[0]["status"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("headers", "expected"),
+    [
+        ([], 200),
+        ([(b"origin", b"https://cc.finnika.app")], 200),
+        ([(b"origin", b"http://localhost:5173"), (b"referer", b"http://localhost:5173/convert?x=1")], 200),
+        ([(b"origin", b"")], 200),
+        ([(b"origin", b"https://cc.finnika.app/")], 500),
+        ([(b"origin", b"https://evil.example")], 500),
+        ([(b"referer", b"https://evil.example/https://cc.finnika.app")], 500),
+        ([(b"origin", b"https://cc.finnika.app"), (b"referer", b"http://localhost:5174/")], 500),
+    ],
+)
+async def test_origin_referer_check(headers: list[tuple[bytes, bytes]], expected: int):
+    assert await _status(headers) == expected
+
+
+@pytest.mark.asyncio
+async def test_nothing_allowed_rejects_any_referer():
+    assert await _status([(b"referer", b"https://cc.finnika.app/")], allowed_origins=[]) == 500  # noqa: PLR2004
+    assert await _status([], allowed_origins=[]) == 200  # noqa: PLR2004
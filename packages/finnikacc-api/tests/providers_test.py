@@ -0,0 +1,171 @@
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, cast
+
+import aiohttp
+import pytest
+from finnikacc_api.providers.base import ProviderRates, RatesProviderError, merge_provider_rates, to_pivot_rates
+from finnikacc_api.providers.file import FileRatesProvider
+from finnikacc_api.providers.oex import OexRatesProvider
+from finnikacc_api.providers.oex_replay import OexReplayServer, synthetic_oex_latest
+from finnikacc_api.redis.model import (
+    CurrencyRateCacheValueTyped,
+    RequestLastModETagCacheValue,
+    RequestLastModETagCacheValueTyped,
+    _convert_to_untyped_etag,
+)
+
+if TYPE_CHECKING:
+    from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache, LastRequestETagRedisCache
+
+
+def _rates(provider: str, request_at: int, **rates: float) -> ProviderRates:
+    return ProviderRates(provider=provider, rates=rates, request_at=request_at, last_modified=request_at)
+
+
+def test_merge_by_precedence():
+    merged = merge_provider_rates(
+        [_rates("a", 100, USD=1, EUR=0.9), _rates("b", 200, USD=1, EUR=0.8, UAH=41.0)],
+        policy="precedence",
+    )
+
+    assert merged["EUR"] == {"currency": "EUR", "rate": 0.9, "request_at": 100, "last_modified": 100}
+    assert merged["UAH"]["rate"] == 41.0  # noqa: PLR2004
+    assert merged["UAH"]["request_at"] == 200  # noqa: PLR2004
+
+
+def test_merge_freshest_first():
+    merged = merge_provider_rates(
+        [_rates("a", 100, USD=1, EUR=0.9, PLN=4.0), _rates("b", 200, USD=1, EUR=0.8)],
+        policy="freshest",
+    )
+
+    assert {c: r["rate"] for c, r in merged.items()} == {"USD": 1, "EUR": 0.8, "PLN": 4.0}
+    assert merged["PLN"]["request_at"] == 100  # noqa: PLR2004
+
+
+def test_to_pivot_rates():
+    rates = to_pivot_rates("EUR", {"EUR": 1, "USD": 1.25, "PLN": 5.0})
+
+    assert rates == {"EUR": 0.8, "USD": 1, "PLN": 4.0}
+    with pytest.raises(RatesProviderError):
+        to_pivot_rates("EUR", {"EUR": 1, "PLN": 5.0})
+
+
+@pytest.mark.asyncio
+async def test_file_provider_reports_not_modified(tmp_path: Path):
+    path = tmp_path / "latest.json"
+    path.write_text(json.dumps({"base": "USD", "timestamp": 1700000000, "rates": {"USD": 1, "EUR": 0.9}}))
+    provider = FileRatesProvider(path)
+
+    first = await provider.fetch()
+    second = await provider.fetch()
+    path.write_text(json.dumps({"base": "USD", "timestamp": 1700003600, "rates": {"USD": 1, "EUR": 0.91}}))
+    os.utime(path, ns=(path.stat().st_mtime_ns + 10**9,) * 2)
+    third = await provider.fetch()
+
+    assert first
+    assert (first.modified, first.request_at, first.rates) == (True, 1700000000, {"USD": 1, "EUR": 0.9})
+    assert second
+    assert (second.modified, second.rates) == (False, first.rates)
+    assert third
+    assert (third.modified, third.rates["EUR"]) == (True, 0.91)
+
+
+@pytest.mark.asyncio
+async def test_file_provider_missing_file(tmp_path: Path):
+    assert await FileRatesProvider(tmp_path / "missing.json").fetch() is None
+
+
+class _StubETagCache:
+    def __init__(self) -> None:
+        self.meta: dict[str, RequestLastModETagCacheValue] = {}
+        self.updates: set[int] = set()
+
+    async def hget_raw(self, endpoint: str) -> RequestLastModETagCacheValue | None:
+        return self.meta.get(endpoint)
+
+    async def hset_conv(self, mapping: RequestLastModETagCacheValueTyped, *, endpoint: str) -> None:
+        self.meta[endpoint] = _convert_to_untyped_etag(mapping)
+
+    async def add_update(self, last_modified: int, *, endpoint: str) -> None:  # noqa: ARG002
+        self.updates.add(last_modified)
+
+    async def get_updates(self, endpoint: str) -> list[int]:  # noqa: ARG002
+        return sorted(self.updates)
+
+
+@pytest.mark.asyncio
+async def test_oex_provider_against_replay_server():
+    recordings = [synthetic_oex_latest(8, timestamp=1700000000), synthetic_oex_latest(8, timestamp=1700003600, seed=1)]
+    async with OexReplayServer(recordings) as server, aiohttp.ClientSession(server.base_url) as client:
+        provider = OexRatesProvider(client, cast("LastRequestETagRedisCache", _StubETagCache()))
+
+        first = await provider.fetch()
+        second = await provider.fetch()
+        server.advance()
+        third = await provider.fetch()
+
+        assert first
+        assert (first.modified, first.request_at, first.last_modified) == (True, 1700000000, 1700000000)
+        assert second
+        assert (second.modified, second.rates) == (False, first.rates)
+        assert second.request_at > first.request_at
+        assert third
+        assert (third.modified, third.request_at) == (True, 1700003600)
+        assert third.rates != first.rates
+        assert server.status_counts == {200: 2, 304: 1}
+        assert await provider.update_history() == [1700000000, 1700003600]
+
+
+class _StubStoredRates:
+    def __init__(self, rates: ProviderRates | None = None) -> None:
+        self.rates = rates
+
+    async def hgetall_currencies_all(self, base_currency: str) -> list[CurrencyRateCacheValueTyped]:  # noqa: ARG002
+        if not self.rates:
+            return []
+        return list(merge_provider_rates([self.rates], policy="precedence").values())
+
+
+@pytest.mark.asyncio
+async def test_oex_provider_restores_previous_response_from_stored_rates():
+    etag_cache = cast("LastRequestETagRedisCache", _StubETagCache())
+    async with (
+        OexReplayServer([synthetic_oex_latest(8, timestamp=1700000000)]) as server,
+        aiohttp.ClientSession(server.base_url) as client,
+    ):
+        first = await OexRatesProvider(client, etag_cache).fetch()
+        stored = cast("CurrencyRateRedisCache", _StubStoredRates(first))
+        # * another process: restored rates are reused on `304`
+        restored = await OexRatesProvider(client, etag_cache, stored_rates=stored).fetch()
+        # * another process, nothing stored yet: unconditional request
+        fresh = await OexRatesProvider(
+            client,
+            etag_cache,
+            stored_rates=cast("CurrencyRateRedisCache", _StubStoredRates()),
+        ).fetch()
+
+        assert first
+        assert restored
+        assert (restored.modified, restored.rates, restored.last_modified) == (False, first.rates, 1700000000)
+        assert fresh
+        assert fresh.modified
+        assert server.status_counts == {200: 2, 304: 1}
+
+
+@pytest.mark.asyncio
+async def test_replay_server_etag_takes_precedence_over_modified_since():
+    async with (
+        OexReplayServer([synthetic_oex_latest(8, timestamp=1700000000)]) as server,
+        aiohttp.ClientSession(server.base_url) as client,
+    ):
+        async with client.get("latest.json") as response:
+            etag, date = response.headers["ETag"], response.headers["Date"]
+        async with client.get("latest.json", headers={"If-None-Match": etag}) as response:
+            assert response.status == 304  # noqa: PLR2004
+        async with client.get("latest.json", headers={"If-Modified-Since": date}) as response:
+            assert response.status == 304  # noqa: PLR2004
+        async with client.get("latest.json", headers={"If-None-Match": '"stale"', "If-Modified-Since": date}) as r:
+            assert r.status == 200  # noqa: PLR2004
@@ -0,0 +1,19 @@
+import pytest
+from finnikacc_api.app_webapi.rate_age import rate_age_of
+
+_NOW = 1700000000
+
+
+@pytest.mark.parametrize(
+    ("age_sec", "expected"),
+    [
+        (0, "1h"),
+        (3600 + 600, "1h"),
+        (2 * 3600, "1d"),
+        (86400 + 600, "1d"),
+        (86400 + 3600, "2d"),
+        (3 * 86400, "outdated"),
+    ],
+)
+def test_rate_age_of(age_sec: int, expected: str):
+    assert rate_age_of(_NOW - age_sec, _NOW) == expected
@@ -0,0 +1,59 @@
+from typing import TYPE_CHECKING, cast, get_args
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from finnikacc_api.redis.model import CurrencyRateCacheLayout, CurrencyRateCacheValueTyped, _unpack_changes
+from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+_T0 = 1700000000
+
+
+def test_unpack_changes():
+    fields = {b"version": b"7", b"changed": b"EUR|0.91|PLN|4.0", b"removed": b"GBP"}
+
+    assert _unpack_changes(fields) == {"version": 7, "changed": {"EUR": 0.91, "PLN": 4.0}, "removed": ["GBP"]}
+
+
+def test_unpack_changes_empty():
+    fields = {b"version": b"8", b"changed": b"", b"removed": b""}
+
+    assert _unpack_changes(fields) == {"version": 8, "changed": {}, "removed": []}
+
+
+def _rate(currency: str, rate: float, *, at: int = _T0) -> CurrencyRateCacheValueTyped:
+    return {"currency": currency, "rate": rate, "request_at": at, "last_modified": at}
+
+
+@pytest.mark.parametrize("layout", get_args(CurrencyRateCacheLayout))
+@pytest.mark.asyncio
+async def test_diff_write_streams_only_changes(fake_redis: FakeAsyncRedis, layout: CurrencyRateCacheLayout):
+    cache = CurrencyRateRedisCache(
+        cast("Redis", fake_redis),
+        expiration_seconds=3600,
+        cache_type="latest",
+        layout=layout,
+    )
+    first = {"EUR": _rate("EUR", 0.86), "PLN": _rate("PLN", 3.9), "GBP": _rate("GBP", 0.75)}
+
+    created = await cache.hset_m_diff_conv(first, base_currency="USD")
+    unchanged = await cache.hset_m_diff_conv(
+        {c: _rate(c, r["rate"], at=_T0 + 3600) for c, r in first.items()},
+        base_currency="USD",
+    )
+    updated = await cache.hset_m_diff_conv(
+        {"EUR": _rate("EUR", 0.87), "PLN": _rate("PLN", 3.9)},
+        base_currency="USD",
+    )
+    events = await cache.read_changes("USD")
+
+    assert created == {"version": 1, "changed": {"EUR": 0.86, "PLN": 3.9, "GBP": 0.75}, "removed": []}
+    assert unchanged == {"version": 2, "changed": {}, "removed": []}
+    assert updated == {"version": 3, "changed": {"EUR": 0.87}, "removed": ["GBP"]}
+    # * no event for the unchanged snapshot, changed event carries only what changed
+    assert [changes for _, changes in events] == [created, updated]
+    version, rates = await cache.hgetall_versioned("USD")
+    assert version == updated["version"]
+    assert rates == [_rate("EUR", 0.87), _rate("PLN", 3.9)]
@@ -0,0 +1,93 @@
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+from finnikacc_api.archive.rates_archive import RatesArchive
+
+_JAN_31 = int(datetime(2025, 1, 31, 22, tzinfo=UTC).timestamp())
+_HOUR = 3600
+# * PLN appears in fixture rows from this one on
+_PLN_FROM_ROW = 2
+
+
+@pytest.fixture
+def archive(tmp_path: Path) -> RatesArchive:
+    archive = RatesArchive(tmp_path)
+    for i in range(5):
+        rates = {"USD": 1.0, "EUR": 0.8 + i / 100}
+        if i >= _PLN_FROM_ROW:
+            rates["PLN"] = 4.0
+        assert archive.append(_JAN_31 + i * _HOUR, rates)
+    return archive
+
+
+@pytest.mark.usefixtures("archive")
+def test_archive_chunked_per_month(tmp_path: Path):
+    assert sorted(p.name for p in (tmp_path / "USD").iterdir()) == ["2025-01", "2025-02"]
+    assert (tmp_path / "USD" / "2025-02" / "timestamps.i64").stat().st_size == 3 * 8
+
+
+def test_archive_skips_not_newer(archive: RatesArchive):
+    assert not archive.append(_JAN_31 + 4 * _HOUR, {"EUR": 1.0})
+    assert archive.rate_at("USD", "EUR", _JAN_31 + 10 * _HOUR) == (_JAN_31 + 4 * _HOUR, pytest.approx(0.84))
+
+
+def test_archive_rate_at(archive: RatesArchive):
+    assert archive.rate_at("USD", "EUR", _JAN_31 - 1) is None
+    assert archive.rate_at("USD", "EUR", _JAN_31 + _HOUR + 59) == (_JAN_31 + _HOUR, pytest.approx(0.81))
+    assert archive.rate_at("EUR", "PLN", _JAN_31 + 3 * _HOUR) == (_JAN_31 + 3 * _HOUR, pytest.approx(4.0 / 0.83))
+    # * PLN is missing in January rows
+    assert archive.rate_at("USD", "PLN", _JAN_31 + _HOUR) is None
+    assert archive.rate_at("PLN", "USD", _JAN_31 + 9 * _HOUR) == (_JAN_31 + 4 * _HOUR, pytest.approx(0.25))
+
+
+def test_archive_series(archive: RatesArchive):
+    series = archive.series("USD", "EUR", _JAN_31 + _HOUR, _JAN_31 + 3 * _HOUR)
+
+    assert [at for at, _ in series] == [_JAN_31 + i * _HOUR for i in (1, 2, 3)]
+    assert [r for _, r in series] == pytest.approx([0.81, 0.82, 0.83])
+    assert [at for at, _ in archive.series("USD", "PLN", 0, _JAN_31 + 9 * _HOUR)] == [
+        _JAN_31 + i * _HOUR for i in (2, 3, 4)
+    ]
+
+
+def test_archive_recovers_partially_written_row(archive: RatesArchive, tmp_path: Path):
+    column = tmp_path / "USD" / "2025-02" / "EUR.f64"
+    with column.open("ab") as f:
+        f.write(b"\0" * 12)
+
+    assert archive.append(_JAN_31 + 5 * _HOUR, {"EUR": 0.9})
+    assert column.stat().st_size == 4 * 8
+    assert archive.rate_at("USD", "EUR", _JAN_31 + 5 * _HOUR) == (_JAN_31 + 5 * _HOUR, pytest.approx(0.9))
+
+
+def test_archive_merge_older_rows(archive: RatesArchive):
+    merged = archive.merge(
+        {
+            _JAN_31 - 2 * _HOUR: {"EUR": 0.7, "GBP": 0.75},
+            _JAN_31 + 2 * _HOUR + 1800: {"EUR": 0.9},
+            _JAN_31 + 3 * _HOUR: {"EUR": 1.0},  # * already there
+        },
+    )
+
+    assert merged == 2  # noqa: PLR2004
+    assert [at for at, _ in archive.series("USD", "EUR", 0, _JAN_31 + 9 * _HOUR)] == [
+        _JAN_31 - 2 * _HOUR,
+        *(_JAN_31 + i * _HOUR for i in (0, 1, 2)),
+        _JAN_31 + 2 * _HOUR + 1800,
+        _JAN_31 + 3 * _HOUR,
+        _JAN_31 + 4 * _HOUR,
+    ]
+    assert archive.rate_at("USD", "EUR", _JAN_31 + 3 * _HOUR - 1) == (_JAN_31 + 2 * _HOUR + 1800, pytest.approx(0.9))
+    assert archive.rate_at("USD", "PLN", _JAN_31 + 2 * _HOUR + 1800) == (_JAN_31 + 2 * _HOUR, pytest.approx(4.0))
+    assert archive.rate_at("GBP", "EUR", _JAN_31) == (_JAN_31 - 2 * _HOUR, pytest.approx(0.7 / 0.75))
+
+
+def test_read_only_archive_refuses_writes(archive: RatesArchive, tmp_path: Path):
+    reader = RatesArchive(tmp_path, writable=False)
+
+    with pytest.raises(RuntimeError):
+        reader.append(_JAN_31 + 10 * _HOUR, {"EUR": 0.9})
+    with pytest.raises(RuntimeError):
+        reader.merge({_JAN_31 - _HOUR: {"EUR": 0.9}})
+    assert reader.series("USD", "EUR", 0, 2**32) == archive.series("USD", "EUR", 0, 2**32)
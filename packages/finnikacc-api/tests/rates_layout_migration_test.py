@@ -0,0 +1,80 @@
+import asyncio
+from typing import TYPE_CHECKING, cast
+
+import pytest
+from finnikacc_api.redis.model import CurrencyRateCacheLayout, CurrencyRateCacheValueTyped
+from finnikacc_api.redis.redis_cache import migrate_currency_rates_layout
+
+if TYPE_CHECKING:
+    from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache
+
+_RATE: CurrencyRateCacheValueTyped = {"currency": "EUR", "rate": 0.86, "request_at": 1, "last_modified": 1}
+
+
+class _StubRatesCache:
+    """Stand-in for a cache in one layout; lock and marker (`shared`) are shared by processes, as in Redis."""
+
+    def __init__(self, layout: CurrencyRateCacheLayout, shared: dict[str, object]) -> None:
+        self.layout = layout
+        self.rates: list[CurrencyRateCacheValueTyped] = []
+        self.shared = shared
+        self.reads = 0
+
+    async def hgetall_currencies_all(self, base_currency: str) -> list[CurrencyRateCacheValueTyped]:  # noqa: ARG002
+        self.reads += 1
+        # * let other "processes" run in between
+        await asyncio.sleep(0)
+        return list(self.rates)
+
+    async def hset_m_conv(self, mappings: dict[str, CurrencyRateCacheValueTyped], *, base_currency: str) -> int:  # noqa: ARG002
+        self.rates = list(mappings.values())
+        return 1
+
+    async def delete_all(self, base_currency: str) -> None:  # noqa: ARG002
+        self.rates = []
+
+    async def is_migrated(self, base_currency: str) -> bool:  # noqa: ARG002
+        return self.shared.get("migrated") == self.layout
+
+    async def lock_migration(self, base_currency: str, *, ttl_seconds: int) -> bool:  # noqa: ARG002
+        if self.shared.get("locked"):
+            return False
+        self.shared["locked"] = True
+        return True
+
+    async def mark_migrated(self, base_currency: str) -> None:  # noqa: ARG002
+        self.shared.update(migrated=self.layout, locked=False)
+
+
+async def _migrate(source: _StubRatesCache, target: _StubRatesCache) -> int:
+    return await migrate_currency_rates_layout(
+        cast("CurrencyRateRedisCache", source),
+        cast("CurrencyRateRedisCache", target),
+        base_currency="USD",
+    )
+
+
+@pytest.mark.asyncio
+async def test_migration_runs_once_across_processes():
+    shared: dict[str, object] = {}
+    source, target = _StubRatesCache("hash_per_pair", shared), _StubRatesCache("hash_per_base", shared)
+    source.rates = [_RATE]
+
+    versions = await asyncio.gather(_migrate(source, target), _migrate(source, target))
+    restarted = await _migrate(source, target)
+
+    assert sorted(versions) == [0, 1]
+    assert restarted == 0
+    assert source.reads == 1
+    assert (source.rates, target.rates) == ([], [_RATE])
+    assert shared == {"migrated": "hash_per_base", "locked": False}
+
+
+@pytest.mark.asyncio
+async def test_migration_marked_when_nothing_to_migrate():
+    shared: dict[str, object] = {}
+    source, target = _StubRatesCache("hash_per_pair", shared), _StubRatesCache("snapshot_blob", shared)
+
+    assert await _migrate(source, target) == 0
+    assert await _migrate(source, target) == 0
+    assert source.reads == 1
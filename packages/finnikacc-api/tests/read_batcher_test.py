@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from finnikacc_api.redis._read_batcher import ReadBatcher
+
+
+class _Loader:
+    def __init__(self, *, delay: float = 0.0, fail: bool = False) -> None:
+        self.calls: list[list[str]] = []
+        self._delay = delay
+        self._fail = fail
+
+    async def __call__(self, keys: list[str]) -> dict[str, str]:
+        self.calls.append(keys)
+        await asyncio.sleep(self._delay)
+        if self._fail:
+            msg = "Redis is down"
+            raise ConnectionError(msg)
+        return {k: k.upper() for k in keys if k != "missing"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_are_merged_into_one_load():
+    loader = _Loader()
+    batcher = ReadBatcher(loader, window_seconds=0.01)
+
+    results = await asyncio.gather(
+        batcher.get_many(["a", "b"]),
+        batcher.get_many(["b", "c", "missing"]),
+        batcher.get("a"),
+    )
+
+    assert loader.calls == [["a", "b", "c", "missing"]]
+    assert results == [{"a": "A", "b": "B"}, {"b": "B", "c": "C", "missing": None}, "A"]
+
+
+@pytest.mark.asyncio
+async def test_reads_join_load_in_flight():
+    loader = _Loader(delay=0.05)
+    batcher = ReadBatcher(loader)
+
+    first = asyncio.create_task(batcher.get("a"))
+    await asyncio.sleep(0.01)
+    second = await batcher.get_many(["a", "b"])
+
+    assert await first == "A"
+    assert second == {"a": "A", "b": "B"}
+    assert loader.calls == [["a"], ["b"]]
+
+
+@pytest.mark.asyncio
+async def test_sequential_reads_load_again():
+    loader = _Loader()
+    batcher = ReadBatcher(loader)
+
+    await batcher.get("a")
+    await batcher.get("a")
+
+    assert loader.calls == [["a"], ["a"]]
+
+
+@pytest.mark.asyncio
+async def test_load_error_is_raised_to_all_waiters():
+    batcher = ReadBatcher(_Loader(fail=True))
+
+    results = await asyncio.gather(batcher.get("a"), batcher.get("a"), return_exceptions=True)
+
+    assert all(isinstance(r, ConnectionError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_others():
+    loader = _Loader(delay=0.05)
+    batcher = ReadBatcher(loader)
+
+    cancelled = asyncio.create_task(batcher.get("a"))
+    other = asyncio.create_task(batcher.get("a"))
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+
+    assert await other == "A"
+    assert cancelled.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_loaded_without_waiting_for_window():
+    loader = _Loader()
+    batcher = ReadBatcher(loader, window_seconds=10, max_batch=2)
+
+    result = await asyncio.wait_for(batcher.get_many(["a", "b"]), timeout=1)
+
+    assert result == {"a": "A", "b": "B"}
@@ -0,0 +1,70 @@
+from typing import TYPE_CHECKING, cast, get_args
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from finnikacc_api import settings
+from finnikacc_api.redis.model import CurrencyRateCacheLayout, CurrencyRateCacheValueTyped
+from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+_T0 = 1700000000
+# * index of quote currencies stored for USD by `_cache` (`hash_per_pair` layout)
+_INDEX_NAME = f"fcc:{settings.APP_ENV}:rates:oex:latest:index:USD"
+
+
+def _rate(currency: str, rate: float) -> CurrencyRateCacheValueTyped:
+    return {"currency": currency, "rate": rate, "request_at": _T0 + 60, "last_modified": _T0}
+
+
+def _cache(redis: FakeAsyncRedis, layout: CurrencyRateCacheLayout) -> CurrencyRateRedisCache:
+    return CurrencyRateRedisCache(cast("Redis", redis), expiration_seconds=3600, cache_type="latest", layout=layout)
+
+
+@pytest.mark.parametrize("layout", get_args(CurrencyRateCacheLayout))
+@pytest.mark.asyncio
+async def test_publish_read_round_trip(fake_redis: FakeAsyncRedis, layout: CurrencyRateCacheLayout):
+    cache = _cache(fake_redis, layout)
+    first = [_rate("EUR", 0.86), _rate("GBP", 0.75), _rate("PLN", 3.9)]
+    second = [_rate("EUR", 0.87), _rate("PLN", 3.9)]
+
+    first_version = await cache.hset_m_conv({r["currency"]: r for r in first}, base_currency="USD")
+    first_read = await cache.hgetall_versioned("USD")
+    second_version = await cache.hset_m_conv({r["currency"]: r for r in second}, base_currency="USD")
+    # * fresh instance: nothing cached or batched in process
+    second_read = await _cache(fake_redis, layout).hgetall_versioned("USD")
+
+    assert first_read == (first_version, first)
+    # * snapshot is replaced as a whole: dropped currency is gone
+    assert second_read == (second_version, second)
+    assert second_version == first_version + 1
+    assert await cache.smembers_currencies("USD") == ["EUR", "PLN"]
+
+
+@pytest.mark.asyncio
+async def test_index_updated_on_write(fake_redis: FakeAsyncRedis):
+    cache = _cache(fake_redis, "hash_per_pair")
+
+    await cache.hset_conv(_rate("EUR", 0.86), base_currency="USD", quote_currency="EUR")
+    await cache.hset_conv(_rate("PLN", 3.9), base_currency="USD", quote_currency="PLN")
+
+    assert await cache.smembers_currencies("USD") == ["EUR", "PLN"]
+    assert await fake_redis.ttl(_INDEX_NAME) > 0
+
+
+@pytest.mark.asyncio
+async def test_missing_index_rebuilt_from_scan(fake_redis: FakeAsyncRedis):
+    cache = _cache(fake_redis, "hash_per_pair")
+    rates = [_rate("EUR", 0.86), _rate("GBP", 0.75), _rate("PLN", 3.9)]
+    version = await cache.hset_m_conv({r["currency"]: r for r in rates}, base_currency="USD")
+    # * e.g. rates stored before the index was introduced
+    assert await fake_redis.delete(_INDEX_NAME) == 1
+
+    all_rates = await cache.hgetall_currencies_all("USD")
+    versioned = await _cache(fake_redis, "hash_per_pair").hgetall_versioned("USD")
+
+    assert sorted(all_rates, key=lambda r: r["currency"]) == rates
+    assert versioned == (version, rates)
+    assert await cache.smembers_currencies("USD") == ["EUR", "GBP", "PLN"]
+    assert await fake_redis.ttl(_INDEX_NAME) > 0
@@ -0,0 +1,80 @@
+from typing import Any
+
+import pytest
+from finnikacc_api.lifecycle.deps_ext_lifecycle import _arq_redis_factory
+from finnikacc_api.redis.instrumentation import (
+    PIPELINE_COMMAND,
+    InstrumentedConnectionPool,
+    InstrumentedRedis,
+    LatencyStats,
+    redis_stats,
+)
+from redis.asyncio import ConnectionPool, Redis
+from redis.asyncio.client import Pipeline
+
+
+def test_latency_stats():
+    stats = LatencyStats()
+    stats.observe(0.002)
+    stats.observe(0.004, error=True)
+
+    assert stats.as_dict() == {"count": 2, "errors": 1, "avg_ms": 3.0, "max_ms": 4.0}
+    assert LatencyStats().as_dict()["avg_ms"] == 0
+
+
+@pytest.mark.asyncio
+async def test_instrumented_redis_records_commands_and_pipelines(monkeypatch: pytest.MonkeyPatch):
+    async def execute_command(_: Redis, *args: Any, **__: Any) -> Any:  # noqa: ANN401
+        if args[0] == "GET":
+            msg = "boom"
+            raise ValueError(msg)
+        return True
+
+    async def execute(_: Pipeline, raise_on_error: bool = True) -> list[Any]:  # noqa: ARG001, FBT001, FBT002
+        return [True]
+
+    monkeypatch.setattr(Redis, "execute_command", execute_command)
+    monkeypatch.setattr(Pipeline, "execute", execute)
+    pool = InstrumentedConnectionPool(max_connections=3, timeout=1)
+    r = InstrumentedRedis(connection_pool=pool)
+
+    await r.set("k", "v")
+    await r.set("k", "v")
+    with pytest.raises(ValueError, match="boom"):
+        await r.get("k")
+    async with r.pipeline() as pipe:
+        await pipe.set("k", "v").execute()
+
+    stats = redis_stats(r)
+    assert stats["pool"] == {
+        "max_connections": 3,
+        "in_use": 0,
+        "idle": 0,
+        "wait": {"count": 0, "errors": 0, "avg_ms": 0, "max_ms": 0},
+    }
+    assert list(stats["commands"]) == ["GET", PIPELINE_COMMAND, "SET"]
+    assert stats["commands"]["SET"]["count"] == 2  # noqa: PLR2004
+    assert stats["commands"]["GET"]["errors"] == 1
+    assert stats["commands"][PIPELINE_COMMAND]["count"] == 1
+    await pool.disconnect()
+
+
+def test_redis_stats_of_plain_client():
+    assert redis_stats(Redis()) == {"pool": {}, "commands": {}}
+
+
+@pytest.mark.asyncio
+async def test_arq_redis_does_not_close_shared_pool(monkeypatch: pytest.MonkeyPatch):
+    closed: list[ConnectionPool] = []
+
+    async def aclose(pool: ConnectionPool) -> None:
+        closed.append(pool)
+
+    monkeypatch.setattr(ConnectionPool, "aclose", aclose)
+    pool = InstrumentedConnectionPool(max_connections=1)
+
+    # * what `arq.Worker.close()` does with its client
+    await _arq_redis_factory(pool).aclose(close_connection_pool=True)
+    await Redis(connection_pool=pool).aclose(close_connection_pool=True)
+
+    assert closed == [pool]
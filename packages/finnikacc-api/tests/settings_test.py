@@ -0,0 +1,22 @@
+import pytest
+from finnikacc_api.settings import _AppSettings
+from pydantic import ValidationError
+
+
+@pytest.mark.parametrize(
+    ("archive", "expected_valid"),
+    [
+        ({"RATES_ARCHIVE_DIR": "/archive", "RATES_ARCHIVE_WRITER": True}, True),
+        ({"RATES_ARCHIVE_DIR": "/archive", "ARQ_WORKER_EMBEDDED": False}, True),
+        ({"RATES_ARCHIVE_DIR": "/archive"}, False),
+        ({"RATES_ARCHIVE_WRITER": True}, False),
+    ],
+)
+def test_rates_archive_single_writer(archive: dict, expected_valid: bool):  # noqa: FBT001
+    settings = {"OEX_RATES_BASE_URL": "http://oex", "OEX_CACHE_EXPIRE_AFTER_SEC": 60, **archive}
+
+    if expected_valid:
+        _AppSettings(**settings)
+    else:
+        with pytest.raises(ValidationError, match="RATES_ARCHIVE_WRITER"):
+            _AppSettings(**settings)
@@ -0,0 +1,77 @@
+import pytest
+from finnikacc_api.redis.snapshot_blob import (
+    SNAPSHOT_BLOB_VERSION_OFFSET,
+    SnapshotBlobError,
+    decode_snapshot_blob,
+    encode_snapshot_blob,
+)
+
+_RATES = {"EUR": 0.86, "UAH": 41.7105, "BTC": 1.6e-05, "CLF": 0.024, "USDT": 1.0}
+_VERSION = 42
+_REQUEST_AT = 1700000100
+_LAST_MODIFIED = 1700000000
+_UPDATED_RATE = 0.5
+# * does not fit 32 bits
+_STAMPED_VERSION = 2**40 + 7
+
+
+def test_snapshot_blob_round_trip():
+    blob = encode_snapshot_blob("USD", _RATES, version=_VERSION, request_at=_REQUEST_AT, last_modified=_LAST_MODIFIED)
+
+    decoded = decode_snapshot_blob(blob)
+
+    assert decoded.base_currency == "USD"
+    assert decoded.version == _VERSION
+    assert decoded.request_at == _REQUEST_AT
+    assert decoded.last_modified == _LAST_MODIFIED
+    assert decoded.currencies == tuple(_RATES)
+    assert list(decoded.rates) == list(_RATES.values())
+    assert decoded.to_typed()["UAH"] == {
+        "currency": "UAH",
+        "rate": _RATES["UAH"],
+        "request_at": _REQUEST_AT,
+        "last_modified": _LAST_MODIFIED,
+    }
+
+
+def test_snapshot_blob_rates_are_not_copied():
+    blob = bytearray(encode_snapshot_blob("USD", {"EUR": 0.86}, version=1, request_at=1, last_modified=1))
+
+    decoded = decode_snapshot_blob(blob)
+    blob[-8:] = encode_snapshot_blob("USD", {"EUR": _UPDATED_RATE}, version=1, request_at=1, last_modified=1)[-8:]
+
+    assert decoded.rates[0] == _UPDATED_RATE
+
+
+def test_snapshot_blob_empty():
+    decoded = decode_snapshot_blob(encode_snapshot_blob("USD", {}, version=1, request_at=0, last_modified=0))
+
+    assert decoded.base_currency == "USD"
+    assert decoded.currencies == ()
+    assert decoded.to_typed() == {}
+
+
+@pytest.mark.parametrize("blob", [b"", b"XXXX" + bytes(32), b"FCCR\x02" + bytes(31)])
+def test_snapshot_blob_invalid(blob: bytes):
+    with pytest.raises(SnapshotBlobError):
+        decode_snapshot_blob(blob)
+
+
+def test_snapshot_blob_truncated():
+    blob = encode_snapshot_blob("USD", _RATES, version=1, request_at=1, last_modified=1)
+
+    with pytest.raises(SnapshotBlobError):
+        decode_snapshot_blob(blob[:-1])
+
+
+def test_snapshot_blob_version_stamped_in_place():
+    # * what publish script does: version is written over the placeholder of an encoded blob
+    blob = encode_snapshot_blob("USD", _RATES, version=0, request_at=_REQUEST_AT, last_modified=_LAST_MODIFIED)
+    end = SNAPSHOT_BLOB_VERSION_OFFSET + 8
+    stamped = blob[:SNAPSHOT_BLOB_VERSION_OFFSET] + _STAMPED_VERSION.to_bytes(8, "little") + blob[end:]
+
+    decoded = decode_snapshot_blob(stamped)
+
+    assert decoded.version == _STAMPED_VERSION
+    assert decoded.request_at == _REQUEST_AT
+    assert list(decoded.rates) == list(_RATES.values())
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+from typing import TYPE_CHECKING, cast
+
+import pytest
+from finnikacc_api.redis.model import CurrencyRateCacheValueTyped
+from finnikacc_api.redis.snapshot_cache import CurrencyRateSnapshotCache
+
+if TYPE_CHECKING:
+    from finnikacc_api.redis.redis_cache import CurrencyRateRedisCache
+
+
+class _StubRatesCache:
+    def __init__(self, rates: dict[str, float] | None = None, request_at: int = 1) -> None:
+        self.version = 1
+        self.rates = {"EUR": 0.86, "PLN": 3.7} if rates is None else rates
+        self.request_at = request_at
+        self.loads = 0
+        self.messages: asyncio.Queue[tuple[str, int]] = asyncio.Queue()
+
+    async def hgetall_versioned(
+        self,
+        base_currency: str,  # noqa: ARG002
+    ) -> tuple[int, list[CurrencyRateCacheValueTyped]]:
+        self.loads += 1
+        return self.version, [
+            {"currency": k, "rate": v, "request_at": self.request_at, "last_modified": self.request_at}
+            for k, v in self.rates.items()
+        ]
+
+    async def listen_snapshot_updated(self) -> AsyncGenerator[tuple[str, int]]:
+        while True:
+            yield await self.messages.get()
+
+
+def _snapshot_cache(stub: _StubRatesCache, ttl_seconds: int = 60) -> CurrencyRateSnapshotCache:
+    return CurrencyRateSnapshotCache(cast("CurrencyRateRedisCache", stub), ttl_seconds=ttl_seconds)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_served_from_memory():
+    stub = _StubRatesCache()
+    cache = _snapshot_cache(stub)
+
+    first = await cache.get("USD")
+    second = await cache.get("USD")
+
+    assert first is second
+    assert stub.loads == 1
+    assert [r["currency"] for r in first.select(["PLN", "XXX"])] == ["PLN"]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reloaded_after_ttl():
+    stub = _StubRatesCache()
+    cache = _snapshot_cache(stub, ttl_seconds=0)
+
+    await cache.get("USD")
+    await cache.get("USD")
+
+    assert stub.loads == 2  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_empty_snapshot_cached_briefly():
+    stub = _StubRatesCache(rates={})
+    cache = _snapshot_cache(stub)
+    uncached = CurrencyRateSnapshotCache(cast("CurrencyRateRedisCache", stub), ttl_seconds=60, empty_ttl_seconds=0)
+
+    await cache.get("USD")
+    await cache.get("USD")
+    await uncached.get("USD")
+    await uncached.get("USD")
+
+    assert stub.loads == 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reloaded_on_update_message():
+    stub = _StubRatesCache()
+    cache = _snapshot_cache(stub)
+    cache.start()
+    try:
+        assert (await cache.get("USD")).version == 1
+
+        stub.version, stub.rates = 2, {"EUR": 0.9}
+        stub.messages.put_nowait(("USD", 2))
+        await asyncio.sleep(0.01)
+
+        snapshot = await cache.get("USD")
+        assert snapshot.version == 2  # noqa: PLR2004
+        assert list(snapshot.rates) == ["EUR"]
+        assert stub.loads == 2  # noqa: PLR2004
+    finally:
+        await cache.stop()
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_served_from_lastseen():
+    latest, lastseen = _StubRatesCache(rates={}), _StubRatesCache(request_at=int(time.time()) - 7200)
+    refreshes = []
+
+    async def _on_stale(base_currency: str) -> None:
+        refreshes.append(base_currency)
+
+    cache = CurrencyRateSnapshotCache(
+        cast("CurrencyRateRedisCache", latest),
+        ttl_seconds=60,
+        lastseen_cache=cast("CurrencyRateRedisCache", lastseen),
+        fresh_seconds=3600,
+        on_stale=_on_stale,
+    )
+
+    snapshot = await cache.get("EUR")
+    await asyncio.sleep(0)
+
+    assert snapshot.stale
+    assert snapshot.rates["PLN"]["rate"] == pytest.approx(3.7 / 0.86)
+    assert refreshes == ["USD"]
+    assert await cache.get("EUR") is snapshot
+
+
+@pytest.mark.asyncio
+async def test_refresh_of_empty_snapshot_requested_once_per_interval():
+    refreshes = []
+
+    async def _on_stale(base_currency: str) -> None:
+        refreshes.append(base_currency)
+
+    def _cache(refresh_interval_seconds: int) -> CurrencyRateSnapshotCache:
+        return CurrencyRateSnapshotCache(
+            cast("CurrencyRateRedisCache", _StubRatesCache(rates={})),
+            ttl_seconds=60,
+            lastseen_cache=cast("CurrencyRateRedisCache", _StubRatesCache(rates={})),
+            on_stale=_on_stale,
+            empty_ttl_seconds=0,
+            refresh_interval_seconds=refresh_interval_seconds,
+        )
+
+    throttled, unthrottled = _cache(60), _cache(0)
+    for _ in range(3):
+        await throttled.get()
+    await asyncio.sleep(0)
+    throttled_refreshes = len(refreshes)
+    for _ in range(3):
+        await unthrottled.get()
+    await asyncio.sleep(0)
+
+    assert throttled_refreshes == 1
+    assert len(refreshes) - throttled_refreshes == 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_fresh_snapshot_not_stale():
+    latest, lastseen = _StubRatesCache(request_at=int(time.time())), _StubRatesCache()
+    cache = CurrencyRateSnapshotCache(
+        cast("CurrencyRateRedisCache", latest),
+        ttl_seconds=60,
+        lastseen_cache=cast("CurrencyRateRedisCache", lastseen),
+        fresh_seconds=3600,
+    )
+
+    snapshot = await cache.get()
+
+    assert not snapshot.stale
+    assert lastseen.loads == 0
@@ -0,0 +1,40 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import signal
+import sys
+
+PROG_DESCRIPTION = """
+Run arq worker (scheduled and on-demand rates fetches) as a standalone process.
+
+Set ARQ_WORKER_EMBEDDED=false for web processes, so that jobs are run only by standalone workers.
+
+Example:
+
+    APP_ENV=dev_container uv run arq-worker
+"""
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        "arq-worker",
+        description=PROG_DESCRIPTION,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    ap.parse_args(sys.argv[1:])
+    os.chdir("./packages/finnikacc-api")
+    with contextlib.suppress(asyncio.CancelledError):
+        asyncio.run(_run())
+    return 0
+
+
+async def _run() -> None:
+    # * imported here: settings are loaded on import, relative to package directory
+    from finnikacc_api.lifecycle.arq_lifecycle import run_standalone_arq_worker  # noqa: PLC0415
+
+    task = asyncio.current_task()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)  # pyright: ignore[reportOptionalMemberAccess]
+    await run_standalone_arq_worker()
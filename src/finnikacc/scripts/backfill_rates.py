@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import os
+import sys
+from datetime import UTC, date, datetime, timedelta
+
+PROG_DESCRIPTION = """
+Backfill historical daily currency rates from OEX into rates history
+(Redis history and, if RATES_ARCHIVE_DIR is set, on-disk rates archive).
+
+Already fetched days are skipped, so interrupted backfill can simply be rerun.
+
+Examples:
+
+    APP_ENV=dev_container uv run backfill-rates --start 2025-01-01
+    APP_ENV=dev_container uv run backfill-rates --start 2025-01-01 --end 2025-03-31 --max-requests 50
+"""
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        "backfill-rates",
+        description=PROG_DESCRIPTION,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    ap.add_argument("--start", type=date.fromisoformat, required=True, help="first day (YYYY-MM-DD)")
+    ap.add_argument(
+        "--end",
+        type=date.fromisoformat,
+        default=datetime.now(UTC).date() - timedelta(days=1),
+        help="last day (YYYY-MM-DD), yesterday by default",
+    )
+    ap.add_argument("--max-requests", type=int, default=100, help="max number of OEX requests to make")
+    ap.add_argument(
+        "--reserve",
+        type=int,
+        default=None,
+        help="OEX requests to leave unused (default: enough for hourly fetch until quota resets)",
+    )
+    ap.add_argument("--concurrency", type=int, default=4, help="max concurrent OEX requests")
+    ap.add_argument("--batch-days", type=int, default=31, help="days written per bulk write")
+
+    args = ap.parse_args(sys.argv[1:])
+    os.chdir("./packages/finnikacc-api")
+    return asyncio.run(_backfill(args))
+
+
+async def _backfill(args: argparse.Namespace) -> int:
+    # * imported here: settings are loaded on import, relative to package directory
+    from fastapi import FastAPI  # noqa: PLC0415
+    from finnikacc_api.arqjobs.backfillrates import backfill_conv_rates_oex, oex_request_budget  # noqa: PLC0415
+    from finnikacc_api.lifecycle.deps_ext_lifecycle import external_deps_lifespan  # noqa: PLC0415
+    from finnikacc_api.lifecycle.deps_int_lifecycle import internal_deps_lifespan  # noqa: PLC0415
+
+    app = FastAPI()
+    async with external_deps_lifespan(app) as edeps, internal_deps_lifespan(app) as ideps:
+        budget = await oex_request_budget(edeps.oex_client, max_requests=args.max_requests, reserve=args.reserve)
+        result = await backfill_conv_rates_oex(
+            edeps,
+            ideps,
+            start=args.start,
+            end=args.end,
+            budget=budget,
+            concurrency=args.concurrency,
+            batch_days=args.batch_days,
+        )
+    print(  # noqa: T201
+        f"fetched: {result.fetched}, already done: {result.skipped}, failed: {result.failed}, "
+        f"requests used: {budget.used}{' (budget exhausted)' if result.budget_exhausted else ''}",
+    )
+    return 1 if result.failed else 0
@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import os
+import sys
+
+PROG_DESCRIPTION = """
+Record current OEX `latest.json` response (one request, counts towards quota),
+to be replayed by `OexReplayServer` in tests and benchmarks.
+
+Example:
+
+    APP_ENV=dev_container uv run record-oex-rates --dir tests/recordings/oex
+"""
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        "record-oex-rates",
+        description=PROG_DESCRIPTION,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    ap.add_argument("--dir", default="tests/recordings/oex", help="recordings directory (relative to API package)")
+
+    args = ap.parse_args(sys.argv[1:])
+    os.chdir("./packages/finnikacc-api")
+    return asyncio.run(_record(args))
+
+
+async def _record(args: argparse.Namespace) -> int:
+    # * imported here: settings are loaded on import, relative to package directory
+    from fastapi import FastAPI  # noqa: PLC0415
+    from finnikacc_api.lifecycle.deps_ext_lifecycle import external_deps_lifespan  # noqa: PLC0415
+    from finnikacc_api.providers.oex_replay import record_oex_latest  # noqa: PLC0415
+
+    async with external_deps_lifespan(FastAPI()) as edeps:
+        path = await record_oex_latest(edeps.oex_client, args.dir)
+    print(f"recorded: {path}")  # noqa: T201
+    return 0